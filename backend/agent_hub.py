@@ -0,0 +1,346 @@
+import time
+import queue
+import socket
+import ipaddress
+import logging
+import threading
+import itertools
+from multiprocessing import Process, Queue
+from multiprocessing.connection import Listener, wait
+
+from snapshot_store import SnapshotWriter
+
+AGENT_PING_EVERY = 2.0  # Seconds between keepalives in each direction
+AGENT_TIMEOUT = 10.0  # Nothing heard from an agent for this long: drop it and move its accounts
+AGENT_POLL = 0.5  # Seconds the reader waits before picking up newly connected agents
+HELLO_TIMEOUT = 5.0
+STOP_TIMEOUT = 10.0  # Longest join() on a remote worker, in case its agent never answers
+
+# --- PROTOCOL ---
+# Pickled tuples over multiprocessing.connection (HMAC-authenticated with the shared key).
+#   agent -> backend: ('HELLO', agent_id, slots, host), ('RESULTS', [result queue messages]),
+#                     ('SNAPSHOTS', [(acc_id, marshal payload)]), ('EXITED', acc_id, run, exitcode),
+#                     ('PING', {acc_id: command queue depth})
+#   backend -> agent: ('START', acc_id, run, acc_data, global_symbols), ('COMMAND', acc_id, cmd),
+#                     ('STOP', acc_id), ('PING',)
+# `run` numbers each placement, so a late EXITED can't be taken for the account's next run.
+# Worker clocks may differ from ours, so HEARTBEAT / PHASE timestamps are restamped on receipt.
+# The key only authenticates: traffic, account passwords included, is NOT encrypted. Keep the
+# listener on loopback and bring remote agents in over an SSH tunnel (ssh -L from the agent host)
+# or a TLS / VPN link; binding elsewhere needs FINWIZ_AGENT_ALLOW_REMOTE=1 (see is_loopback).
+CLOCK_FIELD = {'HEARTBEAT': 2, 'PHASE': 3}
+
+
+def is_loopback(host):
+    """True if binding `host` only accepts connections from this machine."""
+    try:
+        return all(ipaddress.ip_address(info[4][0]).is_loopback for info in socket.getaddrinfo(host, None))
+    except (OSError, ValueError):
+        return False
+
+
+# --- RELAY PROCESS ---
+class _Link:
+    def __init__(self, agent_id, conn):
+        self.agent_id = agent_id
+        self.conn = conn
+        self.last_seen = self.last_ping = time.time()
+        self.send_lock = threading.Lock()
+
+
+def relay_loop(address, authkey, outbox, result_queue):
+    """
+    Owns the agent connections so the Flask process never blocks on them (or
+    mixes them with a green runtime). Results go straight into the workers'
+    result queue, snapshot payloads into the Flask-owned segments, and agent
+    events come back as ('AGENT', event, agent_id, ...) result queue messages.
+    """
+    links = {}  # agent_id -> _Link
+    runs = {}  # acc_id -> (agent_id, run, SnapshotWriter)
+    lock = threading.Lock()
+
+    def event(*args):
+        result_queue.put(('AGENT',) + args)
+
+    def send(link, msg):
+        try:
+            with link.send_lock:
+                link.conn.send(msg)
+        except (OSError, ValueError) as e:
+            lost(link, f"send failed: {e}")
+
+    def release(acc_id):
+        _, _, writer = runs.pop(acc_id)
+        writer.close()
+
+    def lost(link, reason):
+        with lock:
+            if links.get(link.agent_id) is not link:
+                return  # Already dropped
+            del links[link.agent_id]
+            acc_ids = [a for a, r in runs.items() if r[0] == link.agent_id]
+            for acc_id in acc_ids:
+                release(acc_id)
+        logging.warning(f"Agent {link.agent_id} lost ({reason}), {len(acc_ids)} accounts to move")
+        try:
+            link.conn.close()
+        except OSError:
+            pass
+        event('lost', link.agent_id, acc_ids)
+
+    def accept_loop(listener):
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logging.warning(f"Agent connection refused: {e}")  # Wrong key, port scan, ...
+                continue
+            try:
+                hello = conn.recv() if conn.poll(HELLO_TIMEOUT) else None
+            except (EOFError, OSError):
+                hello = None
+            if not hello or hello[0] != 'HELLO':
+                conn.close()
+                continue
+            _, agent_id, slots, host = hello
+            with lock:
+                if agent_id in links:
+                    logging.warning(f"Agent {agent_id} is already connected, refusing the duplicate")
+                    conn.close()
+                    continue
+                links[agent_id] = _Link(agent_id, conn)
+            logging.info(f"Agent {agent_id} joined from {host} with {slots} slots")
+            event('joined', agent_id, max(1, int(slots)), host)
+
+    def outbox_loop():
+        # ('START', agent_id, acc_id, run, acc_data, global_symbols, segment), ('COMMAND' | 'STOP', agent_id, acc_id, ...)
+        while True:
+            msg = outbox.get()
+            kind, agent_id = msg[0], msg[1]
+            link = links.get(agent_id)
+            if link is None:
+                continue  # Gone, its 'lost' event already moved the account
+            if kind == 'START':
+                _, _, acc_id, run, acc_data, global_symbols, segment = msg
+                with lock:
+                    if acc_id in runs:
+                        release(acc_id)
+                    runs[acc_id] = (agent_id, run, SnapshotWriter(segment))
+                send(link, ('START', acc_id, run, acc_data, global_symbols))
+            else:
+                send(link, (kind,) + msg[2:])
+
+    def handle(link, msg):
+        kind = msg[0]
+        if kind == 'RESULTS':
+            now = time.time()
+            for m in msg[1]:
+                field = CLOCK_FIELD.get(m[0])
+                if field is not None:
+                    m = m[:field] + (now,) + m[field + 1:]
+                result_queue.put(m)
+        elif kind == 'SNAPSHOTS':
+            for acc_id, payload in msg[1]:
+                r = runs.get(acc_id)
+                # Only the agent currently running the account may write its segment
+                if r and r[0] == link.agent_id:
+                    r[2].write_payload(payload)
+        elif kind == 'EXITED':
+            _, acc_id, run, exitcode = msg
+            with lock:
+                current = runs.get(acc_id)
+                if current and current[:2] == (link.agent_id, run):
+                    release(acc_id)
+            event('exited', link.agent_id, acc_id, run, exitcode)
+        elif kind == 'PING' and len(msg) > 1:
+            event('depths', link.agent_id, msg[1])
+
+    listener = Listener(address, authkey=authkey)
+    logging.info(f"Agent relay listening on {address[0]}:{address[1]}")
+    threading.Thread(target=accept_loop, args=(listener,), name='agent-accept', daemon=True).start()
+    threading.Thread(target=outbox_loop, name='agent-outbox', daemon=True).start()
+
+    while True:
+        with lock:
+            by_conn = {link.conn: link for link in links.values()}
+        try:
+            for conn in wait(list(by_conn), AGENT_POLL) if by_conn else []:
+                link = by_conn[conn]
+                try:
+                    while True:
+                        msg = conn.recv()
+                        link.last_seen = time.time()
+                        handle(link, msg)
+                        if not conn.poll(0):
+                            break
+                except (EOFError, OSError):
+                    lost(link, 'disconnected')
+            if not by_conn:
+                time.sleep(AGENT_POLL)
+            now = time.time()
+            for link in by_conn.values():
+                if now - link.last_seen > AGENT_TIMEOUT:
+                    lost(link, f"no message for {now - link.last_seen:.0f}s")
+                elif now - link.last_ping > AGENT_PING_EVERY:
+                    link.last_ping = now
+                    send(link, ('PING',))
+        except Exception as e:
+            logging.error(f"Agent Relay Error: {e}")
+
+
+# --- REMOTE WORKERS ---
+class RemoteQueue:
+    """COMMAND_QUEUES entry of an account running on an agent. Commands put after it's gone stay here for drain_pending."""
+
+    def __init__(self, hub, worker):
+        self.hub = hub
+        self.worker = worker
+        self._unsent = []
+
+    def put(self, obj, block=True, timeout=None):
+        if isinstance(obj, dict):
+            obj.setdefault('queued_at', time.time())
+        if self.worker.is_alive():
+            self.hub.send(self.worker.agent_id, 'COMMAND', self.worker.acc_id, obj)
+        else:
+            self._unsent.append(obj)
+
+    def get_nowait(self):
+        if not self._unsent:
+            raise queue.Empty
+        return self._unsent.pop(0)
+
+    def qsize(self):
+        # Held back here, plus what the agent last reported waiting in the worker's own queue
+        return len(self._unsent) + (self.worker.queue_depth if self.worker.is_alive() else 0)
+
+
+class RemoteWorker:
+    """WORKER_PROCESSES entry of an account running on an agent: the part of Process the app uses."""
+
+    def __init__(self, hub, agent_id, acc_id, run):
+        self.hub = hub
+        self.agent_id = agent_id  # None: no agent had a free slot, the supervisor retries
+        self.acc_id = acc_id
+        self.run = run
+        self.exitcode = None
+        self.queue_depth = 0  # Commands waiting on the agent, as of its last PING
+        self._exited = threading.Event()
+        if agent_id is None:
+            self.exited(-1)
+
+    def exited(self, exitcode):
+        self.exitcode = exitcode
+        self._exited.set()
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def terminate(self):
+        if self.exitcode is None:
+            self.hub.send(self.agent_id, 'STOP', self.acc_id)
+
+    def kill(self):
+        self.terminate()
+
+    def join(self, timeout=None):
+        self._exited.wait(STOP_TIMEOUT if timeout is None else timeout)
+
+
+class AgentInfo:
+    def __init__(self, agent_id, slots, host):
+        self.agent_id = agent_id
+        self.slots = slots
+        self.host = host
+        self.workers = {}  # acc_id -> RemoteWorker
+        self.joined_at = time.time()
+
+
+# --- HUB ---
+class AgentHub:
+    """
+    Flask side of distributed workers. Worker agents (worker_agent.py) connect to
+    a relay process (relay_loop), announce how many accounts they can run, and
+    then host account_worker_loop for the accounts placed on them.
+
+    place() puts an account on the least loaded agent and returns a
+    (RemoteWorker, RemoteQueue) pair standing in for (Process, CommandQueue).
+    When an agent disconnects or goes quiet for AGENT_TIMEOUT its workers read as
+    exited, `on_lost(agent_id, acc_ids)` is called, and the supervisor's normal
+    restart places each account again on a surviving agent. `on_join(agent_id)`
+    fires for every new agent, so accounts left unplaced can be retried at once.
+    Register on_event() for 'AGENT' messages with the ResultDispatcher.
+    """
+
+    def __init__(self, address, authkey, on_lost=None, on_join=None):
+        self.address = address
+        self.authkey = authkey
+        self.on_lost = on_lost
+        self.on_join = on_join
+        self._outbox = None
+        self._process = None
+        self._runs = itertools.count(1)
+        self._lock = threading.Lock()
+        self._agents = {}  # agent_id -> AgentInfo
+
+    def start(self, result_queue):
+        self._outbox = Queue()
+        self._process = Process(target=relay_loop, args=(self.address, self.authkey, self._outbox, result_queue),
+                                name='agent-relay', daemon=True)
+        self._process.start()
+
+    def send(self, agent_id, kind, *args):
+        self._outbox.put((kind, agent_id) + args)
+
+    def place(self, acc_id, acc_data, global_symbols, segment):
+        """Starts the account on the least loaded agent with a free slot, unplaced if there is none."""
+        with self._lock:
+            free = [a for a in self._agents.values() if len(a.workers) < a.slots]
+            agent = min(free, key=lambda a: (len(a.workers) / a.slots, len(a.workers)), default=None)
+            if agent is None:
+                worker = RemoteWorker(self, None, acc_id, None)
+                return worker, RemoteQueue(self, worker)
+            worker = agent.workers[acc_id] = RemoteWorker(self, agent.agent_id, acc_id, next(self._runs))
+        self.send(agent.agent_id, 'START', acc_id, worker.run, acc_data, global_symbols, segment)
+        logging.info(f"Placed {acc_id} on agent {agent.agent_id} ({len(agent.workers)}/{agent.slots})")
+        return worker, RemoteQueue(self, worker)
+
+    def on_event(self, event, agent_id, *args):
+        # Runs on the dispatcher thread
+        if event == 'joined':
+            slots, host = args
+            with self._lock:
+                self._agents[agent_id] = AgentInfo(agent_id, slots, host)
+            if self.on_join:
+                self.on_join(agent_id)
+        elif event == 'exited':
+            acc_id, run, exitcode = args
+            with self._lock:
+                agent = self._agents.get(agent_id)
+                worker = agent.workers.get(acc_id) if agent else None
+                if worker is None or worker.run != run:
+                    return
+                del agent.workers[acc_id]
+            worker.exited(exitcode)
+        elif event == 'depths':
+            with self._lock:
+                agent = self._agents.get(agent_id)
+                for acc_id, depth in (args[0].items() if agent else ()):
+                    if acc_id in agent.workers:
+                        agent.workers[acc_id].queue_depth = depth
+        elif event == 'lost':
+            with self._lock:
+                agent = self._agents.pop(agent_id, None)
+            if agent is None:
+                return
+            for worker in agent.workers.values():
+                worker.exited(-1)
+            if self.on_lost:
+                self.on_lost(agent_id, list(agent.workers))
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            return {a.agent_id: {'host': a.host, 'slots': a.slots, 'accounts': sorted(a.workers),
+                                 'connected_s': round(now - a.joined_at, 1)}
+                    for a in self._agents.values()}
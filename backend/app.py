@@ -1,17 +1,46 @@
+import server_runtime
+if __name__ == '__main__':
+    server_runtime.patch()  # FINWIZ_SERVER=gevent|eventlet: before anything else touches threading / socket
+
 import time
 import sys
+import atexit
 import os
 import json
 import threading
 import uuid
 import logging
-import MetaTrader5 as mt5
-from flask import Flask, jsonify, request
+from mt5_adapter import load_mt5
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import multiprocessing
-from multiprocessing import Process, Manager, Queue
+from multiprocessing import Process, Queue
+import db_manager
 from db_manager import get_db
+from result_channel import ResultDispatcher
+from snapshot_store import SnapshotStore, SnapshotWriter
+from dashboard_rooms import DashboardRooms, user_room
+from sessions import SessionStore
+from exposure import ExposureEngine
+from live_bars import LiveBarBook
+from candles import pack_rates, unpack_columns, last_bar, encode_rows_json, encode_columns_json
+from candle_store import CandleStore
+from wire_format import negotiate, candle_mimetype, pack_candles, MSGPACK_MIME
+from market_feed import FeedRegistry, merge_quotes
+from worker_scheduler import WorkerScheduler, DEFAULT_CADENCE, CommandLanes, CommandQueue
+from trade_fanout import build_trade_report
+from trade_jobs import TradeJob, TradeJobs
+from symbol_cache import SymbolCache, normalize_volume, STALE_SPEC_RETCODES
+from position_index import PositionIndex
+from trailing import TrailingEngine
+from worker_startup import StartupTracker, WarmPool
+from worker_supervisor import Heartbeat, WorkerSupervisor
+from data_router import DataRouter
+from metrics import MetricsRegistry
+from agent_hub import AgentHub, RemoteWorker, is_loopback
+
+mt5 = load_mt5()  # MetaTrader5, or the simulated terminal with FINWIZ_MT5=sim
 
 # --- LOGGING SETUP ---
 logging.basicConfig(
@@ -23,16 +52,71 @@ logging.basicConfig(
 # --- CONFIG ---
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=server_runtime.SERVER_MODE)
+
+# dashboard_update carries seq-numbered deltas with a full keyframe every ~10s (40 x 250ms).
+# Set BROADCAST_DELTA = False to go back to emitting the full state every cycle.
+BROADCAST_DELTA = True
+KEYFRAME_EVERY = 40
+
+# Worker refresh cadence (seconds) per task, 'fast' right after order-affecting commands
+WORKER_CADENCE = DEFAULT_CADENCE
+ORDER_ACTIONS = ('TRADE', 'MODIFY', 'MODIFY_BATCH', 'STEP_ADJUST', 'TRAIL', 'ORDER_MODIFY', 'ORDER_CANCEL',
+                 'CLOSE', 'CLOSE_BATCH')
+SYMBOL_CACHE_TTL = 3600  # Seconds before a worker re-reads symbol_info() for a symbol
+
+# Deactivated accounts keep their terminal logged in for fast re-activation.
+# WARM_POOL_SIZE = 0 terminates workers on deactivation as before.
+WARM_POOL_SIZE = 4
+WARM_POOL_TTL = 600
+PARKED_POLL = 1.0  # Seconds a parked worker blocks on its queue between checks
+
+# Queued commands that are safe to hand to a restarted worker. The rest (trades,
+# closes, relative steps) may already have run, their callers get an error instead.
+REPLAY_ACTIONS = ('GET_CANDLES', 'MODIFY', 'MODIFY_BATCH', 'TRAIL', 'ORDER_MODIFY', 'INVALIDATE_SYMBOLS')
+SUPERVISE_EVERY = 1.0
+
+# Account ID whose worker serves all candle requests (None = spread over healthy workers)
+DATA_WORKER = None
+
+# Distributed workers: with FINWIZ_AGENT_PORT set, accounts run on worker agents (worker_agent.py)
+# that connect there with the same FINWIZ_AGENT_KEY. The first LOCAL_WORKER_SLOTS accounts still
+# run on this host; accounts finding no free slot anywhere are retried by the supervisor.
+AGENT_PORT = int(os.environ.get('FINWIZ_AGENT_PORT', 0))
+# Agent traffic (account passwords included) is authenticated but not encrypted: remote agents should
+# come in over an SSH tunnel / TLS link to the loopback listener. Other binds need ALLOW_REMOTE.
+AGENT_BIND = os.environ.get('FINWIZ_AGENT_BIND', '127.0.0.1')
+AGENT_ALLOW_REMOTE = os.environ.get('FINWIZ_AGENT_ALLOW_REMOTE') == '1'
+LOCAL_WORKER_SLOTS = int(os.environ.get('FINWIZ_LOCAL_WORKERS', 0))
+AGENT_JOIN_SETTLE = 1.0  # Seconds to let agents started together all join before placing waiting accounts
+
+METRICS_EMIT_EVERY = 2.0  # Seconds between 'metrics' events to subscribed clients
+PAYLOAD_SAMPLE_EVERY = 20  # Broadcast cycles between dashboard payload size samples
 
 # --- SHARED STATE ---
-manager = None
-SHARED_DATA = {}
-RESPONSE_DICT = {}
-TRADE_RESULTS = {}  # For aggregating trade responses
+SNAPSHOTS = SnapshotStore()  # Per-account shared memory segments written by the workers
+POSITION_INDEX = PositionIndex(SNAPSHOTS)  # Ticket / (symbol, side) lookups for the order routes
+RESULT_QUEUE = None  # Workers push ('RESULT', req_id, acc_id, payload) here
+DISPATCHER = None
+AGENTS = None  # AgentHub, opened in __main__ when AGENT_PORT is set
 COMMAND_QUEUES = {}
 WORKER_PROCESSES = {}
 ACCOUNT_CONFIGS = {}
+DASHBOARD_ROOMS = DashboardRooms(keyframe_every=KEYFRAME_EVERY)  # dashboard_update views and account owners
+SESSIONS = SessionStore()  # Login tokens, resolved to a user_id by socket events
+EXPOSURE = ExposureEngine()  # Per-group / symbol / account aggregates for the 'exposure' section
+LIVE_BARS = LiveBarBook()  # Forming bar per chart subscription, fed by worker ticks
+TICK_FEED = {'acc': None, 'symbols': []}  # Worker currently pushing ticks for LIVE_BARS
+TICK_FEED_LOCK = threading.Lock()
+CANDLE_STORE = None  # Persistent OHLC cache, opened in __main__
+MARKET_FEEDS = FeedRegistry()  # One quote-polling worker per trade server
+STARTUP = StartupTracker()  # Readiness phases of workers coming online
+WARM_POOL = WarmPool(WARM_POOL_SIZE, WARM_POOL_TTL)
+SUPERVISOR = WorkerSupervisor()  # Heartbeats, crash detection and restarts
+WORKERS_LOCK = threading.RLock()  # Start / stop / restart of worker processes
+DATA_ROUTER = DataRouter(DATA_WORKER)
+METRICS = MetricsRegistry()  # Flask-side metrics plus the summaries workers ship
+TRADE_JOBS = None  # Non-blocking /api/trade fan-outs, created in __main__ with the dispatcher
 
 
 def get_resource_path(filename):
@@ -45,13 +129,23 @@ def get_resource_path(filename):
 
 
 # --- WORKER PROCESS ---
-def account_worker_loop(account_data, cmd_queue, shared_dict, response_dict, trade_results, global_symbols):
+def account_worker_loop(account_data, cmd_queue, snapshot_name, result_queue, global_symbols):
     # Re-configure logging for this process
     logging.basicConfig(filename='debug.log', level=logging.INFO, format='[WORKER] %(asctime)s: %(message)s')
 
     acc_id = str(account_data.get('ID', 'UNKNOWN'))
     acc_name = account_data.get('NAME', acc_id)
+    snapshot = SnapshotWriter(snapshot_name)
+    # Recorded locally, shipped as a compact summary with every heartbeat
+    metrics = MetricsRegistry()
+
+    def reply(req_id, payload):
+        if req_id: result_queue.put(('RESULT', req_id, acc_id, payload))
 
+    def phase(name, error=None):
+        result_queue.put(('PHASE', acc_id, name, time.time(), error))
+
+    phase('spawned')
     try:
         login = int(account_data['USER'])
         password = account_data['PASS']
@@ -67,9 +161,11 @@ def account_worker_loop(account_data, cmd_queue, shared_dict, response_dict, tra
 
         if not initialized:
             err = mt5.last_error()
-            shared_dict[acc_id] = {'status': 'ERROR', 'error': str(err)}
+            snapshot.write({'ID': acc_id, 'status': 'ERROR', 'error': str(err)})
             logging.error(f"[{acc_name}] MT5 Init Failed: {err}")
+            phase('failed', str(err))
             return
+        phase('initialized')
 
         # --- FIX: Watch ALL Symbols (Configured + Global Watchlist) ---
         watched_symbols = set(['XAUUSD'])
@@ -79,7 +175,7 @@ def account_worker_loop(account_data, cmd_queue, shared_dict, response_dict, tra
             for s in account_data['SYMBOL_CONFIG']:
                 watched_symbols.add(s)
 
-        # 2. Add symbols from Global Database List (passed in args)
+        # 2. Add symbols from Global Database List (passed in args as {symbol: TRAIL_AMOUNT})
         for s in global_symbols:
             watched_symbols.add(s)
 
@@ -87,14 +183,89 @@ def account_worker_loop(account_data, cmd_queue, shared_dict, response_dict, tra
         for s in watched_symbols:
             mt5.symbol_select(s, True)
 
+        # 4. Pre-resolve filling mode & contract specs so orders go straight to order_send
+        symbol_cache = SymbolCache(mt5, ttl=SYMBOL_CACHE_TTL)
+        symbol_cache.preload(watched_symbols)
+        phase('symbols_selected')
+
+        def order_send(req):
+            t0 = time.time()
+            res = mt5.order_send(req)
+            metrics.histogram('order_send_ms').record((time.time() - t0) * 1000)
+            metrics.counter('order_send_total', retcode=res.retcode if res else 'none').inc()
+            return res
+
+        def send_sltp(pos, req):
+            val_sl = float(req['sl']) if 'sl' in req else pos.sl
+            val_tp = float(req['tp']) if 'tp' in req else pos.tp
+            mod_req = {"action": mt5.TRADE_ACTION_SLTP, "position": pos.ticket, "symbol": pos.symbol,
+                       "sl": val_sl, "tp": val_tp}
+            return order_send(mod_req)
+
+        def send_close(pos, tick):
+            spec = symbol_cache.get(pos.symbol)
+            close_price = tick.bid if pos.type == 0 else tick.ask
+            f_mode = spec['filling'] if spec else mt5.ORDER_FILLING_RETURN
+
+            close_req = {"action": mt5.TRADE_ACTION_DEAL, "position": pos.ticket, "symbol": pos.symbol,
+                         "volume": pos.volume, "type": 1 if pos.type == 0 else 0, "price": close_price,
+                         "deviation": 20, "type_filling": f_mode}
+            res = order_send(close_req)
+            if res and res.retcode in STALE_SPEC_RETCODES:
+                symbol_cache.invalidate(pos.symbol)
+            return res
+
         logging.info(f"[{acc_name}] Worker Started. Watching {len(watched_symbols)} symbols.")
 
+        # Quotes for the watchlist are only polled by the server's feed worker (SET_FEED)
+        is_feed = False
+        # Symbols whose ticks are pushed to the Flask process for live chart bars
+        tick_symbols = set()
+        last_tick_msc = {}
+        quote_seen = {}  # sym -> (time_msc, local time we first saw it)
+
+        # Server-side trailing stops, evaluated on every quote poll
+        trailing = TrailingEngine(global_symbols)
+
+        scheduler = WorkerScheduler(WORKER_CADENCE)
+        acc_info = None
+        pos_list, ord_list, price_map = [], [], {}
+        pos_by_ticket = {}
+        first_snapshot = True
+        parked = False  # Deactivated but kept logged in (warm pool), no polling
+
+        def update_quote_schedule():
+            scheduler.enable('quotes', is_feed or bool(tick_symbols) or bool(trailing.symbols()))
+
+        update_quote_schedule()
+
+        beat = Heartbeat()
+        lanes = CommandLanes(ORDER_ACTIONS)  # Orders never wait behind candle fetches
         while True:
+            loop_ms = beat.lap()
+            if loop_ms is not None:
+                metrics.histogram('worker_loop_ms').record(loop_ms)
+            stats = beat.report()
+            if stats is not None:
+                status = 'PARKED' if parked else ('ONLINE' if acc_info else 'CONNECTING')
+                result_queue.put(('HEARTBEAT', acc_id, time.time(), status, stats))
+                metrics.gauge('queue_depth', lane='urgent').set(len(lanes.urgent))
+                metrics.gauge('queue_depth', lane='normal').set(len(lanes.normal))
+                result_queue.put(('METRICS', acc_id, metrics.flush()))
+
             # --- COMMAND PROCESSING ---
-            while not cmd_queue.empty():
-                cmd = cmd_queue.get()
+            # Sleeps until the next refresh is due, a command wakes us immediately
+            # While CONNECTING only the account poll can run, the other tasks stay overdue until login
+            lanes.wait(cmd_queue, PARKED_POLL if parked else scheduler.timeout(None if acc_info else ('account',)))
+            beat.wake()
+            for cmd in lanes.drain(cmd_queue):
                 action = cmd.get('action')
                 req_id = cmd.get('req_id')
+                t_cmd = time.time()
+                if 'queued_at' in cmd:
+                    metrics.histogram('command_wait_ms', action=action).record((t_cmd - cmd['queued_at']) * 1000)
+                if action in ORDER_ACTIONS:
+                    scheduler.mark_trade()
 
                 try:
                     if action == 'GET_CANDLES':
@@ -106,30 +277,53 @@ def account_worker_loop(account_data, cmd_queue, shared_dict, response_dict, tra
                                   "15M": mt5.TIMEFRAME_M15, "30M": mt5.TIMEFRAME_M30, "1H": mt5.TIMEFRAME_H1,
                                   "4H": mt5.TIMEFRAME_H4, "1D": mt5.TIMEFRAME_D1, "1W": mt5.TIMEFRAME_W1}
                         rates = mt5.copy_rates_from_pos(symbol, tf_map.get(tf_str, mt5.TIMEFRAME_M1), 0, limit)
-                        result = []
-                        if rates is not None and len(rates) > 0:
-                            for r in rates:
-                                result.append(
-                                    {"time": int(r['time']), "open": float(r['open']), "high": float(r['high']),
-                                     "low": float(r['low']), "close": float(r['close'])})
-                        if req_id: response_dict[req_id] = result
+                        # Columnar raw bytes, no per-bar Python objects in the worker
+                        reply(req_id, pack_rates(rates))
+
+                    elif action == 'SET_FEED':
+                        is_feed = bool(cmd['enabled'])
+                        update_quote_schedule()
+                        logging.info(f"[{acc_name}] Quote feed {'ON' if is_feed else 'OFF'}")
+
+                    elif action == 'PARK':
+                        # Same as a stop for the dashboard, but MT5 stays initialized
+                        parked, is_feed = True, False
+                        tick_symbols.clear()
+                        trailing = TrailingEngine(global_symbols)
+                        update_quote_schedule()
+                        snapshot.write({'ID': acc_id, 'status': 'OFFLINE'})
+                        logging.info(f"[{acc_name}] Parked")
+
+                    elif action == 'RESUME':
+                        parked, acc_info, first_snapshot = False, None, True
+                        scheduler.mark_trade()
+                        phase('symbols_selected')
+                        logging.info(f"[{acc_name}] Resumed")
+
+                    elif action == 'INVALIDATE_SYMBOLS':
+                        symbol_cache.invalidate(cmd.get('symbol'))
+
+                    elif action == 'WATCH_TICKS':
+                        tick_symbols = set(cmd['symbols'])
+                        update_quote_schedule()
+                        for s in tick_symbols:
+                            if s not in watched_symbols:
+                                mt5.symbol_select(s, True)
+                                watched_symbols.add(s)
 
                     elif action == 'TRADE':
+                        t_start = time.time()
+                        timing = {'account': acc_name, 'queue_ms': (t_start - cmd.get('dispatched_at', t_start)) * 1000}
                         req = cmd['payload']
                         symbol = req['symbol']
-                        if not mt5.symbol_select(symbol, True):
-                            if req_id: trade_results[f"{req_id}_{acc_id}"] = f"{acc_name}: Symbol Error"
+                        spec = symbol_cache.get(symbol)
+                        if spec is None:
+                            reply(req_id, dict(timing, message=f"{acc_name}: Symbol Error"))
                             continue
 
-                        # Filling Mode Logic
-                        filling_mode = mt5.ORDER_FILLING_RETURN
-                        s_info = mt5.symbol_info(symbol)
-                        if s_info:
-                            if s_info.filling_mode & 1:
-                                filling_mode = mt5.ORDER_FILLING_FOK
-                            elif s_info.filling_mode & 2:
-                                filling_mode = mt5.ORDER_FILLING_IOC
-                        req["type_filling"] = filling_mode
+                        # Filling Mode & Volume Logic (cached per symbol)
+                        req["type_filling"] = spec['filling']
+                        req["volume"] = normalize_volume(req["volume"], spec)
 
                         # Price Logic
                         if req['action'] == mt5.TRADE_ACTION_DEAL:
@@ -140,204 +334,715 @@ def account_worker_loop(account_data, cmd_queue, shared_dict, response_dict, tra
                                 elif req['type'] == mt5.ORDER_TYPE_SELL:
                                     req['price'] = tick.bid
                             else:
-                                if req_id: trade_results[f"{req_id}_{acc_id}"] = f"{acc_name}: No Price"
+                                reply(req_id, dict(timing, message=f"{acc_name}: No Price"))
                                 continue
 
-                        res = mt5.order_send(req)
-                        msg = f"{acc_name}: Success" if res and res.retcode == mt5.TRADE_RETCODE_DONE else f"{acc_name}: Error {res.comment if res else 'None'}"
-                        if req_id: trade_results[f"{req_id}_{acc_id}"] = msg
+                        t_send = time.time()
+                        res = order_send(req)
+                        t_done = time.time()
+                        ok = res and res.retcode == mt5.TRADE_RETCODE_DONE
+                        msg = f"{acc_name}: Success" if ok else f"{acc_name}: Error {res.comment if res else 'None'}"
+                        if res and res.retcode in STALE_SPEC_RETCODES:
+                            symbol_cache.invalidate(symbol)
+
+                        timing.update({
+                            'message': msg, 'pre_send_ms': (t_send - t_start) * 1000,
+                            'send_ms': (t_done - t_send) * 1000, 'done_at': t_done,
+                            'requested_price': req.get('price'), 'fill_price': res.price if ok else None
+                        })
+                        if ok and req['action'] == mt5.TRADE_ACTION_DEAL and res.price:
+                            # Positive = worse than the price we asked for
+                            diff = res.price - req['price']
+                            timing['slippage'] = diff if req['type'] == mt5.ORDER_TYPE_BUY else -diff
+                        reply(req_id, timing)
 
                     elif action == 'MODIFY':
                         req = cmd['payload']
                         ticket = int(req['position'])
                         positions = mt5.positions_get(ticket=ticket)
                         if positions:
-                            pos = positions[0]
-                            val_sl = float(req['sl']) if 'sl' in req else pos.sl
-                            val_tp = float(req['tp']) if 'tp' in req else pos.tp
-                            mod_req = {"action": mt5.TRADE_ACTION_SLTP, "position": ticket, "symbol": pos.symbol,
-                                       "sl": val_sl, "tp": val_tp}
-                            mt5.order_send(mod_req)
+                            send_sltp(positions[0], req)
+
+                    elif action == 'MODIFY_BATCH':
+                        # One positions_get() for the whole batch instead of one per ticket
+                        by_ticket = {p.ticket: p for p in (mt5.positions_get() or [])}
+                        for item in cmd['payload']['items']:
+                            pos = by_ticket.get(int(item['position']))
+                            if pos:
+                                send_sltp(pos, item)
+
+                    elif action == 'STEP_ADJUST':
+                        # Move SL/TP by a delta relative to the terminal's current level
+                        by_ticket = {p.ticket: p for p in (mt5.positions_get() or [])}
+                        for item in cmd['payload']['items']:
+                            pos = by_ticket.get(int(item['position']))
+                            if not pos:
+                                continue
+                            field = item['field']
+                            spec = symbol_cache.get(pos.symbol)
+                            current = getattr(pos, field) or pos.price_current
+                            new_level = round(current + float(item['delta']), spec['digits'] if spec else 5)
+                            send_sltp(pos, {field: new_level})
+                            if field == 'sl':
+                                trailing.moved(pos.ticket, new_level)
+
+                    elif action == 'TRAIL':
+                        by_ticket = {p.ticket: p for p in (mt5.positions_get() or [])}
+                        for item in cmd['payload']['items']:
+                            pos = by_ticket.get(int(item['position']))
+                            if not pos:
+                                continue
+                            if item.get('enabled', True):
+                                tick = mt5.symbol_info_tick(pos.symbol)
+                                price = (tick.bid if pos.type == 0 else tick.ask) if tick else pos.price_current
+                                trailing.set(pos, price, item.get('distance'), item.get('step'))
+                            else:
+                                trailing.clear(pos.ticket)
+                        update_quote_schedule()
 
                     elif action == 'ORDER_MODIFY':
                         req = cmd['payload']
                         req["action"] = mt5.TRADE_ACTION_MODIFY
-                        mt5.order_send(req)
+                        order_send(req)
 
                     elif action == 'ORDER_CANCEL':
                         req = cmd['payload']
                         req["action"] = mt5.TRADE_ACTION_REMOVE
-                        mt5.order_send(req)
+                        order_send(req)
 
                     elif action == 'CLOSE':
                         ticket = int(cmd['payload']['position'])
                         positions = mt5.positions_get(ticket=ticket)
                         if positions:
                             pos = positions[0]
-                            mt5.symbol_select(pos.symbol, True)
-                            tick = mt5.symbol_info_tick(pos.symbol)
-                            close_price = tick.bid if pos.type == 0 else tick.ask
-
-                            f_mode = mt5.ORDER_FILLING_RETURN
-                            s_info = mt5.symbol_info(pos.symbol)
-                            if s_info:
-                                if s_info.filling_mode & 1:
-                                    f_mode = mt5.ORDER_FILLING_FOK
-                                elif s_info.filling_mode & 2:
-                                    f_mode = mt5.ORDER_FILLING_IOC
-
-                            close_req = {"action": mt5.TRADE_ACTION_DEAL, "position": ticket, "symbol": pos.symbol,
-                                         "volume": pos.volume, "type": 1 if pos.type == 0 else 0, "price": close_price,
-                                         "deviation": 20, "type_filling": f_mode}
-                            mt5.order_send(close_req)
+                            send_close(pos, mt5.symbol_info_tick(pos.symbol))
+
+                    elif action == 'CLOSE_BATCH':
+                        by_ticket = {p.ticket: p for p in (mt5.positions_get() or [])}
+                        ticks = {}
+                        for ticket in cmd['payload']['positions']:
+                            pos = by_ticket.get(int(ticket))
+                            if pos:
+                                if pos.symbol not in ticks:
+                                    ticks[pos.symbol] = mt5.symbol_info_tick(pos.symbol)
+                                send_close(pos, ticks[pos.symbol])
 
                 except Exception as e:
                     logging.error(f"[{acc_name}] Cmd Error: {e}")
-
-            # --- FETCH DATA & PRICES ---
-            acc_info = mt5.account_info()
+                    # Don't leave the caller waiting for a timeout
+                    reply(req_id, pack_rates(None) if action == 'GET_CANDLES' else f"{acc_name}: Error {e}")
+                    metrics.counter('command_errors_total', action=action).inc()
+                metrics.histogram('command_exec_ms', action=action).record((time.time() - t_cmd) * 1000)
+
+            if parked:
+                continue
+
+            # --- FETCH DATA & PRICES (each at its own cadence) ---
+            now = time.time()
+            if scheduler.due('account', now):
+                acc_info = mt5.account_info()
             if acc_info:
-                # 1. Fetch Positions
-                positions = mt5.positions_get()
-                pos_list = []
-                if positions:
-                    for p in positions:
-                        pos_list.append({
-                            "ticket": p.ticket, "symbol": p.symbol, "volume": p.volume,
-                            "type": "BUY" if p.type == 0 else "SELL",
-                            "price_open": p.price_open, "price_current": p.price_current,
-                            "sl": p.sl, "tp": p.tp, "profit": p.profit,
-                            "account_name": acc_name, "account_login": login
-                        })
-
-                # 2. Fetch Orders
-                orders = mt5.orders_get()
-                ord_list = []
-                if orders:
-                    for o in orders:
-                        is_buy = o.type in [mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_BUY_STOP,
-                                            mt5.ORDER_TYPE_BUY_STOP_LIMIT]
-                        ord_list.append({
-                            "ticket": o.ticket, "symbol": o.symbol, "volume": o.volume_current,
-                            "type": "BUY" if is_buy else "SELL",
-                            "price_open": o.price_open, "sl": o.sl, "tp": o.tp, "account": acc_name
-                        })
-
-                # 3. Fetch Prices for ALL Watched Symbols
-                price_map = {}
-                for sym in watched_symbols:
-                    tick = mt5.symbol_info_tick(sym)
-                    if tick:
-                        price_map[sym] = {'bid': tick.bid, 'ask': tick.ask}
-
-                # Update Shared State
-                shared_dict[acc_id] = {
+                # 1. Fetch Positions & Orders
+                if scheduler.due('positions', now):
+                    positions = mt5.positions_get()
+                    pos_by_ticket = {p.ticket: p for p in (positions or [])}
+                    trailing.prune(pos_by_ticket)
+                    update_quote_schedule()
+                    pos_list = []
+                    if positions:
+                        for p in positions:
+                            pos_list.append({
+                                "ticket": p.ticket, "symbol": p.symbol, "volume": p.volume,
+                                "type": "BUY" if p.type == 0 else "SELL",
+                                "price_open": p.price_open, "price_current": p.price_current,
+                                "sl": p.sl, "tp": p.tp, "profit": p.profit, "trail": trailing.distance(p.ticket),
+                                "account_name": acc_name, "account_login": login
+                            })
+
+                    orders = mt5.orders_get()
+                    ord_list = []
+                    if orders:
+                        for o in orders:
+                            is_buy = o.type in [mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_BUY_STOP,
+                                                mt5.ORDER_TYPE_BUY_STOP_LIMIT]
+                            ord_list.append({
+                                "ticket": o.ticket, "symbol": o.symbol, "volume": o.volume_current,
+                                "type": "BUY" if is_buy else "SELL",
+                                "price_open": o.price_open, "sl": o.sl, "tp": o.tp, "account": acc_name
+                            })
+
+                # 2. Fetch Prices (feed worker: all watched symbols, others: live chart
+                #    and trailed symbols only)
+                if scheduler.due('quotes', now):
+                    price_map = {}
+                    ticks = {}
+                    for sym in (watched_symbols if is_feed else tick_symbols) | trailing.symbols():
+                        tick = mt5.symbol_info_tick(sym)
+                        if tick:
+                            ticks[sym] = tick
+                            if is_feed:
+                                # time_msc is broker-server time, 'ts' is comparable across servers
+                                seen = quote_seen.get(sym)
+                                if seen is None or seen[0] != tick.time_msc:
+                                    seen = quote_seen[sym] = (tick.time_msc, time.time())
+                                price_map[sym] = {'bid': tick.bid, 'ask': tick.ask, 'time_msc': tick.time_msc,
+                                                  'ts': seen[1]}
+                            if sym in tick_symbols and tick.time_msc != last_tick_msc.get(sym):
+                                last_tick_msc[sym] = tick.time_msc
+                                result_queue.put(('TICK', sym, tick.bid, tick.ask, tick.time_msc))
+
+                    # 3. Trailing stops react to the ticks we just read
+                    for ticket, new_sl in trailing.evaluate(ticks, now):
+                        pos = pos_by_ticket.get(ticket)
+                        if pos is None:
+                            continue
+                        spec = symbol_cache.get(pos.symbol)
+                        new_sl = round(new_sl, spec['digits'] if spec else 5)
+                        res = send_sltp(pos, {'sl': new_sl})
+                        if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+                            trailing.moved(ticket, new_sl, now)
+                            scheduler.mark_trade()
+                        else:
+                            # Back off for min_interval before retrying this ticket
+                            trailing.moved(ticket, pos.sl, now)
+
+                # Update Shared State (skipped by the writer when nothing changed)
+                t_write = time.time()
+                if snapshot.write({
                     'ID': acc_id, 'balance': acc_info.balance, 'equity': acc_info.equity,
                     'margin_free': acc_info.margin_free, 'positions': pos_list,
                     'orders': ord_list, 'prices': price_map, 'status': 'ONLINE'
-                }
+                }):
+                    metrics.histogram('snapshot_write_ms').record((time.time() - t_write) * 1000)
+                if first_snapshot:
+                    first_snapshot = False
+                    phase('first_snapshot')
             else:
                 # Lost connection to account
-                shared_dict[acc_id] = {'status': 'CONNECTING', 'error': 'Account Info Null'}
-
-            time.sleep(0.05)
+                snapshot.write({'ID': acc_id, 'status': 'CONNECTING', 'error': 'Account Info Null'})
 
     except Exception as e:
         logging.critical(f"[{acc_name}] CRASH: {e}")
-        shared_dict[acc_id] = {'status': 'CRASHED', 'error': str(e)}
+        snapshot.write({'ID': acc_id, 'status': 'CRASHED', 'error': str(e)})
+        phase('failed', str(e))
 
 
 # --- PROCESS MANAGER ---
-def start_worker_for_account(acc_data):
-    acc_id = str(acc_data['ID'])
-    if acc_id in WORKER_PROCESSES: return
-
-    logging.info(f"Spawning Worker for {acc_id}")
-    ACCOUNT_CONFIGS[acc_id] = acc_data.get('SYMBOL_CONFIG', {})
-
-    # --- FETCH GLOBAL SYMBOLS ---
-    # This ensures the worker watches all symbols in the dashboard watchlist
-    global_symbols = []
+def load_global_symbols():
+    """{symbol: TRAIL_AMOUNT} for every symbol in the dashboard watchlist."""
     try:
-        db = get_db()
-        docs = db.collection('SYMBOLS').stream()
-        global_symbols = [doc.id for doc in docs]
+        docs = db_manager.get_symbols()
+        return {sym: data.get('TRAIL_AMOUNT', 0.5) for sym, data in docs.items()}
     except Exception as e:
         logging.error(f"Failed to fetch global symbols: {e}")
-        global_symbols = ['XAUUSD'] # Fallback
-
-    q = Queue()
-    COMMAND_QUEUES[acc_id] = q
-    # Pass global_symbols to worker
-    p = Process(target=account_worker_loop, args=(acc_data, q, SHARED_DATA, RESPONSE_DICT, TRADE_RESULTS, global_symbols))
+        return {'XAUUSD': 0.5} # Fallback
+
+
+def start_workers(accounts):
+    """
+    Brings several accounts online at once: shared config is read once and every
+    worker is spawned before any of them finishes its MT5 login, so terminals
+    initialize in parallel. Progress is reported through 'worker_phase' events.
+    """
+    pending = [a for a in accounts if str(a['ID']) not in WORKER_PROCESSES]
+    if not pending:
+        return
+    global_symbols = load_global_symbols()
+    t0 = time.time()
+    for acc in pending:
+        start_worker_for_account(acc, global_symbols)
+    logging.info(f"Startup: spawned {len(pending)} workers in {(time.time() - t0) * 1000:.0f} ms")
+
+
+def spawn_worker(acc_id, acc_data, global_symbols=None):
+    # The worker watches all symbols in the dashboard watchlist,
+    # {symbol: TRAIL_AMOUNT}, the trailing engine uses the amount as its step
+    if global_symbols is None:
+        global_symbols = load_global_symbols()
+    if AGENTS is not None:
+        local = sum(isinstance(p, Process) for a, p in WORKER_PROCESSES.items() if a != acc_id)
+        if local >= LOCAL_WORKER_SLOTS:
+            return AGENTS.place(acc_id, acc_data, global_symbols, SNAPSHOTS.create(acc_id))
+    q = CommandQueue()
+    p = Process(target=account_worker_loop,
+                args=(acc_data, q, SNAPSHOTS.create(acc_id), RESULT_QUEUE, global_symbols))
     p.daemon = True
     p.start()
-    WORKER_PROCESSES[acc_id] = p
+    return p, q
+
 
+def start_worker_for_account(acc_data, global_symbols=None):
+    acc_id = str(acc_data['ID'])
+    with WORKERS_LOCK:
+        if acc_id in WORKER_PROCESSES: return
+
+        ACCOUNT_CONFIGS[acc_id] = acc_data.get('SYMBOL_CONFIG', {})
+        STARTUP.begin(acc_id)
+
+        warm, stale = WARM_POOL.take(acc_id, acc_data)
+        terminate_workers(stale)
+        if warm:
+            logging.info(f"Resuming parked worker for {acc_id}")
+            p, q = warm
+            q.put({'action': 'RESUME'})
+        else:
+            logging.info(f"Spawning Worker for {acc_id}")
+            p, q = spawn_worker(acc_id, acc_data, global_symbols)
 
-def stop_worker_for_account(acc_id):
+        COMMAND_QUEUES[acc_id] = q
+        WORKER_PROCESSES[acc_id] = p
+        SUPERVISOR.track(acc_id, acc_data)
+        if MARKET_FEEDS.add(acc_id, acc_data.get('SERVER')):
+            q.put({'action': 'SET_FEED', 'enabled': True})
+        refresh_tick_feed()
+
+
+def stop_worker_for_account(acc_id, acc_data=None):
+    """Stops an account's worker. With acc_data and a warm pool, parks it logged in instead."""
     acc_id = str(acc_id)
-    if acc_id in WORKER_PROCESSES:
-        p = WORKER_PROCESSES[acc_id]
+    with WORKERS_LOCK:
+        if acc_id not in WORKER_PROCESSES:
+            return
+        p = WORKER_PROCESSES.pop(acc_id)
+        q = COMMAND_QUEUES.pop(acc_id, None)
+        if acc_id in ACCOUNT_CONFIGS: del ACCOUNT_CONFIGS[acc_id] # Clean up
+        STARTUP.forget(acc_id)
+        SUPERVISOR.untrack(acc_id)
+        successor = MARKET_FEEDS.remove(acc_id)
+        if successor and successor in COMMAND_QUEUES:
+            COMMAND_QUEUES[successor].put({'action': 'SET_FEED', 'enabled': True})
+        refresh_tick_feed()
+
+        if acc_data is not None and WARM_POOL.size > 0 and p.is_alive():
+            # The parked worker publishes its own OFFLINE snapshot
+            q.put({'action': 'PARK'})
+            terminate_workers(WARM_POOL.park(acc_id, acc_data, p, q))
+            return
+
         p.terminate()
         p.join()
-        del WORKER_PROCESSES[acc_id]
-        if acc_id in COMMAND_QUEUES: del COMMAND_QUEUES[acc_id]
-        if acc_id in ACCOUNT_CONFIGS: del ACCOUNT_CONFIGS[acc_id] # Clean up
-        if acc_id in SHARED_DATA:
-            d = SHARED_DATA[acc_id]
+        if acc_id in SNAPSHOTS:
+            d = dict(SNAPSHOTS.read(acc_id))
             d['status'] = 'OFFLINE'
-            SHARED_DATA[acc_id] = d
+            # Nothing writes the segment anymore: free it, the OFFLINE state stays readable
+            SNAPSHOTS.release(acc_id, d)
+
+
+def release_idle_segments():
+    """Frees the segments of accounts no worker writes anymore, e.g. parked workers evicted from the pool."""
+    with WORKERS_LOCK:
+        for acc_id in SNAPSHOTS.segments():
+            if acc_id not in WORKER_PROCESSES and acc_id not in WARM_POOL:
+                SNAPSHOTS.release(acc_id, SNAPSHOTS.read(acc_id))
+
+
+def terminate_workers(workers):
+    for p, _ in workers:
+        p.terminate()
+        p.join()
+
+
+# --- SUPERVISOR ---
+def drain_pending(acc_id, q):
+    """
+    Empties a dead worker's queue. Returns the commands worth replaying; callers
+    waiting on the rest are answered with an error instead of a timeout.
+    """
+    replay = []
+    while True:
+        try:
+            cmd = q.get_nowait()
+        except Exception:
+            return replay
+        if cmd.get('action') in REPLAY_ACTIONS:
+            replay.append(cmd)
+        elif cmd.get('req_id'):
+            RESULT_QUEUE.put(('RESULT', cmd['req_id'], acc_id, f"Account {acc_id}: Error worker restarted"))
+
+
+def trail_commands(acc_id):
+    """TRAIL command restoring the trailing stops published in the account's last snapshot."""
+    items = [{'position': p['ticket'], 'enabled': True, 'distance': p['trail']}
+             for p in SNAPSHOTS.read(acc_id).get('positions', []) if p.get('trail')]
+    return [{'action': 'TRAIL', 'payload': {'items': items}}] if items else []
+
+
+def restart_worker(acc_id, reason):
+    with WORKERS_LOCK:
+        acc_data = SUPERVISOR.account_data(acc_id)
+        if acc_id not in WORKER_PROCESSES or acc_data is None:
+            return
+        logging.warning(f"Restarting worker {acc_id}: {reason}")
+        old_p, old_q = WORKER_PROCESSES[acc_id], COMMAND_QUEUES[acc_id]
+        if old_p.is_alive():
+            old_p.terminate()
+        old_p.join(timeout=5)
+
+        STARTUP.begin(acc_id)
+        p, q = spawn_worker(acc_id, acc_data)
+        for cmd in trail_commands(acc_id) + drain_pending(acc_id, old_q):
+            q.put(cmd)
+        WORKER_PROCESSES[acc_id], COMMAND_QUEUES[acc_id] = p, q
+        SUPERVISOR.track(acc_id, acc_data)
+
+        if MARKET_FEEDS.feeds().get(acc_data.get('SERVER')) == acc_id:
+            q.put({'action': 'SET_FEED', 'enabled': True})
+        with TICK_FEED_LOCK:
+            if TICK_FEED['acc'] == acc_id:
+                TICK_FEED['symbols'] = None  # Re-send WATCH_TICKS to the new process
+        refresh_tick_feed()
+    emit_to_owner('worker_restarted', {'ID': acc_id, 'reason': reason}, acc_id)
+
+
+def hand_over_feeds():
+    """A feed worker that isn't ONLINE polls no quotes, so its server's feed moves to one that is."""
+    with WORKERS_LOCK:
+        for old, new in MARKET_FEEDS.hand_over(set(SUPERVISOR.healthy())):
+            logging.warning(f"Quote feed moved from {old} (not ONLINE) to {new}")
+            if old in COMMAND_QUEUES:
+                COMMAND_QUEUES[old].put({'action': 'SET_FEED', 'enabled': False})
+            COMMAND_QUEUES[new].put({'action': 'SET_FEED', 'enabled': True})
+
+
+def supervisor_loop():
+    last_expire = 0
+    while True:
+        socketio.sleep(SUPERVISE_EVERY)
+        try:
+            procs = dict(WORKER_PROCESSES)
+            for acc_id, reason in SUPERVISOR.check(lambda a: a in procs and procs[a].is_alive()):
+                restart_worker(acc_id, reason)
+            hand_over_feeds()
+            refresh_tick_feed()
+            TRADE_JOBS.sweep()
+            if time.time() - last_expire > 30:
+                last_expire = time.time()
+                terminate_workers(WARM_POOL.expire())
+                release_idle_segments()
+        except Exception as e:
+            logging.error(f"Supervisor Error: {e}")
+
+
+# --- WORKER AGENTS ---
+def on_agent_lost(agent_id, acc_ids):
+    # Runs on the dispatcher thread. The relay has stopped writing these segments, and the
+    # workers now read as exited, so supervisor_loop restarts them on the remaining agents
+    for acc_id in acc_ids:
+        if acc_id in SNAPSHOTS:
+            d = dict(SNAPSHOTS.read(acc_id))
+            d.update(status='CONNECTING', error=f"Worker agent {agent_id} lost")
+            SNAPSHOTS.write(acc_id, d)
+    refresh_tick_feed()  # The live candle feed may have been one of them
+
+
+def on_agent_joined(agent_id):
+    socketio.start_background_task(place_waiting_accounts)
+
+
+def place_waiting_accounts():
+    """Accounts that found no free agent slot go to a new agent right away instead of after their backoff."""
+    socketio.sleep(AGENT_JOIN_SETTLE)
+    for acc_id in list(WORKER_PROCESSES):
+        with WORKERS_LOCK:
+            p = WORKER_PROCESSES.get(acc_id)
+            if isinstance(p, RemoteWorker) and p.agent_id is None:
+                restart_worker(acc_id, 'agent joined')
+
+
+def on_worker_metrics(acc_id, summary):
+    # Runs on the dispatcher thread
+    METRICS.merge(summary, account=acc_id)
+
+
+def collect_metrics():
+    """Gauges sampled at read time rather than recorded as they change."""
+    running = set(WORKER_PROCESSES)
+    for acc_id, q in list(COMMAND_QUEUES.items()):
+        if acc_id not in running:
+            continue
+        try:
+            METRICS.gauge('command_queue_depth', account=acc_id).set(q.qsize())
+        except NotImplementedError:
+            pass  # qsize() isn't available on macOS
+    METRICS.gauge('workers_running').set(len(running))
+    agents = AGENTS.status() if AGENTS is not None else {}
+    if AGENTS is not None:
+        METRICS.gauge('agents_connected').set(len(agents))
+    for agent_id, agent in agents.items():
+        METRICS.gauge('agent_accounts', agent=agent_id).set(len(agent['accounts']))
+    for acc_id, health in SUPERVISOR.status().items():
+        if acc_id in running:
+            METRICS.gauge('worker_restarts', account=acc_id).set(health['restarts'])
+            METRICS.gauge('worker_uptime_seconds', account=acc_id).set(health['uptime_s'])
+    # Stopped accounts and departed agents would otherwise export their last value forever
+    for name in ('command_queue_depth', 'worker_restarts', 'worker_uptime_seconds'):
+        METRICS.prune('gauge', name, 'account', running)
+    METRICS.prune('gauge', 'agent_accounts', 'agent', agents)
+
+
+def metrics_loop():
+    while True:
+        socketio.sleep(METRICS_EMIT_EVERY)
+        try:
+            collect_metrics()
+            socketio.emit('metrics', METRICS.as_dict(), to='metrics')
+        except Exception as e:
+            logging.error(f"Metrics Error: {e}")
+
+
+def on_worker_phase(acc_id, phase, ts, error):
+    # Runs on the dispatcher thread
+    entry = STARTUP.on_phase(acc_id, phase, ts, error)
+    if entry:
+        emit_to_owner('worker_phase', entry, acc_id)
+        if error:
+            logging.error(f"Worker {acc_id} failed at startup: {error}")
+
+
+# --- LIVE CANDLES ---
+def refresh_tick_feed():
+    """
+    Points a single feed worker at the symbols that charts are subscribed to. The
+    feed stays on an ONLINE worker, moving off one that stopped being healthy; any
+    running worker will do while none is ONLINE yet (startup).
+    """
+    procs = dict(WORKER_PROCESSES)
+    # A lost agent's workers still have a recent ONLINE heartbeat, but already read as exited
+    healthy = [a for a in SUPERVISOR.healthy() if a in COMMAND_QUEUES and a in procs and procs[a].is_alive()]
+    with TICK_FEED_LOCK:
+        symbols = LIVE_BARS.symbols()
+        prev = TICK_FEED['acc']
+        if prev in healthy or (not healthy and prev in COMMAND_QUEUES):
+            target = prev
+        else:
+            target = next(iter(healthy or COMMAND_QUEUES), None)
+        if prev and prev != target and prev in COMMAND_QUEUES:
+            COMMAND_QUEUES[prev].put({'action': 'WATCH_TICKS', 'symbols': []})
+        if target and (target != prev or symbols != TICK_FEED['symbols']):
+            COMMAND_QUEUES[target].put({'action': 'WATCH_TICKS', 'symbols': symbols})
+        TICK_FEED['acc'], TICK_FEED['symbols'] = target, symbols
+
+
+def on_worker_tick(symbol, bid, ask, time_msc):
+    # Runs on the dispatcher thread
+    for room, bar in LIVE_BARS.on_tick(symbol, bid, time_msc // 1000):
+        socketio.emit('candle_update', bar, to=room)
+
+
+def request_candles(symbol, timeframe, limit, timeout=3):
+    """
+    Asks the least busy healthy worker for candles. Returns the packed columns from
+    candles.pack_rates, empty if no worker is running or it times out.
+    """
+    queues = dict(COMMAND_QUEUES)
+    # Workers still starting up are only used when none is ONLINE yet
+    healthy = [a for a in SUPERVISOR.healthy() if a in queues]
+    target_acc = DATA_ROUTER.pick(healthy or list(queues))
+    if target_acc is None:
+        return pack_rates(None)
+
+    q = queues[target_acc]
+    req_id = str(uuid.uuid4())
+
+    cmd = {
+        'action': 'GET_CANDLES',
+        'req_id': req_id,
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'limit': limit
+    }
+    pending = DISPATCHER.register(req_id, [target_acc])
+    q.put(cmd)
+
+    # The dispatcher wakes us as soon as the worker replies
+    t0 = time.time()
+    try:
+        with DATA_ROUTER.track(target_acc):
+            if pending.wait(timeout):
+                METRICS.histogram('candles_request_ms', account=target_acc).record((time.time() - t0) * 1000)
+                return pending.results[target_acc]
+        METRICS.counter('candles_timeouts_total', account=target_acc).inc()
+        return pack_rates(None)
+    finally:
+        DISPATCHER.discard(req_id)
+
+
+def load_candles(symbol, timeframe, limit):
+    """
+    Serves candles from CANDLE_STORE, only asking the terminal for the bars that
+    are newer than what's cached (or a full `limit` when the series is cold).
+    """
+    if CANDLE_STORE is None:
+        return unpack_columns(request_candles(symbol, timeframe, limit))
+
+    need = CANDLE_STORE.bars_needed(symbol, timeframe, limit)
+    fresh = unpack_columns(request_candles(symbol, timeframe, need))
+    if not CANDLE_STORE.merge(symbol, timeframe, fresh, need, incremental=need < limit):
+        # Missed bars in between, fall back to a full fetch
+        fresh = unpack_columns(request_candles(symbol, timeframe, limit))
+        CANDLE_STORE.merge(symbol, timeframe, fresh, limit)
+    return CANDLE_STORE.tail(symbol, timeframe, limit)
 
 
 # --- BROADCASTER ---
+def build_dashboard_state(accounts, prices):
+    """Totals, positions, orders and exposure over `accounts` ({acc_id: snapshot})."""
+    total_bal = 0.0
+    total_eq = 0.0
+    total_margin_free = 0.0
+    all_positions = []
+    all_orders = []
+    active_count = 0
+
+    for acc_id, data in accounts.items():
+        if data.get('status') == 'ONLINE':
+            active_count += 1
+            total_bal += float(data.get('balance', 0))
+            total_eq += float(data.get('equity', 0))
+            total_margin_free += float(data.get('margin_free', 0))
+            all_positions.extend(data.get('positions', []))
+            all_orders.extend(data.get('orders', []))
+
+    t_exposure = time.time()
+    exposure = EXPOSURE.compute(accounts)
+    METRICS.histogram('exposure_ms').record((time.time() - t_exposure) * 1000)
+
+    return {
+        'balance': total_bal, 'equity': total_eq, 'margin_free': total_margin_free,
+        'profit': total_eq - total_bal, 'positions': all_positions, 'orders': all_orders,
+        'prices': prices, 'active_accounts': active_count, 'exposure': exposure
+    }
+
+
 def broadcast_loop():
+    # One payload per subscribed view (user / accounts / symbols), emitted to that view's room only
+    cycle = 0
     while True:
         try:
-            total_bal = 0.0
-            total_eq = 0.0
-            total_margin_free = 0.0
-            all_positions = []
-            all_orders = []
-            combined_prices = {}
-
-            data_snapshot = SHARED_DATA.copy()
-            active_count = 0
-
-            for acc_id, data in data_snapshot.items():
-                if data.get('status') == 'ONLINE':
-                    active_count += 1
-                    total_bal += float(data.get('balance', 0))
-                    total_eq += float(data.get('equity', 0))
-                    total_margin_free += float(data.get('margin_free', 0))
-                    all_positions.extend(data.get('positions', []))
-                    all_orders.extend(data.get('orders', []))
-
-                    # Merge Prices
-                    if 'prices' in data:
-                        combined_prices.update(data['prices'])
-
-            payload = {
-                'balance': total_bal, 'equity': total_eq, 'margin_free': total_margin_free,
-                'profit': total_eq - total_bal, 'positions': all_positions, 'orders': all_orders,
-                'prices': combined_prices, 'active_accounts': active_count
-            }
-            socketio.emit('dashboard_update', payload)
+            t_read = time.time()
+            data_snapshot = SNAPSHOTS.snapshot()
+            METRICS.histogram('snapshot_read_ms').record((time.time() - t_read) * 1000)
+
+            # Only feed workers publish prices; freshest quote wins when several servers quote the same symbol
+            combined_prices = merge_quotes([data['prices'] for data in data_snapshot.values()
+                                            if data.get('status') == 'ONLINE' and data.get('prices')])
+            EXPOSURE.prune(data_snapshot)
+
+            views, owners = DASHBOARD_ROOMS.views()
+            METRICS.gauge('dashboard_views').set(len(views))
+            for view in views:
+                t_build = time.time()
+                payload = build_dashboard_state(view.select(data_snapshot, owners), view.prices(combined_prices))
+                if BROADCAST_DELTA:
+                    payload = view.encoder.encode(payload)
+                t_emit = time.time()
+                METRICS.histogram('broadcast_build_ms').record((t_emit - t_build) * 1000)
+                if payload:
+                    frame = view.wire(payload)
+                    socketio.emit('dashboard_update', frame, to=view.room)
+                    METRICS.histogram('broadcast_emit_ms', encoding=view.encoding).record((time.time() - t_emit) * 1000)
+                    cycle += 1
+                    if cycle % PAYLOAD_SAMPLE_EVERY == 0:
+                        # Sampled, serializing the JSON payload twice every cycle isn't free
+                        size = len(frame) if isinstance(frame, bytes) else len(json.dumps(frame))
+                        METRICS.histogram('broadcast_payload_bytes', encoding=view.encoding).record(size)
             socketio.sleep(0.25)
         except Exception as e:
             logging.error(f"Broadcast Error: {e}")
             socketio.sleep(1)
 
 
+def emit_to_owner(event, data, acc_id):
+    # Account events go to the owning user's room once the owner is known
+    owner = DASHBOARD_ROOMS.owner(acc_id)
+    if owner is not None:
+        socketio.emit(event, data, to=user_room(owner))
+    else:
+        socketio.emit(event, data)
+
+
+# --- SOCKET EVENTS ---
+@socketio.on('subscribe_dashboard')
+def on_subscribe_dashboard(data):
+    # {token, accounts?: [ID], symbols?: [sym], encoding?: 'msgpack'}; a missing list means all of
+    # the user's accounts / every quote. Binary frames only if msgpack is installed, JSON otherwise.
+    # The user comes from the login token, never from the payload, so a socket only joins its own rooms.
+    data = data or {}
+    user_id = SESSIONS.user_for(data.get('token'))
+    if not user_id:
+        emit('session_expired')
+        return
+    DASHBOARD_ROOMS.set_owner(user_id, [acc['ID'] for acc in db_manager.get_accounts(user_id)])
+    prev_view = DASHBOARD_ROOMS.view_for(request.sid)
+    view, prev_room = DASHBOARD_ROOMS.subscribe(request.sid, user_id, data.get('accounts'), data.get('symbols'),
+                                                negotiate(data.get('encoding')))
+    if prev_room:
+        leave_room(prev_room)
+    if prev_view and prev_view.user_id != user_id:
+        leave_room(user_room(prev_view.user_id))
+    join_room(view.room)
+    join_room(user_room(user_id))
+    # New subscribers start from a keyframe, later frames are deltas against it
+    if BROADCAST_DELTA:
+        emit('dashboard_update', view.wire(view.encoder.keyframe()))
+
+
+@socketio.on('dashboard_resync')
+def on_dashboard_resync():
+    # Client saw a seq gap (dropped frame / reconnect)
+    view = DASHBOARD_ROOMS.view_for(request.sid)
+    if view and BROADCAST_DELTA:
+        emit('dashboard_update', view.wire(view.encoder.keyframe()))
+
+
+@socketio.on('disconnect')
+def on_disconnect():
+    DASHBOARD_ROOMS.unsubscribe(request.sid)
+    if LIVE_BARS.unsubscribe(request.sid):
+        refresh_tick_feed()
+
+
+@socketio.on('ping_server')
+def on_ping_server(client_ts=None):
+    # Round-trip probe (bench_load.py); the ack carries the server clock for one-way emit latency
+    return {'client_ts': client_ts, 'server_ts': time.time()}
+
+
+@socketio.on('subscribe_metrics')
+def on_subscribe_metrics(data=None):
+    # 'metrics' events every METRICS_EMIT_EVERY seconds until unsubscribed
+    if data is not None and data.get('enabled') is False:
+        leave_room('metrics')
+        return
+    join_room('metrics')
+    collect_metrics()
+    emit('metrics', METRICS.as_dict())
+
+
+@socketio.on('subscribe_candles')
+def on_subscribe_candles(data):
+    # One live chart per client; switching symbol/timeframe replaces the subscription
+    symbol = data.get('symbol', 'XAUUSD')
+    timeframe = data.get('timeframe', '1M')
+    room, prev_room, needs_seed = LIVE_BARS.subscribe(request.sid, symbol, timeframe)
+    if prev_room:
+        leave_room(prev_room)
+    join_room(room)
+    refresh_tick_feed()
+
+    if needs_seed:
+        bar = last_bar(request_candles(symbol, timeframe, 1))
+        if bar:
+            LIVE_BARS.seed(symbol, timeframe, bar)
+            emit('candle_update', dict(bar, symbol=symbol, timeframe=timeframe))
+
+
 # --- HELPER: USER ACCOUNT SYNC ---
 def sync_user_accounts(user_id):
     try:
-        db = get_db()
-        docs = db.collection('USERS').document(user_id).collection('ACCOUNTS').stream()
-        for doc in docs:
-            acc = dict(doc.to_dict(), ID=doc.id)
-            if acc.get('IS_ACTIVE'):
-                start_worker_for_account(acc)
+        accounts = db_manager.get_accounts(user_id)
+        DASHBOARD_ROOMS.set_owner(user_id, [acc['ID'] for acc in accounts])
+        start_workers([acc for acc in accounts if acc.get('IS_ACTIVE')])
     except Exception as e:
         logging.error(f"Sync User Accounts Error: {e}")
 
@@ -355,7 +1060,7 @@ def login():
         if user_doc.to_dict().get('PASS') == data.get('password'):
             logging.info(f"Login successful for {user_doc.id}")
             sync_user_accounts(user_doc.id)
-            return jsonify({"status": "success", "user_id": user_doc.id})
+            return jsonify({"status": "success", "user_id": user_doc.id, "token": SESSIONS.open(user_doc.id)})
         return jsonify({"error": "Invalid Password"}), 401
     except Exception as e:
         logging.error(f"Login Exception: {e}")
@@ -365,13 +1070,10 @@ def login():
 @app.route('/api/symbols', methods=['GET'])
 def get_symbols():
     try:
-        db = get_db()
-        docs = db.collection('SYMBOLS').stream()
         symbols = []
-        for doc in docs:
-            data = doc.to_dict()
+        for sym, data in db_manager.get_symbols().items():
             symbols.append({
-                "sym": doc.id,
+                "sym": sym,
                 "desc": data.get("DESC", ""),
                 "trail": data.get("TRAIL_AMOUNT", 0.5)
             })
@@ -385,33 +1087,20 @@ def get_candles():
     symbol = request.args.get('symbol', 'XAUUSD')
     timeframe = request.args.get('timeframe', '1M')
     limit = int(request.args.get('limit', 1000))
-
-    # Fail fast if no workers (Frontend will retry in 500ms)
-    if not COMMAND_QUEUES:
-        return jsonify([])
-
-    target_acc = list(COMMAND_QUEUES.keys())[0]
-    q = COMMAND_QUEUES[target_acc]
-    req_id = str(uuid.uuid4())
-
-    cmd = {
-        'action': 'GET_CANDLES',
-        'req_id': req_id,
-        'symbol': symbol,
-        'timeframe': timeframe,
-        'limit': limit
-    }
-    q.put(cmd)
-
-    # Wait max 3s (down from 8s) to prevent browser hang
-    start_t = time.time()
-    while time.time() - start_t < 3:
-        if req_id in RESPONSE_DICT:
-            data = RESPONSE_DICT.pop(req_id)
-            return jsonify(data)
-        time.sleep(0.01)  # Ultra-fast poll
-
-    return jsonify([])
+    # 'rows' (default): [{time, open, ...}], 'columns': {time: [...], open: [...], ...}
+    # Accept: application/x-msgpack gets binary little-endian columns instead (see wire_format)
+    layout = request.args.get('format', 'rows')
+    mimetype = candle_mimetype(request.accept_mimetypes)
+
+    # Fails fast with empty data if no workers (Frontend will retry in 500ms)
+    cols = load_candles(symbol, timeframe, limit)
+    if mimetype == MSGPACK_MIME:
+        body = pack_candles(cols)
+    else:
+        body = encode_columns_json(cols) if layout == 'columns' else encode_rows_json(cols)
+    resp = app.response_class(body, mimetype=mimetype)
+    resp.vary.add('Accept')
+    return resp
 
 
 @app.route('/api/trade', methods=['POST'])
@@ -430,10 +1119,12 @@ def place_trade():
     if is_limit:
         order_type = mt5.ORDER_TYPE_BUY_LIMIT if action == 'BUY' else mt5.ORDER_TYPE_SELL_LIMIT
 
-    active_accounts = [k for k, v in SHARED_DATA.items() if v.get('status') == 'ONLINE']
-    req_id = str(uuid.uuid4())
+    active_accounts = [k for k, v in SNAPSHOTS.items() if v.get('status') == 'ONLINE']
+    # An async client may pick the job id so it can match 'trade_result' events that beat the
+    # response; blocking requests always get a fresh one, a reused id would steal another's results
+    req_id = str((data.get('async') and data.get('job_id')) or uuid.uuid4())[:64]
 
-    dispatched_count = 0
+    commands = {}
     for acc_id in active_accounts:
         # --- VOLUME CALCULATION LOGIC ---
         base_vol = 0.01  # Default fallback
@@ -457,8 +1148,8 @@ def place_trade():
                 base_vol = float(rule)
 
         # Final Volume = Rule Volume * Dashboard Input (Multiplier)
-        final_vol = round(base_vol * multiplier, 2)
-        if final_vol < 0.01: final_vol = 0.01
+        # The worker snaps it to the symbol's volume_step / volume_min / volume_max
+        final_vol = base_vol * multiplier
 
         req = {
             "action": mt5.TRADE_ACTION_PENDING if is_limit else mt5.TRADE_ACTION_DEAL,
@@ -471,44 +1162,64 @@ def place_trade():
         }
 
         if acc_id in COMMAND_QUEUES:
-            COMMAND_QUEUES[acc_id].put({'action': 'TRADE', 'payload': req, 'req_id': req_id})
-            dispatched_count += 1
+            commands[acc_id] = {'action': 'TRADE', 'payload': req, 'req_id': req_id}
 
-    if dispatched_count == 0:
+    if not commands:
         return jsonify({"message": "No active accounts", "details": []})
 
-    # Wait for Results
-    results_list = []
-    start_wait = time.time()
-
-    while time.time() - start_wait < 10:
-        finished = True
-        current_batch_results = []
-        for acc_id in active_accounts:
-            key = f"{req_id}_{acc_id}"
-            if key in TRADE_RESULTS:
-                current_batch_results.append(TRADE_RESULTS[key])
-            else:
-                finished = False
-
-        if finished:
-            results_list = current_batch_results
-            for acc_id in active_accounts:
-                key = f"{req_id}_{acc_id}"
-                if key in TRADE_RESULTS: del TRADE_RESULTS[key]
-            break
-        time.sleep(0.1)
-
-    if not results_list:
-        for acc_id in active_accounts:
-            key = f"{req_id}_{acc_id}"
-            if key in TRADE_RESULTS:
-                results_list.append(TRADE_RESULTS[key])
-                del TRADE_RESULTS[key]
-            else:
-                results_list.append(f"Account {acc_id}: Timeout")
+    if data.get('async'):
+        # Returns right away, per-account results arrive as 'trade_result' events
+        dispatched_at = time.time()
+        # Events go to the user's own room (joined in subscribe_dashboard), never to a client-named sid
+        user_id = data.get('user_id')
+        if not TRADE_JOBS.start(TradeJob(req_id, commands, dispatched_at, user_room(user_id) if user_id else None)):
+            return jsonify({"error": "Duplicate job_id"}), 409
+        dispatch_trade(commands, dispatched_at)
+        return jsonify({"message": "Queued", "job_id": req_id, "accounts": list(commands)}), 202
+
+    # Register first, then fan out back-to-back; each worker pushes its result on RESULT_QUEUE
+    pending = DISPATCHER.register(req_id, commands.keys())
+    dispatched_at = time.time()
+    dispatch_trade(commands, dispatched_at)
+
+    # Wait for Results (returns as soon as the slowest account replies)
+    pending.wait(10)
+    DISPATCHER.discard(req_id)
+
+    report = build_trade_report(commands, pending.results, dispatched_at)
+    record_trade_metrics(report, dispatched_at)
+    return jsonify(dict(report, message="Done", blocked=False))
+
+
+def dispatch_trade(commands, dispatched_at):
+    for acc_id, cmd in commands.items():
+        cmd['dispatched_at'] = dispatched_at
+        COMMAND_QUEUES[acc_id].put(cmd)
+
+
+def emit_trade_event(event, data, job):
+    # Runs on the dispatcher thread (or the supervisor for timeouts)
+    if job.room:
+        socketio.emit(event, data, to=job.room)
+    else:
+        socketio.emit(event, data)
+    if data.get('done'):
+        record_trade_metrics(data, job.dispatched_at)
 
-    return jsonify({"message": "Done", "details": results_list, "blocked": False})
+
+def record_trade_metrics(report, dispatched_at):
+    METRICS.histogram('trade_request_ms').record((time.time() - dispatched_at) * 1000)
+    for timing in report['timings']:
+        if 'total_ms' in timing:
+            METRICS.histogram('trade_fill_ms', account=timing['account']).record(timing['total_ms'])
+
+
+@app.route('/api/trade/<job_id>', methods=['GET'])
+def get_trade_job(job_id):
+    job = TRADE_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.status())
 
 
 @app.route('/api/modify', methods=['POST'])
@@ -518,45 +1229,19 @@ def modify_trade():
     sl = float(data.get('sl')) if data.get('sl') is not None else None
     tp = float(data.get('tp')) if data.get('tp') is not None else None
 
-    data_snapshot = SHARED_DATA.copy()
-    targets = []  # List of { acc_id, real_ticket }
-
-    # 1. Try Finding Exact Ticket Match First
-    found_exact = False
-    for acc_id, acc_data in data_snapshot.items():
-        for pos in acc_data.get('positions', []):
-            if str(pos['ticket']) == str(ticket):
-                targets.append({'acc': acc_id, 'ticket': pos['ticket']})
-                found_exact = True
-                break
-        if found_exact: break
-
-    # 2. If not exact, check for Master Ticket (Group)
-    if not found_exact and isinstance(ticket, str) and "_" in ticket:
-        # Expected format: "SYMBOL_TYPE" (e.g. XAUUSD_BUY)
-        try:
-            parts = ticket.split('_')
-            sym = parts[0]
-            p_type = parts[1]  # "BUY" or "SELL"
-
-            for acc_id, acc_data in data_snapshot.items():
-                for pos in acc_data.get('positions', []):
-                    if pos['symbol'] == sym and pos['type'] == p_type:
-                        targets.append({'acc': acc_id, 'ticket': pos['ticket']})
-        except:
-            pass
-
+    # Exact ticket, else Master Ticket (Group) "SYMBOL_TYPE"
+    targets = POSITION_INDEX.resolve_positions(ticket)
     if not targets:
         return jsonify({"error": "Position not found"}), 404
 
     # Dispatch to all targets
-    for t in targets:
-        cmd = {'action': 'MODIFY', 'payload': {'position': t['ticket']}}
+    for acc_id, real_ticket in targets:
+        cmd = {'action': 'MODIFY', 'payload': {'position': real_ticket}}
         if sl is not None: cmd['payload']['sl'] = sl
         if tp is not None: cmd['payload']['tp'] = tp
 
-        if t['acc'] in COMMAND_QUEUES:
-            COMMAND_QUEUES[t['acc']].put(cmd)
+        if acc_id in COMMAND_QUEUES:
+            COMMAND_QUEUES[acc_id].put(cmd)
 
     return jsonify({"status": "queued", "count": len(targets)})
 
@@ -566,40 +1251,121 @@ def close_trade():
     data = request.json
     ticket = data.get('ticket')
 
-    data_snapshot = SHARED_DATA.copy()
-    targets = []
+    # Exact ticket, else Master Group "SYMBOL_TYPE"
+    targets = POSITION_INDEX.resolve_positions(ticket)
+    if not targets:
+        return jsonify({"error": "Position not found"}), 404
 
-    # 1. Exact Match
-    found_exact = False
-    for acc_id, acc_data in data_snapshot.items():
-        for pos in acc_data.get('positions', []):
-            if str(pos['ticket']) == str(ticket):
-                targets.append({'acc': acc_id, 'ticket': pos['ticket']})
-                found_exact = True
-                break
-        if found_exact: break
+    for acc_id, real_ticket in targets:
+        if acc_id in COMMAND_QUEUES:
+            COMMAND_QUEUES[acc_id].put({'action': 'CLOSE', 'payload': {'position': real_ticket}})
 
-    # 2. Master Group Match
-    if not found_exact and isinstance(ticket, str) and "_" in ticket:
-        try:
-            parts = ticket.split('_')
-            sym = parts[0]
-            p_type = parts[1]
-            for acc_id, acc_data in data_snapshot.items():
-                for pos in acc_data.get('positions', []):
-                    if pos['symbol'] == sym and pos['type'] == p_type:
-                        targets.append({'acc': acc_id, 'ticket': pos['ticket']})
-        except:
-            pass
+    return jsonify({"status": "queued", "count": len(targets)})
 
-    if not targets:
+
+def _batch_targets(data):
+    """
+    Batch body -> {acc_id: [(real_ticket, item)]}. Accepts 'items' ([{ticket, sl?, tp?}])
+    and/or 'tickets' / 'group' (tickets or "SYMBOL_TYPE" keys sharing the top-level sl/tp).
+    """
+    shared = {k: float(data[k]) for k in ('sl', 'tp') if data.get(k) is not None}
+    items = [dict(shared, ticket=t) for t in data.get('tickets', [])]
+    if data.get('group'):
+        items.append(dict(shared, ticket=data['group']))
+    for item in data.get('items', []):
+        items.append(dict({k: float(item[k]) for k in ('sl', 'tp') if item.get(k) is not None},
+                          ticket=item.get('ticket')))
+
+    by_account = {}
+    seen = set()
+    for item in items:
+        for acc_id, real_ticket in POSITION_INDEX.resolve_positions(item['ticket']):
+            if (acc_id, real_ticket) in seen:
+                continue
+            seen.add((acc_id, real_ticket))
+            by_account.setdefault(acc_id, []).append((real_ticket, item))
+    return by_account
+
+
+@app.route('/api/modify/batch', methods=['POST'])
+def modify_trade_batch():
+    by_account = _batch_targets(request.json)
+    if not by_account:
         return jsonify({"error": "Position not found"}), 404
 
-    for t in targets:
-        if t['acc'] in COMMAND_QUEUES:
-            COMMAND_QUEUES[t['acc']].put({'action': 'CLOSE', 'payload': {'position': t['ticket']}})
+    # One MODIFY_BATCH per account, the worker handles it with a single positions_get()
+    count = 0
+    for acc_id, targets in by_account.items():
+        batch = []
+        for real_ticket, item in targets:
+            entry = {'position': real_ticket}
+            entry.update({k: item[k] for k in ('sl', 'tp') if k in item})
+            batch.append(entry)
+        if acc_id in COMMAND_QUEUES:
+            COMMAND_QUEUES[acc_id].put({'action': 'MODIFY_BATCH', 'payload': {'items': batch}})
+            count += len(batch)
 
-    return jsonify({"status": "queued", "count": len(targets)})
+    return jsonify({"status": "queued", "count": count, "accounts": len(by_account)})
+
+
+@app.route('/api/close/batch', methods=['POST'])
+def close_trade_batch():
+    by_account = _batch_targets(request.json)
+    if not by_account:
+        return jsonify({"error": "Position not found"}), 404
+
+    count = 0
+    for acc_id, targets in by_account.items():
+        if acc_id in COMMAND_QUEUES:
+            tickets = [real_ticket for real_ticket, _ in targets]
+            COMMAND_QUEUES[acc_id].put({'action': 'CLOSE_BATCH', 'payload': {'positions': tickets}})
+            count += len(tickets)
+
+    return jsonify({"status": "queued", "count": count, "accounts": len(by_account)})
+
+
+@app.route('/api/modify/step', methods=['POST'])
+def modify_trade_step():
+    """Moves SL or TP by `delta` from each position's current level, computed in the worker."""
+    data = request.json
+    field = str(data.get('type', 'SL')).lower()
+    delta = float(data.get('delta', 0))
+    if field not in ('sl', 'tp') or delta == 0:
+        return jsonify({"error": "Invalid step"}), 400
+
+    by_account = _batch_targets(data)
+    if not by_account:
+        return jsonify({"error": "Position not found"}), 404
+
+    for acc_id, targets in by_account.items():
+        items = [{'position': real_ticket, 'field': field, 'delta': delta} for real_ticket, _ in targets]
+        if acc_id in COMMAND_QUEUES:
+            COMMAND_QUEUES[acc_id].put({'action': 'STEP_ADJUST', 'payload': {'items': items}})
+
+    return jsonify({"status": "queued", "count": sum(len(t) for t in by_account.values())})
+
+
+@app.route('/api/trail', methods=['POST'])
+def set_trailing():
+    """
+    Turns the worker-side trailing stop on/off for tickets or a group. Optional
+    'distance' (price units behind the market) and 'step' (minimum SL move).
+    """
+    data = request.json
+    by_account = _batch_targets(data)
+    if not by_account:
+        return jsonify({"error": "Position not found"}), 404
+
+    item = {'enabled': bool(data.get('enabled', True))}
+    for k in ('distance', 'step'):
+        if data.get(k) is not None:
+            item[k] = float(data[k])
+    for acc_id, targets in by_account.items():
+        items = [dict(item, position=real_ticket) for real_ticket, _ in targets]
+        if acc_id in COMMAND_QUEUES:
+            COMMAND_QUEUES[acc_id].put({'action': 'TRAIL', 'payload': {'items': items}})
+
+    return jsonify({"status": "queued", "count": sum(len(t) for t in by_account.values())})
 
 
 @app.route('/api/order/modify', methods=['POST'])
@@ -609,18 +1375,11 @@ def modify_order():
     price = float(data.get('price', 0))
     sl = float(data.get('sl', 0))
     tp = float(data.get('tp', 0))
-    target_acc = None
-    real_ticket = ticket
-    data_snapshot = SHARED_DATA.copy()
-    for acc_id, acc_data in data_snapshot.items():
-        for order in acc_data.get('orders', []):
-            if str(order['ticket']) == str(ticket):
-                target_acc = acc_id
-                real_ticket = order['ticket']
-                break
-    if target_acc:
+    targets = [t for t in POSITION_INDEX.resolve_orders(ticket) if t[0] in COMMAND_QUEUES]
+    for target_acc, real_ticket in targets:
         req = {"order": real_ticket, "price": price, "sl": sl, "tp": tp}
         COMMAND_QUEUES[target_acc].put({'action': 'ORDER_MODIFY', 'payload': req})
+    if targets:
         return jsonify({"success": True})
     return jsonify({"success": False, "message": "Order not found"})
 
@@ -629,34 +1388,44 @@ def modify_order():
 def cancel_order():
     data = request.json
     ticket = data.get('ticket')
-    target_acc = None
-    real_ticket = ticket
-    data_snapshot = SHARED_DATA.copy()
-    for acc_id, acc_data in data_snapshot.items():
-        for order in acc_data.get('orders', []):
-            if str(order['ticket']) == str(ticket):
-                target_acc = acc_id
-                real_ticket = order['ticket']
-                break
-    if target_acc:
+    targets = [t for t in POSITION_INDEX.resolve_orders(ticket) if t[0] in COMMAND_QUEUES]
+    for target_acc, real_ticket in targets:
         req = {"order": real_ticket}
         COMMAND_QUEUES[target_acc].put({'action': 'ORDER_CANCEL', 'payload': req})
+    if targets:
         return jsonify({"success": True})
     return jsonify({"success": False, "message": "Order not found"})
 
 
+@app.route('/api/startup', methods=['GET'])
+def get_startup_status():
+    return jsonify(STARTUP.status())
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    collect_metrics()
+    return Response(METRICS.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/workers/health', methods=['GET'])
+def get_worker_health():
+    return jsonify(SUPERVISOR.status())
+
+
+@app.route('/api/agents', methods=['GET'])
+def get_agents():
+    return jsonify(AGENTS.status() if AGENTS is not None else {})
+
+
 @app.route('/api/accounts', methods=['GET', 'POST'])
 def manage_accounts():
-    db = get_db()
     if request.method == 'GET':
         user_id = request.args.get('user_id')
         if not user_id: return jsonify([])
         try:
-            docs = db.collection('USERS').document(user_id).collection('ACCOUNTS').stream()
-            accs = [dict(d.to_dict(), ID=d.id) for d in docs]
-            for acc in accs:
-                if acc.get('IS_ACTIVE') and str(acc['ID']) not in WORKER_PROCESSES:
-                    start_worker_for_account(acc)
+            accs = db_manager.get_accounts(user_id)
+            start_workers([acc for acc in accs if acc.get('IS_ACTIVE')])
             return jsonify(accs)
         except Exception as e:
             return jsonify([])
@@ -665,7 +1434,8 @@ def manage_accounts():
         user_id = data.get('user_id')
         doc_id = data.get('ID') or str(uuid.uuid4())
         data['ID'] = doc_id
-        db.collection('USERS').document(user_id).collection('ACCOUNTS').document(doc_id).set(data)
+        db_manager.save_account(user_id, doc_id, data)
+        DASHBOARD_ROOMS.set_owner(user_id, [acc['ID'] for acc in db_manager.get_accounts(user_id)])
         if data.get('IS_ACTIVE'):
             start_worker_for_account(data)
         return jsonify({"status": "saved", "id": doc_id})
@@ -676,8 +1446,11 @@ def delete_account():
     data = request.json
     user_id = data.get('user_id')
     acc_id = str(data.get('ID'))
-    get_db().collection('USERS').document(user_id).collection('ACCOUNTS').document(acc_id).delete()
+    db_manager.delete_account(user_id, acc_id)
+    DASHBOARD_ROOMS.set_owner(user_id, [acc['ID'] for acc in db_manager.get_accounts(user_id)])
     stop_worker_for_account(acc_id)
+    terminate_workers(WARM_POOL.discard(acc_id))
+    SNAPSHOTS.release(acc_id)
     return jsonify({"status": "deleted"})
 
 
@@ -687,14 +1460,14 @@ def toggle_account():
     user_id = data.get('user_id')
     acc_id = str(data.get('ID'))
     is_active = data.get('IS_ACTIVE')
-    get_db().collection('USERS').document(user_id).collection('ACCOUNTS').document(acc_id).update(
-        {'IS_ACTIVE': is_active})
+    db_manager.update_account(user_id, acc_id, {'IS_ACTIVE': is_active})
+    DASHBOARD_ROOMS.set_owner(user_id, [acc['ID'] for acc in db_manager.get_accounts(user_id)])
     if is_active:
-        doc = get_db().collection('USERS').document(user_id).collection('ACCOUNTS').document(acc_id).get()
-        if doc.exists:
-            start_worker_for_account(dict(doc.to_dict(), ID=doc.id))
+        acc = db_manager.get_account(user_id, acc_id)
+        if acc:
+            start_worker_for_account(acc)
     else:
-        stop_worker_for_account(acc_id)
+        stop_worker_for_account(acc_id, db_manager.get_account(user_id, acc_id))
     return jsonify({"status": "updated"})
 
 
@@ -702,12 +1475,37 @@ if __name__ == '__main__':
     multiprocessing.freeze_support()
     print("Starting Multi-Process Backend (Auto-Fill Fixed)...")
 
-    manager = Manager()
-    SHARED_DATA = manager.dict()
-    RESPONSE_DICT = manager.dict()
-    TRADE_RESULTS = manager.dict()
+    atexit.register(SNAPSHOTS.close)
+    atexit.register(lambda: terminate_workers(WARM_POOL.drain()))
+    atexit.register(db_manager.close_caches)
+    CANDLE_STORE = CandleStore('candle_cache.db')
+    atexit.register(CANDLE_STORE.close)
+    RESULT_QUEUE = Queue()
+    # Under a green server the queue read runs on a real OS thread so it can't stall the hub
+    DISPATCHER = ResultDispatcher(RESULT_QUEUE, get=server_runtime.offload(RESULT_QUEUE.get))
+    DISPATCHER.on('TICK', on_worker_tick)
+    DISPATCHER.on('PHASE', on_worker_phase)
+    DISPATCHER.on('HEARTBEAT', SUPERVISOR.on_heartbeat)
+    DISPATCHER.on('METRICS', on_worker_metrics)
+    TRADE_JOBS = TradeJobs(DISPATCHER, emit_trade_event)
+    DISPATCHER.start()
+
+    if AGENT_PORT:
+        agent_key = os.environ.get('FINWIZ_AGENT_KEY')
+        if not agent_key:
+            sys.exit("FINWIZ_AGENT_PORT needs FINWIZ_AGENT_KEY, the key worker agents authenticate with")
+        if not is_loopback(AGENT_BIND) and not AGENT_ALLOW_REMOTE:
+            sys.exit(f"Refusing to listen for agents on {AGENT_BIND}: agent traffic is not encrypted. Tunnel "
+                     f"agents to 127.0.0.1 over SSH / TLS, or set FINWIZ_AGENT_ALLOW_REMOTE=1 on a trusted network")
+        AGENTS = AgentHub((AGENT_BIND, AGENT_PORT), agent_key.encode(), on_lost=on_agent_lost,
+                          on_join=on_agent_joined)
+        # Agent results and snapshots reach us the way local workers' do: RESULT_QUEUE and shared memory
+        DISPATCHER.on('AGENT', AGENTS.on_event)
+        AGENTS.start(RESULT_QUEUE)
 
     socketio.start_background_task(broadcast_loop)
+    socketio.start_background_task(supervisor_loop)
+    socketio.start_background_task(metrics_loop)
 
-    print("Server Listening on 5000...")
+    print(f"Server Listening on 5000 ({server_runtime.SERVER_MODE})...")
     socketio.run(app, debug=False, port=5000, allow_unsafe_werkzeug=True)
\ No newline at end of file
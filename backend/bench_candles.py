@@ -0,0 +1,81 @@
+"""
+GET_CANDLES serialization benchmark: legacy per-bar dict loop vs the columnar path.
+
+Covers everything between copy_rates_from_pos() returning and the JSON body being
+ready: worker-side conversion, pickling across the process boundary, and encoding
+in the Flask process.
+
+    python bench_candles.py [limit ...]
+"""
+import sys
+import json
+import pickle
+import timeit
+import numpy as np
+
+from candles import pack_rates, unpack_columns, encode_rows_json, encode_columns_json
+
+# Same record layout MetaTrader5.copy_rates_from_pos returns
+MT5_RATES_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                            ('close', '<f8'), ('tick_volume', '<u8'), ('spread', '<i4'),
+                            ('real_volume', '<u8')])
+
+
+def make_rates(n, seed=1):
+    rng = np.random.default_rng(seed)
+    rates = np.zeros(n, dtype=MT5_RATES_DTYPE)
+    close = 2000 + np.cumsum(rng.normal(0, 0.5, n))
+    rates['time'] = 1_700_000_000 + np.arange(n) * 60
+    rates['open'] = np.round(np.roll(close, 1), 2)
+    rates['close'] = np.round(close, 2)
+    rates['high'] = np.maximum(rates['open'], rates['close']) + 0.25
+    rates['low'] = np.minimum(rates['open'], rates['close']) - 0.25
+    return rates
+
+
+def legacy(rates):
+    result = []
+    for r in rates:
+        result.append({"time": int(r['time']), "open": float(r['open']), "high": float(r['high']),
+                       "low": float(r['low']), "close": float(r['close'])})
+    wire = pickle.dumps(result)
+    return json.dumps(pickle.loads(wire)), len(wire)
+
+
+def columnar_rows(rates):
+    wire = pickle.dumps(pack_rates(rates))
+    return encode_rows_json(unpack_columns(pickle.loads(wire))), len(wire)
+
+
+def columnar_columns(rates):
+    wire = pickle.dumps(pack_rates(rates))
+    return encode_columns_json(unpack_columns(pickle.loads(wire))), len(wire)
+
+
+def bench(fn, rates, repeat=5):
+    number = max(1, 20000 // len(rates))
+    best = min(timeit.repeat(lambda: fn(rates), number=number, repeat=repeat)) / number
+    body, wire = fn(rates)
+    return best * 1000, wire, len(body)
+
+
+def main():
+    limits = [int(a) for a in sys.argv[1:]] or [2, 500, 2000, 10000]
+    cases = [('legacy loop', legacy), ('columnar rows', columnar_rows), ('columnar cols', columnar_columns)]
+
+    # Same bars must come out of both row encoders
+    rates = make_rates(100)
+    assert json.loads(legacy(rates)[0]) == json.loads(columnar_rows(rates)[0])
+
+    print(f"{'limit':>7} {'path':<15} {'ms/request':>11} {'ipc bytes':>10} {'json bytes':>11} {'speedup':>8}")
+    for limit in limits:
+        rates = make_rates(limit)
+        base = None
+        for name, fn in cases:
+            ms, wire, body = bench(fn, rates)
+            base = base or ms
+            print(f"{limit:>7} {name:<15} {ms:>11.3f} {wire:>10} {body:>11} {base / ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+"""
+End-to-end load benchmark on the simulated terminal (sim_terminal) and the local
+Firestore stub (local_firestore), so it runs on any box without MT5 or credentials.
+
+Starts app.py with N accounts x M symbols x K positions, logs in, waits for every
+worker to publish its first snapshot, then drives /api/candles, /api/modify and
+/api/trade while listening to the Socket.IO dashboard stream. Reports throughput,
+p50/p99 latency per endpoint, Socket.IO ack / emit latency and CPU/memory per process.
+
+    python bench_load.py [--accounts 4] [--symbols 5] [--positions 10] [--requests 100]
+                         [--concurrency 4] [--latency-ms 20,5] [--json out.json]
+                         [--server threading,gevent,eventlet] [--clients 1] [--encoding json|msgpack]
+                         [--agents 0] [--kill-agent]
+
+--server runs the whole benchmark once per server mode (FINWIZ_SERVER, see
+server_runtime.py) and prints a side-by-side comparison.
+
+--agents N runs the accounts on N local worker agents (worker_agent.py) instead
+of the server's own processes; --kill-agent then kills the first agent and its
+workers after the load phases and times how long the server takes to bring
+every account back ONLINE on the others.
+
+Needs the backend's own dependencies; psutil (process stats) and python-socketio
+(stream stats) are optional.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import tempfile
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Histogram
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import socketio
+except ImportError:
+    socketio = None
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_URL = 'http://127.0.0.1:5000'
+AGENT_PORT, AGENT_KEY = 5100, 'bench'
+USER_ID, MOBILE, PASSWORD = 'bench', '0000000000', 'bench'
+
+
+# --- SETUP ---
+def make_fixture(accounts, symbols, servers):
+    watchlist = ['XAUUSD'] + [f"SIM{i:03d}" for i in range(1, symbols + 1)]
+    accs = {}
+    for i in range(1, accounts + 1):
+        accs[f"acc{i}"] = {
+            'NAME': f"Bench {i}", 'USER': 100000 + i, 'PASS': 'x', 'SERVER': f"Sim-Server-{i % servers}",
+            'IS_ACTIVE': True, 'SYMBOL_CONFIG': {s: {'VOLUME': 0.01} for s in watchlist}
+        }
+    return {
+        'USERS': {USER_ID: {'MOBILE': MOBILE, 'PASS': PASSWORD, '__collections__': {'ACCOUNTS': accs}}},
+        'SYMBOLS': {s: {'DESC': f"{s} (simulated)", 'TRAIL_AMOUNT': 0.5} for s in watchlist}
+    }, watchlist
+
+
+def http(method, path, payload=None, timeout=30):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(BASE_URL + path, data=data, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.read()
+
+
+def wait_for(check, timeout, interval=0.25):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if check():
+                return True
+        except Exception:
+            pass
+        time.sleep(interval)
+    return False
+
+
+# --- LOAD ---
+def run_phase(name, calls, concurrency):
+    """Runs the callables with `concurrency` threads, returns a result row."""
+    hist, errors = Histogram(), 0
+
+    def timed(call):
+        t0 = time.perf_counter()
+        try:
+            call()
+            return (time.perf_counter() - t0) * 1000, None
+        except Exception as e:
+            return (time.perf_counter() - t0) * 1000, e
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ms, err in pool.map(timed, calls):
+            hist.record(ms)
+            errors += err is not None
+    elapsed = time.perf_counter() - t_start
+    return {'phase': name, 'requests': len(calls), 'errors': errors, 'seconds': elapsed,
+            'rps': len(calls) / elapsed if elapsed else 0.0, 'p50_ms': hist.percentile(0.5),
+            'p99_ms': hist.percentile(0.99), 'max_ms': hist.max}
+
+
+class StreamStats:
+    """
+    `clients` Socket.IO connections counting dashboard_update frames (inter-arrival
+    gaps from the first one), plus a probe that pings the server every PROBE_EVERY
+    seconds: ack round trip, and one-way emit latency from the server's clock.
+    """
+
+    PROBE_EVERY = 0.05
+
+    def __init__(self, clients=1, encoding='json'):
+        self.n_clients = clients
+        self.encoding = encoding
+        self.clients = []
+        self.frames = 0
+        self.bytes = 0
+        self.gaps = Histogram()
+        self.ack_rtt = Histogram()
+        self.emit_latency = Histogram()
+        self.probe_errors = 0
+        self._last = None
+        self._probing = False
+        self._probe = None
+
+    def start(self, token):
+        if socketio is None:
+            return False
+        try:
+            for i in range(self.n_clients):
+                client = socketio.Client()
+                client.on('dashboard_update', self._on_frame if i == 0 else (lambda frame: None))
+                client.connect(BASE_URL, transports=['websocket'])
+                client.emit('subscribe_dashboard', {'token': token, 'encoding': self.encoding})
+                self.clients.append(client)
+        except Exception as e:
+            print(f"stream: could not connect ({e})")
+            self.stop()
+            return False
+        self._probing = True
+        self._probe = threading.Thread(target=self._probe_loop, daemon=True)
+        self._probe.start()
+        return True
+
+    def _on_frame(self, frame):
+        now = time.perf_counter()
+        if self._last is not None:
+            self.gaps.record((now - self._last) * 1000)
+        self._last = now
+        self.frames += 1
+        self.bytes += len(frame) if isinstance(frame, bytes) else len(json.dumps(frame, separators=(',', ':')))
+
+    def _probe_loop(self):
+        client = self.clients[0]
+        while self._probing:
+            t0 = time.time()
+            try:
+                ack = client.call('ping_server', t0, timeout=5)
+                t1 = time.time()
+                self.ack_rtt.record((t1 - t0) * 1000)
+                # Same host, same clock: server_ts -> receipt is the emit leg alone
+                self.emit_latency.record(max(0.0, (t1 - ack['server_ts']) * 1000))
+            except Exception:
+                self.probe_errors += 1
+            time.sleep(self.PROBE_EVERY)
+
+    def stop(self):
+        self._probing = False
+        if self._probe:
+            self._probe.join(6)
+        for client in self.clients:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+        self.clients = []
+
+
+def process_tree(server):
+    if psutil is None:
+        return []
+    root = psutil.Process(server.pid)
+    return [root] + root.children(recursive=True)
+
+
+def start_agents(n, slots, env, workdir):
+    # Own session per agent so --kill-agent can take down its workers too, like a lost host
+    return [subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'worker_agent.py'),
+                              '--backend', f"127.0.0.1:{AGENT_PORT}", '--slots', str(slots), '--name', f"agent{i}"],
+                             cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                             start_new_session=True) for i in range(n)]
+
+
+def stop_agent(agent, sig=signal.SIGINT, wait=10):
+    try:
+        os.killpg(agent.pid, sig)
+        agent.wait(wait)
+    except subprocess.TimeoutExpired:
+        os.killpg(agent.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def agents_settled(accounts, gone):
+    """Every account placed on a surviving agent and ONLINE again."""
+    agents = json.loads(http('GET', '/api/agents'))
+    placed = sum(len(a['accounts']) for name, a in agents.items() if name != gone)
+    health = json.loads(http('GET', '/api/workers/health'))
+    return gone not in agents and placed == accounts and all(h['status'] == 'ONLINE' for h in health.values())
+
+
+def kill_agent(args, agents):
+    """Kills agent0 with its workers, returns seconds until the server has every account ONLINE elsewhere."""
+    before = json.loads(http('GET', '/api/agents'))
+    moved = len(before.get('agent0', {}).get('accounts', []))
+    t0 = time.time()
+    stop_agent(agents[0], signal.SIGKILL)
+    settled = wait_for(lambda: agents_settled(args.accounts, 'agent0'), 60)
+    failover = time.time() - t0 if settled else None
+    print(f"Failover: {moved} accounts moved off agent0 in {failover:.2f}s" if settled
+          else "Failover: accounts did not all come back within 60s")
+    return {'accounts_moved': moved, 'failover_s': failover}
+
+
+def cpu_seconds(procs):
+    usage = {}
+    for p in procs:
+        try:
+            t = p.cpu_times()
+            usage[p.pid] = t.user + t.system
+        except psutil.Error:
+            pass
+    return usage
+
+
+# --- RUN ---
+def run_bench(args, mode):
+    """One full benchmark against a fresh server in `mode`, returns the results dict."""
+    workdir = tempfile.mkdtemp(prefix='finwiz_bench_')
+    fixture, watchlist = make_fixture(args.accounts, args.symbols, args.servers)
+    fixture_path = os.path.join(workdir, 'fixture.json')
+    with open(fixture_path, 'w') as f:
+        json.dump(fixture, f)
+
+    env = dict(os.environ, FINWIZ_MT5='sim', FINWIZ_DB='local', FINWIZ_DB_FIXTURE=fixture_path,
+               FINWIZ_SIM_SYMBOLS=str(args.symbols), FINWIZ_SIM_POSITIONS=str(args.positions),
+               FINWIZ_SIM_LATENCY_MS=args.latency_ms, FINWIZ_SERVER=mode)
+    if args.agents:
+        env.update(FINWIZ_AGENT_PORT=str(AGENT_PORT), FINWIZ_AGENT_KEY=AGENT_KEY)
+    # Run from a scratch dir so debug.log / candle_cache.db don't touch the repo
+    server = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'app.py')], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # Slots for every account on each agent, so the survivors can take over a killed agent's share
+    agents = start_agents(args.agents, args.accounts, env, workdir)
+    stream = StreamStats(args.clients, args.encoding)
+    results = {'server': mode, 'config': vars(args), 'phases': [], 'processes': []}
+    print(f"--- server mode: {mode} ---")
+    try:
+        if not wait_for(lambda: http('GET', '/api/symbols'), 30):
+            sys.exit("Server did not come up (see debug.log in " + workdir + ")")
+
+        t0 = time.time()
+        token = json.loads(http('POST', '/api/login', {'mobile': MOBILE, 'password': PASSWORD}))['token']
+        ready = wait_for(lambda: json.loads(http('GET', '/api/startup'))['ready'] == args.accounts, 120)
+        results['startup_s'] = time.time() - t0 if ready else None
+        print(f"Startup: {args.accounts} accounts ready in {results['startup_s']:.2f}s" if ready
+              else "Startup: not every account came online, continuing")
+
+        streaming = stream.start(token)
+        procs = process_tree(server) + [p for a in agents for p in process_tree(a)]
+        cpu_before, wall_before = cpu_seconds(procs), time.time()
+
+        n, c = args.requests, args.concurrency
+        tfs = ['1M', '5M', '15M', '1H']
+        candle_calls = [lambda i=i: http('GET', f"/api/candles?symbol={watchlist[i % len(watchlist)]}"
+                                              f"&timeframe={tfs[i % len(tfs)]}&limit={args.candle_limit}"
+                                              f"&format=columns") for i in range(n)]
+        modify_calls = [lambda i=i: http('POST', '/api/modify', {'ticket': f"{watchlist[i % len(watchlist)]}_"
+                                                                           f"{'BUY' if i % 2 else 'SELL'}",
+                                                                 'sl': 0.0, 'tp': 0.0}) for i in range(n)]
+        trade_calls = [lambda i=i: http('POST', '/api/trade', {'symbol': watchlist[i % len(watchlist)],
+                                                               'type': 'BUY' if i % 2 else 'SELL',
+                                                               'volume': 1}) for i in range(n)]
+        # Trades first so every SYMBOL_SIDE group the modify phase targets exists
+        for name, calls in (('candles', candle_calls), ('trade', trade_calls), ('modify', modify_calls)):
+            results['phases'].append(run_phase(name, calls, c))
+
+        wall = time.time() - wall_before
+        if args.metrics:
+            time.sleep(3)  # Workers ship their metrics with the next heartbeat (every 2s)
+            with open(args.metrics if len(args.modes) == 1 else f"{args.metrics}.{mode}", 'wb') as f:
+                f.write(http('GET', '/api/metrics'))
+        cpu_after = cpu_seconds(procs)
+        for p in procs:
+            try:
+                role = 'server' if p.pid == server.pid else 'agent' if p.pid in {a.pid for a in agents} else 'worker'
+                if 'resource_tracker' in ' '.join(p.cmdline()):
+                    role = 'tracker'
+                used = cpu_after.get(p.pid, 0) - cpu_before.get(p.pid, 0)
+                results['processes'].append({'pid': p.pid, 'role': role, 'cpu_s': used,
+                                             'cpu_pct': used / wall * 100, 'rss_mb': p.memory_info().rss / 2 ** 20,
+                                             'threads': p.num_threads()})
+            except psutil.Error:
+                pass
+
+        if streaming:
+            results['stream'] = {'clients': args.clients, 'frames': stream.frames, 'fps': stream.frames / wall,
+                                 'avg_frame_bytes': stream.bytes / stream.frames if stream.frames else 0,
+                                 'gap_p50_ms': stream.gaps.percentile(0.5), 'gap_p99_ms': stream.gaps.percentile(0.99),
+                                 'probes': stream.ack_rtt.count, 'probe_errors': stream.probe_errors,
+                                 'ack_p50_ms': stream.ack_rtt.percentile(0.5),
+                                 'ack_p99_ms': stream.ack_rtt.percentile(0.99),
+                                 'emit_p50_ms': stream.emit_latency.percentile(0.5),
+                                 'emit_p99_ms': stream.emit_latency.percentile(0.99)}
+        if agents:
+            results['agents'] = json.loads(http('GET', '/api/agents'))
+            if args.kill_agent:
+                results['failover'] = kill_agent(args, agents)
+    finally:
+        stream.stop()
+        for agent in agents:
+            stop_agent(agent)
+        # SIGINT lets the server run its atexit cleanup (shared memory, worker shutdown)
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            for p in reversed(process_tree(server)):
+                p.kill()
+    return results
+
+
+def print_results(results):
+    print(f"\n{'phase':<10}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for r in results['phases']:
+        print(f"{r['phase']:<10}{r['requests']:>7}{r['errors']:>8}{r['rps']:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+    if 'stream' in results:
+        s = results['stream']
+        print(f"\nstream: {s['frames']} frames ({s['fps']:.1f}/s, avg {s['avg_frame_bytes']:.0f} B), "
+              f"gap p50 {s['gap_p50_ms']:.1f} ms, p99 {s['gap_p99_ms']:.1f} ms")
+        print(f"socket: {s['probes']} probes over {s['clients']} client(s), ack p50 {s['ack_p50_ms']:.2f} ms, "
+              f"p99 {s['ack_p99_ms']:.2f} ms; emit p50 {s['emit_p50_ms']:.2f} ms, p99 {s['emit_p99_ms']:.2f} ms")
+    elif socketio is None:
+        print("\nstream: skipped (pip install python-socketio[client])")
+    if 'agents' in results:
+        print("\nagents: " + ', '.join(f"{name} {len(a['accounts'])}/{a['slots']}"
+                                        for name, a in results['agents'].items()))
+    if results['processes']:
+        print(f"\n{'pid':>8} {'role':<8}{'cpu s':>8}{'cpu %':>8}{'rss MB':>9}{'threads':>9}")
+        for p in results['processes']:
+            print(f"{p['pid']:>8} {p['role']:<8}{p['cpu_s']:>8.2f}{p['cpu_pct']:>8.1f}{p['rss_mb']:>9.1f}"
+                  f"{p['threads']:>9}")
+    else:
+        print("\nprocesses: skipped (pip install psutil)")
+
+
+def print_comparison(runs):
+    """Side-by-side req/s and p99 per phase, plus socket latency, one column per server mode."""
+    modes = [r['server'] for r in runs]
+    print(f"\n{'':<22}" + ''.join(f"{m:>12}" for m in modes))
+    for i, phase in enumerate(runs[0]['phases']):
+        for key, label in (('rps', 'req/s'), ('p99_ms', 'p99 ms')):
+            print(f"{phase['phase'] + ' ' + label:<22}" + ''.join(f"{r['phases'][i][key]:>12.2f}" for r in runs))
+    for key, label in (('ack_p50_ms', 'ack p50 ms'), ('ack_p99_ms', 'ack p99 ms'),
+                       ('emit_p50_ms', 'emit p50 ms'), ('emit_p99_ms', 'emit p99 ms')):
+        if all('stream' in r for r in runs):
+            print(f"{label:<22}" + ''.join(f"{r['stream'][key]:>12.2f}" for r in runs))
+    servers = [next((p for p in r['processes'] if p['role'] == 'server'), None) for r in runs]
+    if all(servers):
+        print(f"{'server cpu %':<22}" + ''.join(f"{p['cpu_pct']:>12.1f}" for p in servers))
+        print(f"{'server threads':<22}" + ''.join(f"{p['threads']:>12}" for p in servers))
+
+
+# --- MAIN ---
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--accounts', type=int, default=4)
+    ap.add_argument('--symbols', type=int, default=5)
+    ap.add_argument('--positions', type=int, default=10)
+    ap.add_argument('--servers', type=int, default=2, help='distinct trade servers the accounts are spread over')
+    ap.add_argument('--requests', type=int, default=100, help='requests per phase')
+    ap.add_argument('--concurrency', type=int, default=4)
+    ap.add_argument('--latency-ms', default='20,5', help='simulated order_send latency "mean,jitter"')
+    ap.add_argument('--candle-limit', type=int, default=1000)
+    ap.add_argument('--server', default='threading', help='server mode(s) to run, comma-separated')
+    ap.add_argument('--clients', type=int, default=1, help='Socket.IO clients connected during the run')
+    ap.add_argument('--encoding', default='json', choices=('json', 'msgpack'), help='dashboard_update wire format')
+    ap.add_argument('--agents', type=int, default=0, help='run the accounts on this many local worker agents')
+    ap.add_argument('--kill-agent', action='store_true', help='with --agents: kill one and time the failover')
+    ap.add_argument('--json', help='also write the results to this file')
+    ap.add_argument('--metrics', help='save the server\'s /api/metrics output to this file (.<mode> per mode)')
+    args = ap.parse_args()
+    args.modes = [m.strip() for m in args.server.split(',') if m.strip()]
+
+    runs = [run_bench(args, mode) for mode in args.modes]
+    for results in runs:
+        if len(runs) > 1:
+            print(f"\n=== {results['server']} ===")
+        print_results(results)
+    if len(runs) > 1:
+        print_comparison(runs)
+
+    if args.metrics:
+        print(f"\nserver metrics written to {args.metrics}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(runs[0] if len(runs) == 1 else runs, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Wire format benchmark: bytes and encode time per dashboard_update frame and per
+/api/candles body, JSON (what Socket.IO / Flask send today) vs MessagePack vs the
+columnar MessagePack form in wire_format.
+
+Dashboard frames are built the way broadcast_loop builds them: a synthetic state
+of N accounts x M positions through DeltaEncoder, giving a keyframe and a typical
+tick delta (price_current / profit moving on every position of a few symbols).
+
+    python bench_wire.py [--accounts 20] [--positions 25] [--symbols 10]
+"""
+import json
+import random
+import timeit
+import argparse
+
+from dashboard_delta import DeltaEncoder
+from exposure import ExposureEngine
+from bench_candles import make_rates
+from candles import pack_rates, unpack_columns, encode_rows_json, encode_columns_json
+from wire_format import columnar_frame, encode_frame, pack_candles, msgpack
+
+
+def make_state(accounts, positions, symbols, seed=1):
+    rng = random.Random(seed)
+    names = ['XAUUSD'] + [f"SIM{i:03d}" for i in range(1, symbols)]
+    snapshot = {}
+    for a in range(accounts):
+        rows = []
+        for i in range(positions):
+            sym = rng.choice(names)
+            price = 2000 + rng.random() * 10
+            rows.append({'ticket': 10_000_000 + a * 1000 + i, 'symbol': sym, 'volume': rng.choice([0.01, 0.1, 1.0]),
+                         'type': rng.choice(['BUY', 'SELL']), 'price_open': round(price, 2),
+                         'price_current': round(price + rng.random(), 2), 'sl': rng.choice([0.0, round(price - 5, 2)]),
+                         'tp': 0.0, 'profit': round(rng.uniform(-50, 50), 2), 'trail': None,
+                         'account_name': f"Account {a}", 'account_login': 100000 + a})
+        orders = [{'ticket': 20_000_000 + a * 1000 + i, 'symbol': rng.choice(names), 'type': 'BUY LIMIT',
+                   'volume': 0.1, 'price_open': 1990.0, 'sl': 0.0, 'tp': 0.0, 'account': f"Account {a}"}
+                  for i in range(3)]
+        snapshot[str(a)] = {'status': 'ONLINE', 'balance': 10000.0, 'equity': 10100.0, 'margin_free': 9000.0,
+                            'positions': rows, 'orders': orders}
+    prices = {s: {'bid': 2000.0, 'ask': 2000.2, 'ts': 1} for s in names}
+    return snapshot, prices, names
+
+
+def dashboard_state(snapshot, prices, engine):
+    positions = [p for d in snapshot.values() for p in d['positions']]
+    orders = [o for d in snapshot.values() for o in d['orders']]
+    return {'balance': 1.0, 'equity': 1.0, 'margin_free': 1.0, 'profit': 0.0, 'positions': positions,
+            'orders': orders, 'prices': prices, 'active_accounts': len(snapshot),
+            'exposure': engine.compute(snapshot)}
+
+
+def tick(snapshot, prices, moved, rng):
+    # Fresh dicts per account, like a new snapshot version
+    out = {}
+    for acc_id, data in snapshot.items():
+        rows = [dict(p, price_current=round(p['price_current'] + rng.uniform(-0.5, 0.5), 2),
+                     profit=round(p['profit'] + rng.uniform(-5, 5), 2)) if p['symbol'] in moved else p
+                for p in data['positions']]
+        out[acc_id] = dict(data, positions=rows)
+    return out, dict(prices, **{s: {'bid': 2001.0, 'ask': 2001.2, 'ts': 2} for s in moved})
+
+
+def frames(args):
+    snapshot, prices, names = make_state(args.accounts, args.positions, args.symbols)
+    engine = ExposureEngine()
+    encoder = DeltaEncoder()
+    keyframe = encoder.encode(dashboard_state(snapshot, prices, engine))
+    snapshot, prices = tick(snapshot, prices, set(names[:3]), random.Random(2))
+    delta = encoder.encode(dashboard_state(snapshot, prices, engine))
+    return keyframe, delta
+
+
+def bench(fn, repeat=5, number=50):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def report(rows):
+    base_bytes, base_us = rows[0][1], rows[0][2]
+    for name, size, us in rows:
+        print(f"  {name:<22}{size:>10}{us:>12.1f}{base_bytes / size:>9.1f}x{base_us / us:>9.1f}x")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--accounts', type=int, default=20)
+    ap.add_argument('--positions', type=int, default=25, help='per account')
+    ap.add_argument('--symbols', type=int, default=10)
+    ap.add_argument('--candles', default='500,2000,10000')
+    args = ap.parse_args()
+    if msgpack is None:
+        raise SystemExit("pip install msgpack")
+
+    def to_json(p):
+        return json.dumps(p, separators=(',', ':'))  # Socket.IO's own JSON packet encoding
+
+    keyframe, delta = frames(args)
+    # Round trip must give back the same frame the JSON path sends
+    assert msgpack.unpackb(msgpack.packb(keyframe)) == keyframe
+
+    header = f"  {'encoding':<22}{'bytes':>10}{'us/frame':>12}{'size':>10}{'cpu':>10}"
+    for name, frame in (('keyframe', keyframe), ('tick delta', delta)):
+        print(f"dashboard {name} ({args.accounts} accounts x {args.positions} positions)")
+        print(header)
+        report([
+            ('json', len(to_json(frame)), bench(lambda: to_json(frame))),
+            ('msgpack', len(msgpack.packb(frame)), bench(lambda: msgpack.packb(frame))),
+            ('columnar json', len(to_json(columnar_frame(frame))), bench(lambda: to_json(columnar_frame(frame)))),
+            ('columnar msgpack', len(encode_frame(frame, 'msgpack')), bench(lambda: encode_frame(frame, 'msgpack'))),
+        ])
+        print()
+
+    for limit in [int(n) for n in args.candles.split(',')]:
+        cols = unpack_columns(pack_rates(make_rates(limit)))
+        number = max(1, 20000 // limit)
+        print(f"/api/candles limit={limit}")
+        print(header.replace('us/frame', 'us/body'))
+        report([
+            ('json rows', len(encode_rows_json(cols)), bench(lambda: encode_rows_json(cols), number=number)),
+            ('json columns', len(encode_columns_json(cols)), bench(lambda: encode_columns_json(cols), number=number)),
+            ('msgpack binary', len(pack_candles(cols)), bench(lambda: pack_candles(cols), number=number)),
+        ])
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from candles import CANDLE_FIELDS, COLUMN_DTYPES
+from live_bars import TF_SECONDS
+
+MAX_HOT_SERIES = 16  # (symbol, timeframe) pairs kept decoded in memory
+MAX_SERIES_BARS = 50000  # Bars per series loaded back from disk
+
+
+def _empty():
+    return {f: np.empty(0, dtype=COLUMN_DTYPES[f]) for f in CANDLE_FIELDS}
+
+
+# --- CANDLE STORE ---
+class CandleStore:
+    """
+    On-disk OHLC cache (SQLite) with an in-memory LRU of hot series.
+
+    Bars are merged in by time, newest copy wins, so the forming bar is simply
+    overwritten on every sync. History accumulates past what the terminal keeps.
+    """
+
+    def __init__(self, path='candle_cache.db', max_series=MAX_HOT_SERIES):
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._hot = OrderedDict()  # (symbol, tf) -> {field: np.ndarray}
+        self._meta = {}  # (symbol, tf) -> {'synced_at': float, 'depth': int}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS candles (
+            symbol TEXT, timeframe TEXT, time INTEGER,
+            open REAL, high REAL, low REAL, close REAL,
+            PRIMARY KEY (symbol, timeframe, time)) WITHOUT ROWID""")
+        self._db.commit()
+
+    def _load(self, key):
+        cols = self._hot.get(key)
+        if cols is not None:
+            self._hot.move_to_end(key)
+            return cols
+
+        rows = self._db.execute(
+            "SELECT time, open, high, low, close FROM candles WHERE symbol=? AND timeframe=? "
+            "ORDER BY time DESC LIMIT ?", (key[0], key[1], MAX_SERIES_BARS)).fetchall()
+        cols = _empty()
+        if rows:
+            rows.reverse()
+            arr = np.array(rows, dtype=np.float64)
+            cols = {f: arr[:, i].astype(COLUMN_DTYPES[f]) for i, f in enumerate(CANDLE_FIELDS)}
+        self._remember(key, cols)
+        return cols
+
+    def _remember(self, key, cols):
+        self._hot[key] = cols
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.max_series:
+            self._hot.popitem(last=False)
+
+    def tail(self, symbol, timeframe, limit):
+        with self._lock:
+            cols = self._load((symbol, timeframe))
+            return {f: cols[f][-limit:] for f in CANDLE_FIELDS}
+
+    def bars_needed(self, symbol, timeframe, limit):
+        """
+        How many of the newest bars to ask the terminal for. Small when we synced
+        recently (incremental backfill), `limit` when the cache is cold or shallow.
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            meta = self._meta.get(key)
+            cached = len(self._load(key)['time'])
+        if meta is None or (cached < limit and meta['depth'] < limit):
+            return limit
+        elapsed = time.time() - meta['synced_at']
+        return min(limit, int(elapsed // TF_SECONDS.get(timeframe, 60)) + 2)
+
+    def merge(self, symbol, timeframe, new, requested, incremental=False):
+        """
+        Merges freshly fetched columns. For an incremental fetch, returns False if
+        they don't overlap what we have (a gap we can't fill), nothing is written then.
+        """
+        key = (symbol, timeframe)
+        n = len(new['time'])
+        if n == 0:
+            return True
+        with self._lock:
+            old = self._load(key)
+            first = new['time'][0]
+            if incremental and len(old['time']) and first > old['time'][-1]:
+                return False
+
+            keep = old['time'] < first
+            cols = {f: np.concatenate([old[f][keep], new[f]])[-MAX_SERIES_BARS:] for f in CANDLE_FIELDS}
+            self._remember(key, cols)
+
+            meta = self._meta.setdefault(key, {'synced_at': 0.0, 'depth': 0})
+            meta['synced_at'] = time.time()
+            meta['depth'] = max(meta['depth'], requested)
+
+            try:
+                rows = zip([symbol] * n, [timeframe] * n, *(new[f].tolist() for f in CANDLE_FIELDS))
+                self._db.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.commit()
+            except Exception as e:
+                logging.error(f"Candle Store Write Error: {e}")
+            return True
+
+    def close(self):
+        with self._lock:
+            self._db.close()
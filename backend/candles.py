@@ -0,0 +1,70 @@
+import json
+import numpy as np
+
+# --- COLUMNAR CANDLES ---
+# Workers ship copy_rates_from_pos() output as one raw byte string per column
+# instead of a list of per-bar dicts; the Flask process encodes JSON in bulk.
+CANDLE_FIELDS = ('time', 'open', 'high', 'low', 'close')
+COLUMN_DTYPES = {'time': '<i8', 'open': '<f8', 'high': '<f8', 'low': '<f8', 'close': '<f8'}
+
+ROW_TEMPLATE = '{"time":%d,"open":%r,"high":%r,"low":%r,"close":%r}'
+
+
+def pack_rates(rates):
+    """Worker side: MT5 structured array -> {'count': n, field: little-endian bytes}."""
+    if rates is None or len(rates) == 0:
+        return {'count': 0}
+    packed = {'count': len(rates)}
+    for f in CANDLE_FIELDS:
+        packed[f] = np.ascontiguousarray(rates[f], dtype=COLUMN_DTYPES[f]).tobytes()
+    return packed
+
+
+def unpack_columns(packed):
+    """Flask side: packed bytes -> {field: numpy array} (zero-copy views)."""
+    if not packed or not packed.get('count'):
+        return {f: np.empty(0, dtype=COLUMN_DTYPES[f]) for f in CANDLE_FIELDS}
+    return {f: np.frombuffer(packed[f], dtype=COLUMN_DTYPES[f]) for f in CANDLE_FIELDS}
+
+
+def columns_to_lists(cols):
+    return {f: cols[f].tolist() for f in CANDLE_FIELDS}
+
+
+def _all_finite(cols):
+    return all(np.isfinite(cols[f]).all() for f in CANDLE_FIELDS)
+
+
+def _json_lists(cols):
+    """columns_to_lists with NaN / inf as None, since JSON has no literal for them."""
+    lists = columns_to_lists(cols)
+    for f in CANDLE_FIELDS:
+        finite = np.isfinite(cols[f])
+        if not finite.all():
+            lists[f] = [v if ok else None for v, ok in zip(lists[f], finite.tolist())]
+    return lists
+
+
+def last_bar(packed):
+    """Newest bar as a plain dict, or None."""
+    cols = unpack_columns(packed)
+    if len(cols['time']) == 0:
+        return None
+    return {f: cols[f][-1].item() for f in CANDLE_FIELDS}
+
+
+def encode_rows_json(cols):
+    """[{"time":..,"open":..}, ...] built with one C-level format pass per bar."""
+    if not _all_finite(cols):
+        # Rare (a broker sending NaN prices), %r would write a bare NaN: let json.dumps write null
+        lists = _json_lists(cols)
+        return json.dumps([dict(zip(CANDLE_FIELDS, row)) for row in zip(*(lists[f] for f in CANDLE_FIELDS))],
+                          separators=(',', ':'))
+    lists = columns_to_lists(cols)
+    rows = map(ROW_TEMPLATE.__mod__, zip(*(lists[f] for f in CANDLE_FIELDS)))
+    return '[' + ','.join(rows) + ']'
+
+
+def encode_columns_json(cols):
+    """{"time":[..],"open":[..],...} - the compact layout used by the dashboard."""
+    return json.dumps(_json_lists(cols), separators=(',', ':'))
@@ -0,0 +1,100 @@
+TOTAL_FIELDS = ('balance', 'equity', 'margin_free', 'profit', 'active_accounts')
+
+
+def position_key(pos):
+    return f"{pos.get('account_login')}:{pos.get('ticket')}"
+
+
+def order_key(order):
+    return f"{order.get('account')}:{order.get('ticket')}"
+
+
+def _index(rows, key_fn):
+    return {key_fn(r): r for r in rows}
+
+
+def _diff_rows(prev, curr):
+    """Returns {'add': [rows], 'update': [{'key', changed fields...}], 'remove': [keys]} or None."""
+    add, update = [], []
+    for k, row in curr.items():
+        old = prev.get(k)
+        if old is None:
+            add.append(row)
+        elif old != row:
+            changed = {f: v for f, v in row.items() if old.get(f) != v}
+            changed['key'] = k
+            update.append(changed)
+    remove = [k for k in prev if k not in curr]
+    if not (add or update or remove):
+        return None
+    return {'add': add, 'update': update, 'remove': remove}
+
+
+# --- DELTA ENCODER ---
+class DeltaEncoder:
+    """
+    Turns the full dashboard state built by broadcast_loop into a stream of
+    sequence-numbered deltas with a full keyframe every `keyframe_every` frames.
+    Clients apply deltas in seq order and ask for a keyframe on any gap. Quotes
+    that left the state (unwatched / filtered out) are listed in 'prices_remove'.
+    """
+
+    def __init__(self, keyframe_every=40):
+        self.keyframe_every = keyframe_every
+        self.seq = 0
+        self._since_keyframe = 0
+        self._totals = {}
+        self._positions = {}
+        self._orders = {}
+        self._prices = {}
+        self._exposure = {}
+
+    def keyframe(self):
+        """Full state at the current seq (also used to resync a single client)."""
+        payload = dict(self._totals)
+        payload.update({
+            'seq': self.seq, 'full': True,
+            'positions': list(self._positions.values()),
+            'orders': list(self._orders.values()),
+            'prices': dict(self._prices),
+            'exposure': dict(self._exposure),
+        })
+        return payload
+
+    def encode(self, state):
+        """Feeds a new full state. Returns the payload to emit, or None if nothing changed."""
+        totals = {f: state.get(f) for f in TOTAL_FIELDS}
+        positions = _index(state.get('positions', []), position_key)
+        orders = _index(state.get('orders', []), order_key)
+        prices = state.get('prices', {})
+
+        changed_totals = {f: v for f, v in totals.items() if self._totals.get(f) != v}
+        pos_delta = _diff_rows(self._positions, positions)
+        ord_delta = _diff_rows(self._orders, orders)
+        changed_prices = {s: q for s, q in prices.items() if self._prices.get(s) != q}
+        removed_prices = [s for s in self._prices if s not in prices]
+        # Exposure sections (groups / symbols / accounts / totals) are small, resent whole when changed
+        exposure = state.get('exposure', {})
+        changed_exposure = {k: v for k, v in exposure.items() if self._exposure.get(k) != v}
+
+        self._totals, self._positions, self._orders, self._prices = totals, positions, orders, dict(prices)
+        self._exposure = dict(exposure)
+        self._since_keyframe += 1
+
+        if self.seq == 0 or self._since_keyframe >= self.keyframe_every:
+            self.seq += 1
+            self._since_keyframe = 0
+            return self.keyframe()
+
+        if not (changed_totals or pos_delta or ord_delta or changed_prices or removed_prices or changed_exposure):
+            return None
+
+        self.seq += 1
+        payload = {'seq': self.seq, 'full': False}
+        payload.update(changed_totals)
+        if pos_delta: payload['positions'] = pos_delta
+        if ord_delta: payload['orders'] = ord_delta
+        if changed_prices: payload['prices'] = changed_prices
+        if removed_prices: payload['prices_remove'] = removed_prices
+        if changed_exposure: payload['exposure'] = changed_exposure
+        return payload
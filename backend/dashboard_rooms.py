@@ -0,0 +1,113 @@
+import zlib
+import threading
+
+from dashboard_delta import DeltaEncoder
+from wire_format import encode_frame
+
+
+def user_room(user_id):
+    return f"user:{user_id}"
+
+
+def dashboard_room(user_id, accounts, symbols, encoding='json'):
+    # Clients asking for the same view share a room (and one payload per cycle)
+    suffix = '' if encoding == 'json' else f":{encoding}"
+    if accounts is None and symbols is None:
+        return f"dashboard:{user_id}:all{suffix}"
+    scope = f"{sorted(accounts) if accounts is not None else '*'}|{sorted(symbols) if symbols is not None else '*'}"
+    return f"dashboard:{user_id}:{zlib.crc32(scope.encode()):08x}{suffix}"
+
+
+# --- DASHBOARD VIEWS ---
+class DashboardView:
+    """One distinct dashboard scope: a user's accounts (all, or a chosen subset), watched symbols and wire encoding."""
+
+    def __init__(self, user_id, accounts, symbols, keyframe_every, encoding='json'):
+        self.user_id = user_id
+        self.accounts = accounts  # frozenset of acc_ids, None = every account the user owns
+        self.symbols = symbols  # frozenset of symbols, None = every quoted symbol
+        self.encoding = encoding  # 'json' or 'msgpack' (binary frames, see wire_format)
+        self.room = dashboard_room(user_id, accounts, symbols, encoding)
+        self.encoder = DeltaEncoder(keyframe_every=keyframe_every)
+        self.sids = set()
+
+    def select(self, snapshot, owners):
+        """The view's slice of SnapshotStore.snapshot()."""
+        return {acc_id: data for acc_id, data in snapshot.items()
+                if owners.get(acc_id) == self.user_id and (self.accounts is None or acc_id in self.accounts)}
+
+    def prices(self, quotes):
+        if self.symbols is None:
+            return quotes
+        return {sym: q for sym, q in quotes.items() if sym in self.symbols}
+
+    def wire(self, payload):
+        return encode_frame(payload, self.encoding)
+
+
+class DashboardRooms:
+    """
+    Subscription book for dashboard_update. Each client subscribes as the
+    user its session token resolves to, and optionally the accounts and symbols it shows; clients with the
+    same scope share a view, so broadcast_loop builds and delta-encodes one
+    payload per view and emits it to that view's room only. Accounts are
+    matched to users through set_owner().
+    """
+
+    def __init__(self, keyframe_every=40):
+        self.keyframe_every = keyframe_every
+        self._lock = threading.Lock()
+        self._owners = {}  # acc_id -> user_id
+        self._views = {}  # room -> DashboardView
+        self._by_sid = {}  # sid -> room
+
+    def set_owner(self, user_id, acc_ids):
+        """`acc_ids` is every account the user owns; accounts missing from it stop being theirs."""
+        acc_ids = set(str(a) for a in acc_ids)
+        with self._lock:
+            for acc_id in [a for a, u in self._owners.items() if u == user_id and a not in acc_ids]:
+                del self._owners[acc_id]
+            for acc_id in acc_ids:
+                self._owners[acc_id] = user_id
+
+    def owner(self, acc_id):
+        return self._owners.get(str(acc_id))
+
+    def subscribe(self, sid, user_id, accounts=None, symbols=None, encoding='json'):
+        """Returns (view, previous room or None). `encoding` must already be negotiated."""
+        accounts = frozenset(str(a) for a in accounts) if accounts is not None else None
+        symbols = frozenset(symbols) if symbols is not None else None
+        room = dashboard_room(user_id, accounts, symbols, encoding)
+        with self._lock:
+            prev = self._by_sid.get(sid)
+            if prev == room:
+                return self._views[room], None
+            prev_room = self._drop(sid) if prev else None
+            view = self._views.get(room)
+            if view is None:
+                view = self._views[room] = DashboardView(user_id, accounts, symbols, self.keyframe_every, encoding)
+            view.sids.add(sid)
+            self._by_sid[sid] = room
+            return view, prev_room
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            return self._drop(sid)
+
+    def _drop(self, sid):
+        room = self._by_sid.pop(sid, None)
+        view = self._views.get(room)
+        if view is not None:
+            view.sids.discard(sid)
+            if not view.sids:
+                del self._views[room]
+        return room
+
+    def view_for(self, sid):
+        with self._lock:
+            return self._views.get(self._by_sid.get(sid))
+
+    def views(self):
+        """(views with at least one client, owners) for one broadcast cycle."""
+        with self._lock:
+            return list(self._views.values()), dict(self._owners)
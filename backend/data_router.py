@@ -0,0 +1,43 @@
+import threading
+from contextlib import contextmanager
+
+
+# --- DATA ROUTER ---
+class DataRouter:
+    """
+    Spreads read-only data requests (candles) over the running workers instead of
+    always using the first account. Picks the candidate with the fewest requests
+    in flight, rotating between equals. With `dedicated` set to an account ID,
+    that worker serves every data request while it is available.
+    """
+
+    def __init__(self, dedicated=None):
+        self.dedicated = dedicated
+        self._lock = threading.Lock()
+        self._in_flight = {}  # acc_id -> outstanding requests
+        self._turn = 0
+
+    def pick(self, candidates):
+        """Returns the account to ask, or None if there are no candidates."""
+        candidates = list(candidates)
+        if not candidates:
+            return None
+        if self.dedicated is not None and str(self.dedicated) in candidates:
+            return str(self.dedicated)
+        with self._lock:
+            self._turn += 1
+            n = len(candidates)
+            order = [candidates[(self._turn + i) % n] for i in range(n)]
+            return min(order, key=lambda a: self._in_flight.get(a, 0))
+
+    @contextmanager
+    def track(self, acc_id):
+        with self._lock:
+            self._in_flight[acc_id] = self._in_flight.get(acc_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[acc_id] -= 1
+                if not self._in_flight[acc_id]:
+                    del self._in_flight[acc_id]
@@ -1,10 +1,17 @@
 import os
 import sys
-
-import firebase_admin
-from firebase_admin import credentials, firestore
+import time
+import logging
+import threading
 
 def get_db():
+    # FINWIZ_DB=local serves everything from an in-memory fixture (benchmarks, Linux dev)
+    if os.environ.get('FINWIZ_DB') == 'local':
+        from local_firestore import get_local_db
+        return get_local_db()
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
     if not firebase_admin._apps:
         try:
             cred_path = get_resource_path("serviceAccountKey.json")
@@ -29,3 +36,130 @@ def get_resource_path(filename):
         return file_in_dir
     return filename
 
+
+
+# --- READ CACHE ---
+CACHE_TTL = 300  # Seconds before a cache without a live listener re-reads Firestore
+
+
+class CollectionCache:
+    """
+    In-memory copy of one Firestore collection, {doc_id: data}.
+
+    Kept fresh by an on_snapshot listener; if the listener can't be attached the
+    collection is re-streamed at most once per `ttl` seconds. Writes made through
+    this module patch the cache directly so the next read sees them.
+    """
+
+    def __init__(self, ref_fn, ttl=CACHE_TTL):
+        self._ref_fn = ref_fn
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._docs = None
+        self._loaded_at = 0
+        self._watch = None
+
+    def _on_snapshot(self, doc_snapshots, changes, read_time):
+        docs = {d.id: d.to_dict() for d in doc_snapshots}
+        with self._lock:
+            self._docs = docs
+            self._loaded_at = time.time()
+
+    def _listen(self):
+        try:
+            self._watch = self._ref_fn().on_snapshot(self._on_snapshot)
+        except Exception as e:
+            logging.warning(f"Firestore listener unavailable, falling back to TTL reads: {e}")
+            self._watch = None
+
+    def docs(self):
+        with self._lock:
+            if self._docs is not None and (self._watch is not None or time.time() - self._loaded_at < self.ttl):
+                return dict(self._docs)
+        if self._watch is None:
+            self._listen()
+        docs = {d.id: d.to_dict() for d in self._ref_fn().stream()}
+        with self._lock:
+            # The listener may have delivered in the meantime; either copy is current
+            if self._docs is None or self._watch is None:
+                self._docs = docs
+                self._loaded_at = time.time()
+            return dict(self._docs)
+
+    def patch(self, doc_id, data=None, merge=True):
+        with self._lock:
+            if self._docs is None:
+                return
+            if data is None:
+                self._docs.pop(doc_id, None)
+            elif merge and doc_id in self._docs:
+                self._docs[doc_id] = dict(self._docs[doc_id], **data)
+            else:
+                self._docs[doc_id] = dict(data)
+
+    def invalidate(self):
+        with self._lock:
+            self._docs = None
+
+    def close(self):
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                pass
+            self._watch = None
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def _cache(key, ref_fn):
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = CollectionCache(ref_fn)
+        return _CACHES[key]
+
+
+def _accounts_ref(user_id):
+    return get_db().collection('USERS').document(user_id).collection('ACCOUNTS')
+
+
+def get_symbols():
+    """{symbol: data} for the SYMBOLS collection."""
+    return _cache('SYMBOLS', lambda: get_db().collection('SYMBOLS')).docs()
+
+
+def get_accounts(user_id):
+    """The user's account docs as dicts, each with its doc id under 'ID'."""
+    docs = _cache(('ACCOUNTS', user_id), lambda: _accounts_ref(user_id)).docs()
+    return [dict(data, ID=doc_id) for doc_id, data in docs.items()]
+
+
+def get_account(user_id, acc_id):
+    for acc in get_accounts(user_id):
+        if str(acc['ID']) == str(acc_id):
+            return acc
+    return None
+
+
+def save_account(user_id, acc_id, data):
+    _accounts_ref(user_id).document(acc_id).set(data)
+    _cache(('ACCOUNTS', user_id), lambda: _accounts_ref(user_id)).patch(acc_id, data, merge=False)
+
+
+def update_account(user_id, acc_id, fields):
+    _accounts_ref(user_id).document(acc_id).update(fields)
+    _cache(('ACCOUNTS', user_id), lambda: _accounts_ref(user_id)).patch(acc_id, fields)
+
+
+def delete_account(user_id, acc_id):
+    _accounts_ref(user_id).document(acc_id).delete()
+    _cache(('ACCOUNTS', user_id), lambda: _accounts_ref(user_id)).patch(acc_id, None)
+
+
+def close_caches():
+    with _CACHES_LOCK:
+        for cache in _CACHES.values():
+            cache.close()
+        _CACHES.clear()
@@ -0,0 +1,147 @@
+import numpy as np
+
+# Columns of the per-account position block
+VOLUME, PRICE_OPEN, PRICE_CURRENT, SL, TP, PROFIT = range(6)
+SIDES = ('BUY', 'SELL')
+LEVEL_EPS = 0.001  # SL / TP closer than this across a group count as the same level
+
+
+def _row(p):
+    return (p['volume'], p['price_open'], p['price_current'], p['sl'], p['tp'], p['profit'])
+
+
+# --- EXPOSURE ENGINE ---
+class ExposureEngine:
+    """
+    Server-side portfolio aggregation for broadcast_loop. Each account's positions
+    are kept as NumPy arrays (values, symbol index, side), rebuilt only when the
+    account's snapshot changes, and every cycle computes in one vectorized pass:
+
+      groups   - per SYMBOL_SIDE (the dashboard's master rows): volume, VWAP entry,
+                 floating P/L, common SL / TP (0 when children differ), nearest SL distance
+      symbols  - net / buy / sell volume and P/L per symbol
+      accounts - margin in use, % of equity, margin level, P/L, position count
+      totals   - margin in use and % of equity across ONLINE accounts
+    """
+
+    def __init__(self):
+        self._symbol_index = {}  # symbol -> row in the per-symbol arrays, only grows
+        self._symbols = []
+        self._blocks = {}  # acc_id -> (snapshot dict, (values, sym, side))
+
+    def _sym(self, symbol):
+        idx = self._symbol_index.get(symbol)
+        if idx is None:
+            idx = self._symbol_index[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+        return idx
+
+    def _block(self, acc_id, data):
+        # SnapshotStore returns the same dict until the account publishes a new version
+        cached = self._blocks.get(acc_id)
+        if cached and cached[0] is data:
+            return cached[1]
+        positions = data.get('positions') or []
+        n = len(positions)
+        values = np.array([_row(p) for p in positions], dtype=np.float64).reshape(n, 6)
+        sym = np.fromiter((self._sym(p['symbol']) for p in positions), dtype=np.int64, count=n)
+        side = np.fromiter((p['type'] == 'SELL' for p in positions), dtype=np.int64, count=n)
+        self._blocks[acc_id] = (data, (values, sym, side))
+        return values, sym, side
+
+    def prune(self, acc_ids):
+        """Drops the cached arrays of accounts no longer running."""
+        for acc_id in [a for a in self._blocks if a not in acc_ids]:
+            del self._blocks[acc_id]
+
+    def compute(self, snapshot):
+        """snapshot: {acc_id: data}, all or a slice of SnapshotStore.snapshot(). Returns the 'exposure' section."""
+        online = [(acc_id, data) for acc_id, data in snapshot.items() if data.get('status') == 'ONLINE']
+
+        blocks = [self._block(acc_id, data) for acc_id, data in online]
+        counts = np.array([len(b[0]) for b in blocks], dtype=np.int64)
+        values = np.concatenate([b[0] for b in blocks]) if blocks else np.empty((0, 6))
+        sym = np.concatenate([b[1] for b in blocks]) if blocks else np.empty(0, dtype=np.int64)
+        side = np.concatenate([b[2] for b in blocks]) if blocks else np.empty(0, dtype=np.int64)
+        acc = np.repeat(np.arange(len(online)), counts)
+
+        return {
+            'groups': self._groups(values, sym, side),
+            'symbols': self._by_symbol(values, sym, side),
+            **self._accounts(online, values, acc),
+        }
+
+    def _groups(self, values, sym, side):
+        if not len(values):
+            return {}
+        key = sym * 2 + side
+        order = np.argsort(key, kind='stable')
+        v = values[order]
+        k = key[order]
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+
+        vol = v[:, VOLUME]
+        volume = np.add.reduceat(vol, starts)
+        vwap = np.add.reduceat(vol * v[:, PRICE_OPEN], starts) / np.where(volume > 0, volume, 1)
+        profit = np.add.reduceat(v[:, PROFIT], starts)
+        count = np.diff(np.r_[starts, len(k)])
+
+        levels = {}
+        for col, name in ((SL, 'sl'), (TP, 'tp')):
+            lo = np.minimum.reduceat(v[:, col], starts)
+            hi = np.maximum.reduceat(v[:, col], starts)
+            levels[name] = np.where(hi - lo > LEVEL_EPS, 0.0, v[starts, col])
+
+        # Price distance to the nearest stop in each group (inf where no child has one)
+        is_buy = (k % 2) == 0
+        dist = np.where(is_buy, v[:, PRICE_CURRENT] - v[:, SL], v[:, SL] - v[:, PRICE_CURRENT])
+        dist = np.minimum.reduceat(np.where(v[:, SL] > 0, dist, np.inf), starts)
+
+        groups = {}
+        rows = zip(k[starts].tolist(), volume.round(2).tolist(), vwap.round(5).tolist(),
+                   v[starts, PRICE_CURRENT].tolist(), profit.round(2).tolist(), count.tolist(),
+                   levels['sl'].tolist(), levels['tp'].tolist(), dist.round(5).tolist())
+        for g, volume_, vwap_, current, profit_, n, sl, tp, dist_ in rows:
+            symbol, side_ = self._symbols[g // 2], SIDES[g % 2]
+            groups[f"{symbol}_{side_}"] = {
+                'symbol': symbol, 'type': side_, 'volume': volume_, 'price_open': vwap_,
+                'price_current': current, 'profit': profit_, 'count': n, 'sl': sl, 'tp': tp,
+                'sl_distance': dist_ if dist_ != float('inf') else None
+            }
+        return groups
+
+    def _by_symbol(self, values, sym, side):
+        if not len(values):
+            return {}
+        n = len(self._symbols)
+        vol = values[:, VOLUME]
+        buy = np.bincount(sym, weights=np.where(side == 0, vol, 0.0), minlength=n)
+        sell = np.bincount(sym, weights=np.where(side == 1, vol, 0.0), minlength=n)
+        profit = np.bincount(sym, weights=values[:, PROFIT], minlength=n)
+        held = np.flatnonzero(np.bincount(sym, minlength=n))
+        return {self._symbols[i]: {'net_volume': round(b - s, 2), 'buy_volume': round(b, 2),
+                                   'sell_volume': round(s, 2), 'profit': round(p, 2)}
+                for i, b, s, p in zip(held.tolist(), buy[held].tolist(), sell[held].tolist(),
+                                      profit[held].tolist())}
+
+    def _accounts(self, online, values, acc):
+        if not online:
+            return {'accounts': {}, 'totals': {'margin': 0.0, 'margin_pct': 0.0}}
+        n = len(online)
+        equity = np.array([float(d.get('equity', 0)) for _, d in online])
+        free = np.array([float(d.get('margin_free', 0)) for _, d in online])
+        margin = np.maximum(equity - free, 0.0)
+        pct = np.where(equity > 0, margin / np.where(equity > 0, equity, 1) * 100, 0.0)
+        level = np.where(margin > 0, equity / np.where(margin > 0, margin, 1) * 100, 0.0)
+        profit = np.bincount(acc, weights=values[:, PROFIT], minlength=n)
+        count = np.bincount(acc, minlength=n)
+
+        accounts = {acc_id: {'margin': round(m, 2), 'margin_pct': round(p, 2),
+                             'margin_level': round(lv, 2) if m > 0 else None,
+                             'profit': round(pl, 2), 'positions': c}
+                    for (acc_id, _), m, p, lv, pl, c in zip(online, margin.tolist(), pct.tolist(), level.tolist(),
+                                                            profit.tolist(), count.tolist())}
+        total_eq, total_margin = float(equity.sum()), float(margin.sum())
+        return {'accounts': accounts,
+                'totals': {'margin': round(total_margin, 2),
+                           'margin_pct': round(total_margin / total_eq * 100, 2) if total_eq > 0 else 0.0}}
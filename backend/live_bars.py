@@ -0,0 +1,91 @@
+import threading
+
+TF_SECONDS = {"1M": 60, "3M": 180, "5M": 300, "15M": 900, "30M": 1800,
+              "1H": 3600, "4H": 14400, "1D": 86400, "1W": 604800}
+
+# Unix epoch is a Thursday, MT5 weekly bars open on Sunday
+WEEK_OFFSET = 3 * 86400
+
+
+def bar_open_time(ts, timeframe):
+    step = TF_SECONDS.get(timeframe, 60)
+    offset = WEEK_OFFSET if timeframe == "1W" else 0
+    return ((ts - offset) // step) * step + offset
+
+
+def candle_room(symbol, timeframe):
+    return f"candles:{symbol}:{timeframe}"
+
+
+# --- LIVE BAR BOOK ---
+class LiveBarBook:
+    """
+    Forming (last) bar per subscribed (symbol, timeframe), built from worker ticks.
+    Each series is seeded once from MT5's own last bar, afterwards every bid
+    updates high/low/close and rolls a new bar at the timeframe boundary.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}  # (symbol, tf) -> set(sid)
+        self._by_sid = {}  # sid -> (symbol, tf)
+        self._bars = {}  # (symbol, tf) -> bar dict (None until seeded)
+
+    def subscribe(self, sid, symbol, timeframe):
+        """Returns (room, previous room or None, needs_seed)."""
+        key = (symbol, timeframe)
+        with self._lock:
+            prev = self._by_sid.get(sid)
+            if prev == key:
+                return candle_room(*key), None, self._bars.get(key) is None
+            prev_room = self._drop(sid) if prev else None
+            self._by_sid[sid] = key
+            self._subs.setdefault(key, set()).add(sid)
+            self._bars.setdefault(key, None)
+            return candle_room(*key), prev_room, self._bars[key] is None
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            return self._drop(sid)
+
+    def _drop(self, sid):
+        key = self._by_sid.pop(sid, None)
+        if key is None:
+            return None
+        sids = self._subs.get(key)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self._subs[key]
+                self._bars.pop(key, None)
+        return candle_room(*key)
+
+    def symbols(self):
+        with self._lock:
+            return sorted({sym for sym, _ in self._subs})
+
+    def seed(self, symbol, timeframe, bar):
+        key = (symbol, timeframe)
+        with self._lock:
+            if key in self._subs and bar:
+                self._bars[key] = {k: bar[k] for k in ('time', 'open', 'high', 'low', 'close')}
+
+    def on_tick(self, symbol, price, ts):
+        """Applies a tick, returns [(room, payload)] for every series it touched."""
+        updates = []
+        with self._lock:
+            for (sym, tf), bar in self._bars.items():
+                if sym != symbol or bar is None:
+                    continue
+                t0 = bar_open_time(ts, tf)
+                if t0 > bar['time']:
+                    bar = {'time': t0, 'open': price, 'high': price, 'low': price, 'close': price}
+                    self._bars[(sym, tf)] = bar
+                elif t0 < bar['time']:
+                    continue  # Stale tick from before the seeded bar
+                else:
+                    bar['high'] = max(bar['high'], price)
+                    bar['low'] = min(bar['low'], price)
+                    bar['close'] = price
+                updates.append((candle_room(sym, tf), dict(bar, symbol=sym, timeframe=tf)))
+        return updates
@@ -0,0 +1,196 @@
+"""
+In-memory stand-in for the slice of the Firestore client db_manager and app.py
+use: nested collections/documents, stream(), get(), set(), update(), delete(),
+where() filters and on_snapshot() listeners. Seeded from a JSON fixture shaped like
+{"COLLECTION": {"doc_id": {...fields, "__collections__": {"SUB": {...docs}}}}};
+sub-collections are only ever the ones listed under "__collections__", so map
+fields such as SYMBOL_CONFIG stay fields.
+
+Enabled with FINWIZ_DB=local (fixture path in FINWIZ_DB_FIXTURE). Each process
+loads its own copy; writes are not persisted. Listeners fire synchronously on the
+writing thread, after the write, with the same (docs, changes, read_time)
+arguments Firestore passes.
+"""
+import os
+import enum
+import json
+import copy
+import operator
+import threading
+from datetime import datetime, timezone
+
+_LOCK = threading.RLock()
+_DB = None
+COLLECTIONS_KEY = '__collections__'
+
+_OPS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    'in': lambda a, b: a in b, 'not-in': lambda a, b: a not in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+    'array_contains_any': lambda a, b: isinstance(a, list) and any(v in a for v in b),
+}
+
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class DocumentChange:
+    def __init__(self, type, document):
+        self.type = type
+        self.document = document
+
+
+class DocumentSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class _Collection:
+    def __init__(self):
+        self.docs = {}  # doc_id -> {'data': {}, 'collections': {name: _Collection}}
+        self.watches = []
+
+
+class Watch:
+    """Returned by on_snapshot(), like Firestore's."""
+
+    def __init__(self, query, callback):
+        self._query = query
+        self._callback = callback
+
+    def _fire(self, changes):
+        self._callback(self._query.stream(), changes, datetime.now(timezone.utc))
+
+    def unsubscribe(self):
+        with _LOCK:
+            if self in self._query._node.watches:
+                self._query._node.watches.remove(self)
+
+
+class DocumentReference:
+    def __init__(self, node, doc_id):
+        self._node = node  # parent _Collection
+        self.id = doc_id
+
+    def _entry(self, create=False):
+        entry = self._node.docs.get(self.id)
+        if entry is None and create:
+            entry = self._node.docs[self.id] = {'data': None, 'collections': {}}
+        return entry
+
+    def _notify(self, kind, data):
+        # Outside _LOCK, so callbacks can read (or write) the database
+        with _LOCK:
+            watches = list(self._node.watches)
+        change = DocumentChange(kind, DocumentSnapshot(self.id, data))
+        for watch in watches:
+            watch._fire([change])
+
+    def collection(self, name):
+        with _LOCK:
+            return CollectionReference(self._entry(create=True)['collections'].setdefault(name, _Collection()))
+
+    def get(self):
+        with _LOCK:
+            entry = self._entry()
+            return DocumentSnapshot(self.id, entry['data'] if entry else None)
+
+    def set(self, data, merge=False):
+        with _LOCK:
+            entry = self._entry(create=True)
+            kind = ChangeType.ADDED if entry['data'] is None else ChangeType.MODIFIED
+            entry['data'] = dict(entry['data'] or {}, **copy.deepcopy(data)) if merge else copy.deepcopy(data)
+            data = entry['data']
+        self._notify(kind, data)
+
+    def update(self, fields):
+        with _LOCK:
+            entry = self._entry()
+            if entry is None or entry['data'] is None:
+                raise KeyError(f"No document to update: {self.id}")
+            entry['data'].update(copy.deepcopy(fields))
+            data = entry['data']
+        self._notify(ChangeType.MODIFIED, data)
+
+    def delete(self):
+        with _LOCK:
+            entry = self._node.docs.pop(self.id, None)
+        if entry is not None and entry['data'] is not None:
+            self._notify(ChangeType.REMOVED, entry['data'])
+
+
+class Query:
+    def __init__(self, node, filters=()):
+        self._node = node
+        self._filters = filters
+
+    def where(self, field, op, value):
+        if op not in _OPS:
+            raise ValueError(f"Unsupported filter operator '{op}'")
+        return Query(self._node, self._filters + ((field, _OPS[op], value),))
+
+    def _matches(self, data):
+        # Like Firestore, a document missing the field never matches
+        return all(field in data and test(data[field], value) for field, test, value in self._filters)
+
+    def stream(self):
+        with _LOCK:
+            return [DocumentSnapshot(doc_id, e['data']) for doc_id, e in self._node.docs.items()
+                    if e['data'] is not None and self._matches(e['data'])]
+
+    def get(self):
+        return self.stream()
+
+    def on_snapshot(self, callback):
+        """Calls callback(docs, changes, read_time) now and after every write to the collection."""
+        watch = Watch(self, callback)
+        with _LOCK:
+            self._node.watches.append(watch)
+        watch._fire([DocumentChange(ChangeType.ADDED, d) for d in self.stream()])
+        return watch
+
+
+class CollectionReference(Query):
+    def document(self, doc_id):
+        return DocumentReference(self._node, doc_id)
+
+
+class LocalFirestore:
+    def __init__(self, fixture=None):
+        self._root = {}
+        if fixture:
+            for name, docs in fixture.items():
+                _load(self.collection(name), docs)
+
+    def collection(self, name):
+        with _LOCK:
+            return CollectionReference(self._root.setdefault(name, _Collection()))
+
+
+def _load(collection, docs):
+    for doc_id, fields in docs.items():
+        ref = collection.document(doc_id)
+        ref.set({k: v for k, v in fields.items() if k != COLLECTIONS_KEY})
+        for name, sub_docs in fields.get(COLLECTIONS_KEY, {}).items():
+            _load(ref.collection(name), sub_docs)
+
+
+def get_local_db():
+    global _DB
+    with _LOCK:
+        if _DB is None:
+            path = os.environ.get('FINWIZ_DB_FIXTURE')
+            fixture = None
+            if path and os.path.exists(path):
+                with open(path) as f:
+                    fixture = json.load(f)
+            _DB = LocalFirestore(fixture)
+        return _DB
@@ -0,0 +1,70 @@
+import threading
+
+
+# --- FEED REGISTRY ---
+class FeedRegistry:
+    """
+    One quote feed per trade server. The first worker started for a server polls
+    ticks for the watched symbols, the other accounts on that server only poll
+    their own account state. When the feed worker goes away, or isn't ONLINE
+    (still logging in, stuck CONNECTING), another account on the same server
+    takes over.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = {}  # acc_id -> server
+        self._feeds = {}  # server -> acc_id
+
+    def add(self, acc_id, server):
+        """Registers a worker, returns True if it should act as its server's feed."""
+        with self._lock:
+            self._servers[acc_id] = server
+            if server not in self._feeds:
+                self._feeds[server] = acc_id
+                return True
+            return False
+
+    def remove(self, acc_id):
+        """Unregisters a worker, returns the account that takes over its feed (or None)."""
+        with self._lock:
+            server = self._servers.pop(acc_id, None)
+            if server is None or self._feeds.get(server) != acc_id:
+                return None
+            del self._feeds[server]
+            for other, other_server in self._servers.items():
+                if other_server == server:
+                    self._feeds[server] = other
+                    return other
+            return None
+
+    def hand_over(self, online):
+        """Moves each feed whose worker isn't in `online` to one on the same server that is. Returns [(old, new)]."""
+        moves = []
+        with self._lock:
+            for server, feed in list(self._feeds.items()):
+                if feed in online:
+                    continue
+                other = next((a for a, s in self._servers.items() if s == server and a in online), None)
+                if other is not None:
+                    self._feeds[server] = other
+                    moves.append((feed, other))
+        return moves
+
+    def feeds(self):
+        with self._lock:
+            return dict(self._feeds)
+
+
+def merge_quotes(price_maps):
+    """
+    Merges per-feed {symbol: {bid, ask, time_msc, ts}} maps keeping the freshest quote.
+    Compares 'ts' (local receive time) since brokers stamp time_msc in their own timezone.
+    """
+    merged = {}
+    for prices in price_maps:
+        for sym, q in prices.items():
+            cur = merged.get(sym)
+            if cur is None or q.get('ts', 0) > cur.get('ts', 0):
+                merged[sym] = q
+    return merged
@@ -0,0 +1,201 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# --- HISTOGRAM LAYOUT ---
+# Log-linear buckets in the spirit of HdrHistogram: every power of two above
+# MIN_VALUE is split into SUB_BUCKETS linear steps, so any recorded value is
+# within ~3% of its bucket's bound, from 1 microsecond to hours, in ~1k buckets.
+MIN_VALUE = 0.001  # ms
+SUB_BUCKETS = 32
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+PREFIX = 'finwiz_'
+
+
+def _bucket(value):
+    if value < MIN_VALUE:
+        return 0
+    mantissa, exp = math.frexp(value / MIN_VALUE)  # value / MIN = mantissa * 2**exp, mantissa in [0.5, 1)
+    return (exp - 1) * SUB_BUCKETS + int((mantissa * 2 - 1) * SUB_BUCKETS)
+
+
+def _bucket_bound(index):
+    exp, sub = divmod(index, SUB_BUCKETS)
+    return MIN_VALUE * 2 ** exp * (1 + (sub + 1) / SUB_BUCKETS)
+
+
+# --- METRIC TYPES ---
+class Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Latency histogram (ms). Keeps bucket counts only, so merging worker summaries is exact."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        index = _bucket(value)
+        with self._lock:
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def merge(self, buckets, count, total, peak):
+        with self._lock:
+            for index, n in buckets.items():
+                self.buckets[index] = self.buckets.get(index, 0) + n
+            self.count += count
+            self.sum += total
+            self.max = max(self.max, peak)
+
+    def percentile(self, q):
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(q * self.count))
+            seen = 0
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                if seen >= rank:
+                    return min(_bucket_bound(index), self.max)
+            return self.max
+
+    def summary(self):
+        return {'count': self.count, 'sum': self.sum, 'max': self.max,
+                **{f"p{q * 100:g}": self.percentile(q) for q in QUANTILES}}
+
+
+# --- REGISTRY ---
+class MetricsRegistry:
+    """
+    Named counters, gauges and histograms with labels. Workers record into their
+    own registry and ship flush() deltas over the result queue; the Flask process
+    merge()s them under an `account` label and serves prometheus() / as_dict().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # (kind, name, labels) -> metric
+
+    def _get(self, kind, cls, name, labels):
+        # Label values are strings, as in Prometheus: retcode=10009 and retcode='none' must sort together
+        key = (kind, name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, cls())
+        return metric
+
+    def counter(self, name, **labels):
+        return self._get('counter', Counter, name, labels)
+
+    def gauge(self, name, **labels):
+        return self._get('gauge', Gauge, name, labels)
+
+    def histogram(self, name, **labels):
+        return self._get('histogram', Histogram, name, labels)
+
+    def prune(self, kind, name, label, keep):
+        """Drops `name` series whose `label` value isn't in `keep` (e.g. accounts that have stopped)."""
+        keep = set(str(v) for v in keep)
+        with self._lock:
+            for key in [k for k in self._metrics if k[0] == kind and k[1] == name]:
+                if dict(key[2]).get(label) not in keep:
+                    del self._metrics[key]
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.time()
+        try:
+            yield
+        finally:
+            self.histogram(name, **labels).record((time.time() - t0) * 1000)
+
+    def flush(self):
+        """Compact summary of everything recorded since the last flush; counters and histograms reset."""
+        with self._lock:
+            items = list(self._metrics.items())
+            # Gauges keep their last value
+            self._metrics = {key: m for key, m in items if key[0] == 'gauge'}
+        summary = []
+        for (kind, name, labels), m in items:
+            if kind != 'histogram':
+                summary.append((kind, name, labels, m.value))
+            elif m.count:
+                summary.append((kind, name, labels, (m.buckets, m.count, m.sum, m.max)))
+        return summary
+
+    def merge(self, summary, **extra):
+        for kind, name, labels, value in summary:
+            labels = dict(labels, **extra)  # Stringified by _get, like locally recorded labels
+            if kind == 'counter':
+                self.counter(name, **labels).inc(value)
+            elif kind == 'gauge':
+                self.gauge(name, **labels).set(value)
+            else:
+                self.histogram(name, **labels).merge(*value)
+
+    def _sorted(self):
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda kv: (kv[0][1], kv[0][2]))
+
+    def as_dict(self):
+        out = {'counters': [], 'gauges': [], 'histograms': []}
+        for (kind, name, labels), m in self._sorted():
+            entry = {'name': name, 'labels': dict(labels)}
+            if kind == 'histogram':
+                entry.update(m.summary())
+            else:
+                entry['value'] = m.value
+            out[kind + 's'].append(entry)
+        return out
+
+    def prometheus(self):
+        """Prometheus text exposition. Histograms are exported as summaries (quantiles, _sum, _count)."""
+        lines, typed = [], set()
+        for (kind, name, labels), m in self._sorted():
+            full = PREFIX + name
+            if full not in typed:
+                typed.add(full)
+                lines.append(f"# TYPE {full} {'summary' if kind == 'histogram' else kind}")
+            if kind != 'histogram':
+                lines.append(f"{full}{_labels(labels)} {m.value}")
+                continue
+            for q in QUANTILES:
+                lines.append(f"{full}{_labels(labels + (('quantile', q),))} {m.percentile(q)}")
+            lines.append(f"{full}_sum{_labels(labels)} {m.sum}")
+            lines.append(f"{full}_count{_labels(labels)} {m.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
@@ -0,0 +1,14 @@
+import os
+import importlib
+
+# FINWIZ_MT5=sim swaps the terminal for sim_terminal (no MetaTrader5 install needed).
+# Read from the environment so spawned worker processes resolve the same backend.
+BACKENDS = {'real': 'MetaTrader5', 'sim': 'sim_terminal'}
+
+
+def load_mt5(backend=None):
+    """Returns the MetaTrader5-compatible module selected by `backend` or FINWIZ_MT5."""
+    backend = backend or os.environ.get('FINWIZ_MT5', 'real')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown MT5 backend '{backend}', expected one of {sorted(BACKENDS)}")
+    return importlib.import_module(BACKENDS[backend])
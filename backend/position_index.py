@@ -0,0 +1,97 @@
+import threading
+
+MASTER_SIDES = ('BUY', 'SELL')
+
+
+# --- POSITION / ORDER INDEX ---
+class PositionIndex:
+    """
+    Ticket and (symbol, side) lookups over every account's positions and orders.
+
+    refresh() only re-indexes accounts whose snapshot version moved since the last
+    call, so the modify/close routes resolve targets with a few header reads and
+    dict lookups instead of copying and scanning every account.
+
+    Tickets are only unique per trade server, so entries are keyed by
+    (acc_id, ticket) and a bare ticket resolves to every account holding it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._versions = {}  # acc_id -> snapshot version indexed
+        self._acc_positions = {}  # acc_id -> [(ticket_key, group_key)]
+        self._acc_orders = {}  # acc_id -> [ticket_key]
+        self._positions = {}  # ticket_key -> {acc_id: (acc_id, ticket)}
+        self._groups = {}  # (symbol, side) -> {(acc_id, ticket_key): (acc_id, ticket)}
+        self._orders = {}  # ticket_key -> {acc_id: (acc_id, ticket)}
+
+    def refresh(self):
+        with self._lock:
+            accounts = self.store.accounts()
+            for acc_id in set(self._versions) - set(accounts):
+                self._reindex(acc_id, {})  # Deleted account
+                del self._versions[acc_id]
+            for acc_id in accounts:
+                if self.store.version(acc_id) == self._versions.get(acc_id):
+                    continue
+                version, data = self.store.read_versioned(acc_id)
+                self._reindex(acc_id, data)
+                self._versions[acc_id] = version
+
+    @staticmethod
+    def _drop(index, key, acc_key):
+        entries = index.get(key)
+        if entries is not None:
+            entries.pop(acc_key, None)
+            if not entries:
+                del index[key]
+
+    def _reindex(self, acc_id, data):
+        # Only this account's entries go, other accounts may hold the same ticket numbers
+        for t_key, g_key in self._acc_positions.pop(acc_id, []):
+            self._drop(self._positions, t_key, acc_id)
+            self._drop(self._groups, g_key, (acc_id, t_key))
+        for t_key in self._acc_orders.pop(acc_id, []):
+            self._drop(self._orders, t_key, acc_id)
+
+        entries = []
+        for pos in data.get('positions', []):
+            t_key, g_key = str(pos['ticket']), (pos['symbol'], pos['type'])
+            target = (acc_id, pos['ticket'])
+            self._positions.setdefault(t_key, {})[acc_id] = target
+            self._groups.setdefault(g_key, {})[(acc_id, t_key)] = target
+            entries.append((t_key, g_key))
+        self._acc_positions[acc_id] = entries
+
+        orders = []
+        for order in data.get('orders', []):
+            t_key = str(order['ticket'])
+            self._orders.setdefault(t_key, {})[acc_id] = (acc_id, order['ticket'])
+            orders.append(t_key)
+        self._acc_orders[acc_id] = orders
+
+    def resolve_positions(self, ticket):
+        """
+        Exact ticket first (every account holding it), else a master ticket
+        "SYMBOL_TYPE" (e.g. XAUUSD_BUY) matching every position of that symbol and side. The side is split off the
+        right, so broker symbols with underscores (XAUUSD_i_BUY) work, and must be
+        BUY or SELL. Returns [(acc_id, ticket)].
+        """
+        self.refresh()
+        with self._lock:
+            exact = self._positions.get(str(ticket))
+            if exact:
+                return list(exact.values())
+            if isinstance(ticket, str) and "_" in ticket:
+                sym, p_type = ticket.rsplit('_', 1)
+                if p_type not in MASTER_SIDES:
+                    return []
+                return list(self._groups.get((sym, p_type), {}).values())
+            return []
+
+    def resolve_orders(self, ticket):
+        """Returns [(acc_id, ticket)] for every account with a pending order of that ticket."""
+        self.refresh()
+        with self._lock:
+            return list(self._orders.get(str(ticket), {}).values())
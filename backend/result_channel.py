@@ -0,0 +1,89 @@
+import threading
+import logging
+
+
+# --- PENDING REQUEST ---
+class PendingRequest:
+    """A request fanned out to one or more workers, resolved as their results arrive."""
+
+    def __init__(self, req_id, expected, on_result=None):
+        self.req_id = req_id
+        self.expected = set(str(a) for a in expected)
+        self.on_result = on_result  # Called on the dispatcher thread as each result lands
+        self.results = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not self.expected:
+            self._done.set()
+
+    def resolve(self, acc_id, result):
+        with self._lock:
+            self.results[acc_id] = result
+            if self.expected.issubset(self.results.keys()):
+                self._done.set()
+        if self.on_result:
+            self.on_result(self, acc_id, result)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout):
+        return self._done.wait(timeout)
+
+    def missing(self):
+        with self._lock:
+            return [a for a in self.expected if a not in self.results]
+
+
+# --- DISPATCHER ---
+class ResultDispatcher:
+    """
+    Reads ('RESULT', req_id, acc_id, payload) messages pushed by the workers on a
+    single multiprocessing queue and wakes the Flask thread waiting on that req_id.
+    Other message kinds (e.g. 'TICK') are routed to handlers registered with on().
+    """
+
+    def __init__(self, result_queue, get=None):
+        self.result_queue = result_queue
+        self._get = get or result_queue.get  # Blocking read, see server_runtime.offload()
+        self._pending = {}
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, req_id, expected, on_result=None):
+        # Register BEFORE queuing the command so a fast worker can't beat us.
+        pending = PendingRequest(req_id, expected, on_result)
+        with self._lock:
+            self._pending[req_id] = pending
+        return pending
+
+    def on(self, kind, handler):
+        # handler(*msg[1:]) runs on the dispatcher thread, keep it short
+        self._handlers[kind] = handler
+
+    def discard(self, req_id):
+        with self._lock:
+            self._pending.pop(req_id, None)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='result-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                msg = self._get()
+                kind = msg[0]
+                if kind == 'RESULT':
+                    _, req_id, acc_id, payload = msg
+                    with self._lock:
+                        pending = self._pending.get(req_id)
+                    # Late results (after a timeout) are simply dropped
+                    if pending:
+                        pending.resolve(acc_id, payload)
+                elif kind in self._handlers:
+                    self._handlers[kind](*msg[1:])
+            except Exception as e:
+                logging.error(f"Dispatcher Error: {e}")
@@ -0,0 +1,52 @@
+import os
+import multiprocessing
+
+# FINWIZ_SERVER picks the Socket.IO / HTTP server:
+#   threading - Werkzeug dev server, one OS thread per connection (the default)
+#   gevent    - gevent pywsgi, every request and websocket on green threads
+#   eventlet  - eventlet.wsgi, same idea (no gRPC support, so not with live Firestore)
+# The green modes monkey-patch the stdlib, so patch() must run before app.py imports anything else.
+MODES = ('threading', 'gevent', 'eventlet')
+SERVER_MODE = os.environ.get('FINWIZ_SERVER', 'threading').lower()
+
+
+def patch(mode=SERVER_MODE):
+    """Monkey-patches the stdlib for the green modes. Server process only, never the workers."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown server mode '{mode}', expected one of {list(MODES)}")
+    if mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+        try:
+            # Lets Firestore's gRPC calls and listeners yield instead of blocking the hub
+            from grpc.experimental import gevent as grpc_gevent
+            grpc_gevent.init_gevent()
+        except ImportError:
+            pass
+    elif mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    if mode != 'threading':
+        # Forked workers would inherit the patched runtime (and the hub); start them clean
+        multiprocessing.set_start_method('spawn', force=True)
+
+
+def offload(fn, mode=SERVER_MODE):
+    """
+    Wraps a call that blocks outside Python (multiprocessing.Queue.get, a native
+    lock) so that under a green mode it runs on a real OS thread and only the
+    calling green thread waits. Returns fn unchanged in threading mode.
+    """
+    if mode == 'gevent':
+        import gevent
+
+        def call(*args, **kwargs):
+            return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+        return call
+    if mode == 'eventlet':
+        from eventlet import tpool
+
+        def call(*args, **kwargs):
+            return tpool.execute(fn, *args, **kwargs)
+        return call
+    return fn
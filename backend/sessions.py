@@ -0,0 +1,35 @@
+import secrets
+import threading
+
+MAX_SESSIONS_PER_USER = 8  # Oldest login's token is dropped past this
+
+
+# --- LOGIN SESSIONS ---
+class SessionStore:
+    """
+    Opaque tokens issued by /api/login. Socket events resolve the user from the
+    token instead of trusting a user_id the client sends. In memory only: a
+    server restart logs everyone out.
+    """
+
+    def __init__(self, max_per_user=MAX_SESSIONS_PER_USER):
+        self.max_per_user = max_per_user
+        self._lock = threading.Lock()
+        self._users = {}  # token -> user_id
+        self._tokens = {}  # user_id -> [token], oldest first
+
+    def open(self, user_id):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            tokens = self._tokens.setdefault(user_id, [])
+            tokens.append(token)
+            self._users[token] = user_id
+            while len(tokens) > self.max_per_user:
+                self._users.pop(tokens.pop(0), None)
+        return token
+
+    def user_for(self, token):
+        if not isinstance(token, str):
+            return None
+        with self._lock:
+            return self._users.get(token)
@@ -0,0 +1,271 @@
+"""
+Deterministic stand-in for the MetaTrader5 package, for running the backend on a
+box without a terminal (benchmarks, Linux dev). Exposes the subset of the
+MetaTrader5 API the workers use, as module-level functions like the real one,
+with one simulated terminal per process.
+
+Configured through the environment so spawned workers pick it up too:
+    FINWIZ_SIM_SYMBOLS     extra symbols besides XAUUSD (SIM001, SIM002, ...)   [5]
+    FINWIZ_SIM_POSITIONS   open positions seeded per account                    [10]
+    FINWIZ_SIM_LATENCY_MS  order_send latency, "mean" or "mean,jitter"          [20,5]
+    FINWIZ_SIM_TICK_MS     random-walk step interval                            [100]
+    FINWIZ_SIM_SEED        base seed, combined with the account login           [1]
+"""
+import os
+import time
+import zlib
+import random
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# --- CONSTANTS (same values as the MetaTrader5 package) ---
+ORDER_TYPE_BUY, ORDER_TYPE_SELL = 0, 1
+ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_SELL_LIMIT = 2, 3
+ORDER_TYPE_BUY_STOP, ORDER_TYPE_SELL_STOP = 4, 5
+ORDER_TYPE_BUY_STOP_LIMIT, ORDER_TYPE_SELL_STOP_LIMIT = 6, 7
+TRADE_ACTION_DEAL, TRADE_ACTION_PENDING, TRADE_ACTION_SLTP = 1, 5, 6
+TRADE_ACTION_MODIFY, TRADE_ACTION_REMOVE = 7, 8
+ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+ORDER_TIME_GTC = 0
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TIMEFRAME_M1, TIMEFRAME_M3, TIMEFRAME_M5, TIMEFRAME_M15, TIMEFRAME_M30 = 1, 3, 5, 15, 30
+TIMEFRAME_H1, TIMEFRAME_H4, TIMEFRAME_D1, TIMEFRAME_W1 = 16385, 16388, 16408, 32769
+
+TF_SECONDS = {TIMEFRAME_M1: 60, TIMEFRAME_M3: 180, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900,
+              TIMEFRAME_M30: 1800, TIMEFRAME_H1: 3600, TIMEFRAME_H4: 14400, TIMEFRAME_D1: 86400,
+              TIMEFRAME_W1: 604800}
+
+RATES_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                        ('close', '<f8'), ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+
+AccountInfo = namedtuple('AccountInfo', 'login balance equity margin_free profit server')
+SymbolInfo = namedtuple('SymbolInfo', 'name digits filling_mode trade_contract_size volume_min volume_max '
+                                      'volume_step point')
+Tick = namedtuple('Tick', 'time bid ask last time_msc')
+TradePosition = namedtuple('TradePosition', 'ticket symbol type volume price_open price_current sl tp profit')
+TradeOrder = namedtuple('TradeOrder', 'ticket symbol type volume_current price_open sl tp')
+OrderSendResult = namedtuple('OrderSendResult', 'retcode comment price volume order deal')
+
+
+def _env_float_pair(name, default):
+    parts = (os.environ.get(name) or default).split(',')
+    return float(parts[0]), float(parts[1]) if len(parts) > 1 else 0.0
+
+
+# --- TERMINAL ---
+class SimulatedTerminal:
+    def __init__(self):
+        self.symbol_count = int(os.environ.get('FINWIZ_SIM_SYMBOLS', 5))
+        self.position_count = int(os.environ.get('FINWIZ_SIM_POSITIONS', 10))
+        self.latency_ms, self.jitter_ms = _env_float_pair('FINWIZ_SIM_LATENCY_MS', '20,5')
+        self.tick_interval = float(os.environ.get('FINWIZ_SIM_TICK_MS', 100)) / 1000
+        self.seed = int(os.environ.get('FINWIZ_SIM_SEED', 1))
+        self._lock = threading.Lock()
+        self._latency_rng = random.Random(f"{self.seed}:latency")
+        self.login = None
+        self.server = None
+        self.balance = 100000.0
+        self._positions = {}
+        self._orders = {}
+        self._next_ticket = 1
+        self._symbols = {}  # name -> {'info', 'price', 'spread', 'step', 'last_step', 'rng'}
+
+    # --- Market ---
+    def _symbol(self, name):
+        sym = self._symbols.get(name)
+        if sym is None:
+            rng = random.Random(f"{self.seed}:{name}")
+            price = 2000.0 if name == 'XAUUSD' else round(rng.uniform(1, 500), 2)
+            digits = 2 if price > 50 else 5
+            sym = self._symbols[name] = {
+                'info': SymbolInfo(name, digits, 2, 100.0, 0.01, 100.0, 0.01, 10 ** -digits),
+                'price': price, 'spread': price * 0.0001, 'vol': price * 0.0002,
+                'last_step': int(time.time() / self.tick_interval), 'rng': rng
+            }
+        return sym
+
+    def _advance(self, sym):
+        # Random walk, one step per elapsed tick interval (capped so a long idle gap stays cheap)
+        step = int(time.time() / self.tick_interval)
+        for _ in range(min(step - sym['last_step'], 1000)):
+            sym['price'] += sym['rng'].gauss(0, sym['vol'])
+        sym['last_step'] = step
+
+    def _quote(self, name):
+        sym = self._symbol(name)
+        self._advance(sym)
+        digits = sym['info'].digits
+        bid = round(sym['price'], digits)
+        return bid, round(bid + sym['spread'], digits)
+
+    def watchlist(self):
+        return ['XAUUSD'] + [f"SIM{i:03d}" for i in range(1, self.symbol_count + 1)]
+
+    # --- Account ---
+    def initialize(self, path=None, login=None, password=None, server=None, **kwargs):
+        with self._lock:
+            self.login, self.server = login, server
+            rng = random.Random(f"{self.seed}:{login}")
+            symbols = self.watchlist()
+            for _ in range(self.position_count):
+                name = rng.choice(symbols)
+                bid, ask = self._quote(name)
+                p_type = rng.choice((ORDER_TYPE_BUY, ORDER_TYPE_SELL))
+                self._open(name, p_type, 0.01 * rng.randint(1, 10), ask if p_type == ORDER_TYPE_BUY else bid)
+        return True
+
+    def _ticket(self):
+        ticket = (self.login or 0) * 1000000 + self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _open(self, symbol, p_type, volume, price, sl=0.0, tp=0.0):
+        ticket = self._ticket()
+        self._positions[ticket] = {'ticket': ticket, 'symbol': symbol, 'type': p_type, 'volume': volume,
+                                   'price_open': price, 'sl': sl, 'tp': tp}
+        return ticket
+
+    def _position(self, p):
+        bid, ask = self._quote(p['symbol'])
+        current = bid if p['type'] == ORDER_TYPE_BUY else ask
+        sign = 1 if p['type'] == ORDER_TYPE_BUY else -1
+        size = self._symbol(p['symbol'])['info'].trade_contract_size
+        profit = round(sign * (current - p['price_open']) * p['volume'] * size, 2)
+        return TradePosition(p['ticket'], p['symbol'], p['type'], p['volume'], p['price_open'], current,
+                             p['sl'], p['tp'], profit)
+
+    def account_info(self):
+        if self.login is None:
+            return None
+        with self._lock:
+            profit = sum(self._position(p).profit for p in self._positions.values())
+        equity = self.balance + profit
+        return AccountInfo(self.login, self.balance, equity, equity * 0.9, profit, self.server)
+
+    def positions_get(self, ticket=None, symbol=None, **kwargs):
+        with self._lock:
+            rows = [self._position(p) for p in self._positions.values()
+                    if (ticket is None or p['ticket'] == ticket) and (symbol is None or p['symbol'] == symbol)]
+        return tuple(rows)
+
+    def orders_get(self, **kwargs):
+        with self._lock:
+            return tuple(TradeOrder(o['ticket'], o['symbol'], o['type'], o['volume'], o['price'], o['sl'], o['tp'])
+                         for o in self._orders.values())
+
+    def symbol_select(self, symbol, enable=True):
+        self._symbol(symbol)
+        return True
+
+    def symbol_info(self, symbol):
+        return self._symbol(symbol)['info']
+
+    def symbol_info_tick(self, symbol):
+        bid, ask = self._quote(symbol)
+        now = time.time()
+        return Tick(int(now), bid, ask, bid, int(now * 1000))
+
+    def last_error(self):
+        return (1, 'Success')
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        """Deterministic OHLC history per (symbol, timeframe), ending at the current bar."""
+        seconds = TF_SECONDS.get(timeframe, 60)
+        sym = self._symbol(symbol)
+        last_open = int(time.time()) // seconds * seconds - start * seconds
+        rng = np.random.default_rng(zlib.crc32(f"{self.seed}:{symbol}:{timeframe}".encode()))
+        # Walk backwards from the live price so the last bar meets the current quote
+        steps = rng.normal(0, sym['vol'] * 5, count)
+        close = (sym['price'] - np.concatenate(([0.0], np.cumsum(steps[:-1]))))[::-1]
+        rates = np.zeros(count, dtype=RATES_DTYPE)
+        rates['time'] = last_open - np.arange(count)[::-1] * seconds
+        rates['close'] = np.round(close, sym['info'].digits)
+        rates['open'] = np.concatenate(([rates['close'][0]], rates['close'][:-1]))
+        wick = np.abs(rng.normal(0, sym['vol'] * 3, count))
+        rates['high'] = np.maximum(rates['open'], rates['close']) + wick
+        rates['low'] = np.minimum(rates['open'], rates['close']) - wick
+        rates['tick_volume'] = rng.integers(10, 500, count)
+        return rates
+
+    # --- Trading ---
+    def order_send(self, request):
+        with self._lock:
+            delay = max(0.0, self._latency_rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+        action = request.get('action')
+        with self._lock:
+            if action == TRADE_ACTION_DEAL:
+                return self._deal(request)
+            if action == TRADE_ACTION_SLTP:
+                p = self._positions.get(request.get('position'))
+                if p is None:
+                    return self._result(TRADE_RETCODE_INVALID, 'Position not found')
+                p['sl'], p['tp'] = request.get('sl', p['sl']), request.get('tp', p['tp'])
+                return self._result(TRADE_RETCODE_DONE)
+            if action == TRADE_ACTION_PENDING:
+                ticket = self._open_order(request)
+                return self._result(TRADE_RETCODE_DONE, order=ticket, price=request.get('price', 0.0))
+            if action == TRADE_ACTION_MODIFY:
+                o = self._orders.get(request.get('order'))
+                if o is None:
+                    return self._result(TRADE_RETCODE_INVALID, 'Order not found')
+                for field in ('price', 'sl', 'tp'):
+                    if field in request:
+                        o[field] = request[field]
+                return self._result(TRADE_RETCODE_DONE)
+            if action == TRADE_ACTION_REMOVE:
+                if self._orders.pop(request.get('order'), None) is None:
+                    return self._result(TRADE_RETCODE_INVALID, 'Order not found')
+                return self._result(TRADE_RETCODE_DONE)
+        return self._result(TRADE_RETCODE_INVALID, 'Unsupported action')
+
+    def _deal(self, request):
+        symbol, volume = request['symbol'], float(request.get('volume', 0))
+        if volume <= 0:
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, 'Invalid volume')
+        bid, ask = self._quote(symbol)
+        if request.get('position'):
+            # Closing deal
+            if self._positions.pop(request['position'], None) is None:
+                return self._result(TRADE_RETCODE_INVALID, 'Position not found')
+            price = ask if request['type'] == ORDER_TYPE_BUY else bid
+            return self._result(TRADE_RETCODE_DONE, price=price, volume=volume)
+        price = ask if request['type'] == ORDER_TYPE_BUY else bid
+        ticket = self._open(symbol, request['type'], volume, price, request.get('sl', 0.0), request.get('tp', 0.0))
+        return self._result(TRADE_RETCODE_DONE, price=price, volume=volume, order=ticket, deal=ticket)
+
+    def _open_order(self, request):
+        ticket = self._ticket()
+        self._orders[ticket] = {'ticket': ticket, 'symbol': request['symbol'], 'type': request['type'],
+                                'volume': request.get('volume', 0.0), 'price': request.get('price', 0.0),
+                                'sl': request.get('sl', 0.0), 'tp': request.get('tp', 0.0)}
+        return ticket
+
+    def _result(self, retcode, comment='Request executed', price=0.0, volume=0.0, order=0, deal=0):
+        if retcode != TRADE_RETCODE_DONE:
+            price = 0.0
+        return OrderSendResult(retcode, comment, price, volume, order, deal)
+
+
+# --- MODULE API ---
+_terminal = SimulatedTerminal()
+
+initialize = _terminal.initialize
+account_info = _terminal.account_info
+positions_get = _terminal.positions_get
+orders_get = _terminal.orders_get
+symbol_select = _terminal.symbol_select
+symbol_info = _terminal.symbol_info
+symbol_info_tick = _terminal.symbol_info_tick
+last_error = _terminal.last_error
+copy_rates_from_pos = _terminal.copy_rates_from_pos
+order_send = _terminal.order_send
+
+
+def shutdown():
+    return True
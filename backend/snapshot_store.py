@@ -0,0 +1,207 @@
+import marshal
+import struct
+import threading
+import logging
+from multiprocessing import shared_memory
+
+# --- SEGMENT LAYOUT ---
+# [ seq: u64 | length: u32 | pad: u32 ] [ payload: marshal bytes ... ]
+# seq is a seqlock counter: odd while the writer is mid-update, even when stable.
+# Every completed write bumps it by 2, so it doubles as the snapshot version.
+HEADER = struct.Struct('<QII')
+SEGMENT_SIZE = 8 * 1024 * 1024
+READ_RETRIES = 100
+
+
+def _encode(data, capacity):
+    payload = marshal.dumps(data)
+    if HEADER.size + len(payload) > capacity:
+        logging.error(f"Snapshot too large ({len(payload)} bytes)")
+        payload = marshal.dumps({'ID': data.get('ID'), 'status': 'ERROR', 'error': 'Snapshot too large'})
+    return payload
+
+
+def _close(shm, unlink=True):
+    try:
+        if unlink:
+            shm.unlink()
+        shm.close()
+    except Exception:
+        pass  # A reader still holds the view, the mapping goes with its last reference
+
+
+def _publish(buf, seq, payload):
+    """Seqlock write into a segment. seq is the current (even) version, returns the new one."""
+    # Mark busy (odd), write body, mark stable (even)
+    HEADER.pack_into(buf, 0, seq + 1, 0, 0)
+    buf[HEADER.size:HEADER.size + len(payload)] = payload
+    HEADER.pack_into(buf, 0, seq + 2, len(payload), 0)
+    return seq + 2
+
+
+class SnapshotWriter:
+    """Worker side. Attaches to the account's segment and publishes snapshots into it."""
+
+    def __init__(self, name):
+        # The Flask process owns (and unlinks) the segment, workers only attach.
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.buf = self.shm.buf
+        self.seq = HEADER.unpack_from(self.buf, 0)[0] & ~1
+        self._last = None
+
+    def write(self, data):
+        """Publishes a new version, unless its content is identical to the last one. Returns True if written."""
+        payload = _encode(data, len(self.buf))
+        if payload == self._last:
+            return False
+        self.seq = _publish(self.buf, self.seq, payload)
+        self._last = payload
+        return True
+
+    def write_payload(self, payload):
+        """Publishes an already encoded snapshot, e.g. SnapshotStore.read_payload() of a segment on another host."""
+        if HEADER.size + len(payload) > len(self.buf):
+            logging.error(f"Snapshot too large ({len(payload)} bytes)")
+            return False
+        self.seq = _publish(self.buf, self.seq, payload)
+        self._last = None
+        return True
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+class SnapshotStore:
+    """
+    Flask side. Owns one shared memory segment per account. Reads are lock free
+    (seqlock retry) and the decoded dict is cached per version, so repeated reads
+    of an account that hasn't changed cost a single header unpack.
+
+    release() frees a segment once no worker writes it; the account's last state
+    (e.g. OFFLINE) can stay readable as a plain dict until create() is called again.
+    """
+
+    def __init__(self, segment_size=SEGMENT_SIZE):
+        self.segment_size = segment_size
+        self._segments = {}
+        self._cache = {}  # acc_id -> (seq, data)
+        self._released = {}  # acc_id -> (seq, data) of accounts without a segment
+        self._lock = threading.Lock()
+
+    def create(self, acc_id):
+        """Returns the segment name a worker should attach its SnapshotWriter to."""
+        acc_id = str(acc_id)
+        with self._lock:
+            shm = self._segments.get(acc_id)
+            if shm is None:
+                shm = shared_memory.SharedMemory(create=True, size=self.segment_size)
+                # Versions carry on from the released state, so readers still see every change
+                seq = self._released.get(acc_id, (0,))[0]
+                HEADER.pack_into(shm.buf, 0, seq, 0, 0)
+                self._segments[acc_id] = shm
+                self._released.pop(acc_id, None)
+            return shm.name
+
+    def release(self, acc_id, final=None):
+        """Closes and unlinks the account's segment; `final` stays readable, without it the account is gone."""
+        acc_id = str(acc_id)
+        with self._lock:
+            shm = self._segments.pop(acc_id, None)
+            self._cache.pop(acc_id, None)
+            prev = self._released.pop(acc_id, (0,))[0]
+            if shm is not None:
+                prev = HEADER.unpack_from(shm.buf, 0)[0] & ~1
+                _close(shm)
+            if final is not None:
+                self._released[acc_id] = (prev + 2, final)
+
+    def segments(self):
+        """Accounts that still hold a shared memory segment."""
+        return list(self._segments.keys())
+
+    def write(self, acc_id, data):
+        """Parent-side write, only safe once the account's worker is gone."""
+        self.create(acc_id)
+        buf = self._segments[str(acc_id)].buf
+        _publish(buf, HEADER.unpack_from(buf, 0)[0] & ~1, _encode(data, len(buf)))
+
+    def read_versioned(self, acc_id):
+        acc_id = str(acc_id)
+        shm = self._segments.get(acc_id)
+        if shm is None:
+            return self._released.get(acc_id, (0, {}))
+        try:
+            return self._read_segment(acc_id, shm.buf)
+        except (TypeError, ValueError):
+            return self._released.get(acc_id, (0, {}))  # Released while we were reading
+
+    def _read_segment(self, acc_id, buf):
+        cached = self._cache.get(acc_id)
+        for _ in range(READ_RETRIES):
+            seq, length, _ = HEADER.unpack_from(buf, 0)
+            if seq & 1:
+                continue  # Writer mid-update
+            if cached and cached[0] == seq:
+                return cached
+            payload = bytes(buf[HEADER.size:HEADER.size + length])
+            if HEADER.unpack_from(buf, 0)[0] != seq:
+                continue  # Torn read, try again
+            data = marshal.loads(payload) if length else {}
+            cached = (seq, data)
+            self._cache[acc_id] = cached
+            return cached
+
+        # Writer is hammering the segment; serve the last good copy
+        return cached if cached else (0, {})
+
+    def read(self, acc_id):
+        return self.read_versioned(acc_id)[1]
+
+    def read_payload(self, acc_id):
+        """(version, marshal bytes) without decoding, for relaying a segment to another store."""
+        shm = self._segments.get(str(acc_id))
+        if shm is None:
+            return 0, b''
+        try:
+            buf = shm.buf
+            for _ in range(READ_RETRIES):
+                seq, length, _ = HEADER.unpack_from(buf, 0)
+                if seq & 1:
+                    continue
+                payload = bytes(buf[HEADER.size:HEADER.size + length])
+                if HEADER.unpack_from(buf, 0)[0] == seq:
+                    return seq, payload
+        except (TypeError, ValueError):
+            pass  # Released meanwhile
+        return 0, b''  # Caller retries on its next poll
+
+    def version(self, acc_id):
+        acc_id = str(acc_id)
+        shm = self._segments.get(acc_id)
+        if shm is not None:
+            try:
+                return HEADER.unpack_from(shm.buf, 0)[0]
+            except (TypeError, ValueError):
+                pass  # Released meanwhile
+        return self._released.get(acc_id, (0,))[0]
+
+    def accounts(self):
+        return list(self._segments.keys()) + list(self._released.keys())
+
+    def items(self):
+        return [(acc_id, self.read(acc_id)) for acc_id in self.accounts()]
+
+    def snapshot(self):
+        return dict(self.items())
+
+    def __contains__(self, acc_id):
+        return str(acc_id) in self._segments or str(acc_id) in self._released
+
+    def close(self):
+        with self._lock:
+            for shm in self._segments.values():
+                _close(shm)
+            self._segments.clear()
+            self._cache.clear()
+            self._released.clear()
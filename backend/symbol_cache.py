@@ -0,0 +1,69 @@
+import time
+import logging
+
+DEFAULT_TTL = 3600  # Contract specs rarely change intra-day
+
+# order_send retcodes that suggest our cached spec is stale
+STALE_SPEC_RETCODES = (10014, 10030)  # TRADE_RETCODE_INVALID_VOLUME, TRADE_RETCODE_INVALID_FILL
+
+
+# --- SYMBOL CACHE ---
+class SymbolCache:
+    """
+    Per-worker cache of what order_send needs from symbol_info(): filling mode,
+    digits and volume limits. Entries expire after `ttl` seconds or on invalidate().
+    """
+
+    def __init__(self, mt5, ttl=DEFAULT_TTL):
+        self.mt5 = mt5
+        self.ttl = ttl
+        self._specs = {}  # symbol -> (loaded_at, spec)
+
+    def preload(self, symbols):
+        for s in symbols:
+            self.get(s)
+
+    def get(self, symbol):
+        entry = self._specs.get(symbol)
+        if entry and time.time() - entry[0] < self.ttl:
+            return entry[1]
+
+        mt5 = self.mt5
+        if not mt5.symbol_select(symbol, True):
+            return None
+        s_info = mt5.symbol_info(symbol)
+        if not s_info:
+            return None
+
+        filling_mode = mt5.ORDER_FILLING_RETURN
+        if s_info.filling_mode & 1:
+            filling_mode = mt5.ORDER_FILLING_FOK
+        elif s_info.filling_mode & 2:
+            filling_mode = mt5.ORDER_FILLING_IOC
+
+        spec = {
+            'filling': filling_mode, 'digits': s_info.digits, 'contract_size': s_info.trade_contract_size,
+            'volume_min': s_info.volume_min, 'volume_max': s_info.volume_max,
+            'volume_step': s_info.volume_step
+        }
+        self._specs[symbol] = (time.time(), spec)
+        return spec
+
+    def invalidate(self, symbol=None):
+        if symbol is None:
+            self._specs.clear()
+        else:
+            self._specs.pop(symbol, None)
+        logging.info(f"Symbol cache invalidated: {symbol or 'ALL'}")
+
+
+def normalize_volume(volume, spec):
+    """Snaps a lot size to the symbol's volume_step and clamps it to volume_min/volume_max."""
+    step = spec.get('volume_step') or 0.01
+    v_min = spec.get('volume_min') or step
+    v_max = spec.get('volume_max') or float('inf')
+
+    text = repr(float(step))
+    decimals = len(text.split('.')[1]) if 'e' not in text else 8
+    volume = round(round(volume / step) * step, decimals)
+    return min(max(volume, v_min), v_max)
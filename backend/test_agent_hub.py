@@ -0,0 +1,30 @@
+from agent_hub import AgentHub, is_loopback
+
+
+class Hub(AgentHub):
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), b'key')
+        self.sent = []
+
+    def send(self, agent_id, kind, *args):
+        self.sent.append((agent_id, kind) + args)
+
+
+def test_remote_queue_depth_comes_from_agent_pings():
+    hub = Hub()
+    hub.on_event('joined', 'box', 2, 'host')
+    worker, q = hub.place('A', {}, {}, 'seg')
+    assert q.qsize() == 0
+    hub.on_event('depths', 'box', {'A': 3, 'gone': 9})
+    assert q.qsize() == 3
+    q.put({'action': 'TRADE'})
+    assert hub.sent[-1][:3] == ('box', 'COMMAND', 'A')
+    hub.on_event('lost', 'box')
+    q.put({'action': 'TRADE'})  # Held for drain_pending; the agent's depth died with it
+    assert q.qsize() == 1
+
+
+def test_only_loopback_binds_count_as_local():
+    assert is_loopback('127.0.0.1') and is_loopback('localhost')
+    assert not is_loopback('0.0.0.0')
+    assert not is_loopback('10.0.0.5')
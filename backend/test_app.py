@@ -0,0 +1,81 @@
+import os
+import queue
+
+os.environ.setdefault('FINWIZ_MT5', 'sim')
+os.environ.setdefault('FINWIZ_DB', 'local')
+
+import app
+
+
+class Proc:
+    def __init__(self, alive=True):
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+def drain(q):
+    out = []
+    while not q.empty():
+        out.append(q.get_nowait())
+    return out
+
+
+def test_tick_feed_moves_off_a_worker_that_is_not_healthy(monkeypatch):
+    queues = {'A': queue.Queue(), 'B': queue.Queue()}
+    procs = {'A': Proc(), 'B': Proc()}
+    healthy = ['A', 'B']
+    monkeypatch.setattr(app, 'COMMAND_QUEUES', queues)
+    monkeypatch.setattr(app, 'WORKER_PROCESSES', procs)
+    monkeypatch.setattr(app.SUPERVISOR, 'healthy', lambda: list(healthy))
+    monkeypatch.setattr(app.LIVE_BARS, 'symbols', lambda: ['XAUUSD'])
+    monkeypatch.setattr(app, 'TICK_FEED', {'acc': None, 'symbols': []})
+
+    app.refresh_tick_feed()
+    assert app.TICK_FEED['acc'] == 'A'
+    assert drain(queues['A']) == [{'action': 'WATCH_TICKS', 'symbols': ['XAUUSD']}]
+
+    healthy.remove('A')  # Stuck CONNECTING
+    app.refresh_tick_feed()
+    assert app.TICK_FEED['acc'] == 'B'
+    assert drain(queues['A']) == [{'action': 'WATCH_TICKS', 'symbols': []}]
+    assert drain(queues['B']) == [{'action': 'WATCH_TICKS', 'symbols': ['XAUUSD']}]
+
+    healthy.append('A')  # Back, but the feed doesn't bounce
+    procs['B'].alive = False  # Its agent was lost: heartbeat still fresh, process gone
+    app.refresh_tick_feed()
+    assert app.TICK_FEED['acc'] == 'A'
+
+    healthy.clear()  # Nobody ONLINE: keep what we have rather than churn
+    app.refresh_tick_feed()
+    assert app.TICK_FEED['acc'] == 'A'
+
+
+class Agents:
+    def __init__(self, status):
+        self._status = status
+
+    def status(self):
+        return self._status
+
+
+def test_collect_metrics_drops_gauges_of_stopped_workers_and_lost_agents(monkeypatch):
+    queues = {'A': queue.Queue(), 'B': queue.Queue()}
+    procs = {'A': Proc(), 'B': Proc()}
+    agents = {'box1': {'accounts': ['A']}, 'box2': {'accounts': ['B']}}
+    monkeypatch.setattr(app, 'METRICS', app.MetricsRegistry())
+    monkeypatch.setattr(app, 'COMMAND_QUEUES', queues)
+    monkeypatch.setattr(app, 'WORKER_PROCESSES', procs)
+    monkeypatch.setattr(app, 'AGENTS', Agents(agents))
+    monkeypatch.setattr(app.SUPERVISOR, 'status', lambda: {a: {'restarts': 0, 'uptime_s': 1.0} for a in procs})
+
+    def series():
+        return sorted((g['name'], tuple(g['labels'].values())) for g in app.METRICS.as_dict()['gauges'] if g['labels'])
+
+    app.collect_metrics()
+    assert len(series()) == 8
+    del procs['B'], queues['B'], agents['box2']
+    app.collect_metrics()
+    assert series() == [('agent_accounts', ('box1',)), ('command_queue_depth', ('A',)),
+                        ('worker_restarts', ('A',)), ('worker_uptime_seconds', ('A',))]
@@ -0,0 +1,47 @@
+import numpy as np
+
+from candles import CANDLE_FIELDS, COLUMN_DTYPES
+from candle_store import CandleStore
+
+
+def bars(times, close):
+    n = len(times)
+    return {'time': np.array(times, dtype=COLUMN_DTYPES['time']),
+            **{f: np.full(n, close, dtype=COLUMN_DTYPES[f]) for f in CANDLE_FIELDS[1:]}}
+
+
+def test_incremental_backfill_overwrites_the_overlap_and_appends(tmp_path):
+    store = CandleStore(str(tmp_path / 'c.db'))
+    assert store.merge('XAU', '1M', bars([60, 120, 180], 1.0), 3)
+    # The forming bar (180) came back final, 240 is new
+    assert store.merge('XAU', '1M', bars([180, 240], 2.0), 2, incremental=True)
+    tail = store.tail('XAU', '1M', 10)
+    assert tail['time'].tolist() == [60, 120, 180, 240]
+    assert tail['close'].tolist() == [1.0, 1.0, 2.0, 2.0]
+    assert store.tail('XAU', '1M', 2)['time'].tolist() == [180, 240]
+    store.close()
+
+    # Persisted: a fresh store reads the merged series back from disk
+    reopened = CandleStore(str(tmp_path / 'c.db'))
+    assert reopened.tail('XAU', '1M', 10)['close'].tolist() == [1.0, 1.0, 2.0, 2.0]
+    reopened.close()
+
+
+def test_incremental_fetch_with_a_gap_is_refused(tmp_path):
+    store = CandleStore(str(tmp_path / 'c.db'))
+    store.merge('XAU', '1M', bars([60, 120], 1.0), 2)
+    assert not store.merge('XAU', '1M', bars([300, 360], 2.0), 2, incremental=True)
+    assert store.tail('XAU', '1M', 10)['time'].tolist() == [60, 120]
+    # The full fetch that follows fills it in
+    assert store.merge('XAU', '1M', bars([120, 180, 240, 300, 360], 2.0), 5)
+    assert store.tail('XAU', '1M', 10)['time'].tolist() == [60, 120, 180, 240, 300, 360]
+    store.close()
+
+
+def test_bars_needed_is_small_once_synced(tmp_path):
+    store = CandleStore(str(tmp_path / 'c.db'))
+    assert store.bars_needed('XAU', '1M', 500) == 500  # Cold
+    store.merge('XAU', '1M', bars(list(range(60, 60 * 501, 60)), 1.0), 500)
+    assert store.bars_needed('XAU', '1M', 500) == 2  # Just synced: the forming bar and one more
+    assert store.bars_needed('XAU', '1M', 1000) == 1000  # Deeper than we ever fetched
+    store.close()
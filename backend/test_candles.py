@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+
+from candles import pack_rates, unpack_columns, last_bar, encode_rows_json, encode_columns_json
+
+RATES = np.array([(60, 1.0, 1.5, 0.5, 1.25), (120, 1.25, 2.0, 1.0, 1.75)],
+                 dtype=[('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8')])
+
+
+def test_rows_and_columns_round_trip():
+    cols = unpack_columns(pack_rates(RATES))
+    assert json.loads(encode_rows_json(cols)) == [
+        {'time': 60, 'open': 1.0, 'high': 1.5, 'low': 0.5, 'close': 1.25},
+        {'time': 120, 'open': 1.25, 'high': 2.0, 'low': 1.0, 'close': 1.75}]
+    assert json.loads(encode_columns_json(cols))['close'] == [1.25, 1.75]
+    assert last_bar(pack_rates(RATES))['time'] == 120
+    assert encode_rows_json(unpack_columns(pack_rates(None))) == '[]'
+
+
+def test_non_finite_prices_encode_as_null():
+    rates = RATES.copy()
+    rates['high'][0] = np.nan
+    rates['low'][1] = -np.inf
+    cols = unpack_columns(pack_rates(rates))
+    strict = lambda c: (_ for _ in ()).throw(ValueError(c))  # Rejects NaN / Infinity literals
+    rows = json.loads(encode_rows_json(cols), parse_constant=strict)
+    assert rows[0]['high'] is None and rows[1]['low'] is None and rows[1]['close'] == 1.75
+    columns = json.loads(encode_columns_json(cols), parse_constant=strict)
+    assert columns['high'] == [None, 2.0] and columns['low'] == [0.5, None]
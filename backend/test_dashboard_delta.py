@@ -0,0 +1,87 @@
+import copy
+
+from dashboard_delta import DeltaEncoder, TOTAL_FIELDS, position_key, order_key
+
+
+def apply(client, msg):
+    """Python mirror of applyDashboardFrame / applyRowDelta in dashboard.js."""
+    msg = copy.deepcopy(msg)
+    if msg['full']:
+        client.clear()
+        client.update(positions={position_key(p): p for p in msg['positions']},
+                      orders={order_key(o): o for o in msg['orders']},
+                      prices=msg['prices'], exposure=msg['exposure'])
+    else:
+        assert msg['seq'] == client['seq'] + 1
+        for name, key_fn in (('positions', position_key), ('orders', order_key)):
+            delta = msg.get(name)
+            if not delta:
+                continue
+            for k in delta['remove']:
+                client[name].pop(k, None)
+            for changed in delta['update']:
+                client[name][changed.pop('key')].update(changed)
+            for row in delta['add']:
+                client[name][key_fn(row)] = row
+        client['prices'].update(msg.get('prices', {}))
+        for s in msg.get('prices_remove', []):
+            del client['prices'][s]
+        client['exposure'].update(msg.get('exposure', {}))
+    client.update({f: msg[f] for f in TOTAL_FIELDS if f in msg})
+    client['seq'] = msg['seq']
+
+
+def view(state):
+    return {
+        'positions': {position_key(p): p for p in state.get('positions', [])},
+        'orders': {order_key(o): o for o in state.get('orders', [])},
+        'prices': state.get('prices', {}), 'exposure': state.get('exposure', {}),
+        **{f: state.get(f) for f in TOTAL_FIELDS},
+    }
+
+
+def pos(ticket, profit, login=1):
+    return {'account_login': login, 'ticket': ticket, 'symbol': 'XAUUSD', 'type': 'BUY', 'profit': profit}
+
+
+STATES = [
+    {'balance': 100, 'equity': 100, 'positions': [pos(1, 0.0)], 'orders': [],
+     'prices': {'XAUUSD': {'bid': 1.0}, 'EURUSD': {'bid': 2.0}}, 'exposure': {'totals': {'margin': 1}}},
+    {'balance': 100, 'equity': 101, 'positions': [pos(1, 1.0), pos(2, 0.5)], 'orders': [{'account': 1, 'ticket': 9}],
+     'prices': {'XAUUSD': {'bid': 1.5}, 'EURUSD': {'bid': 2.0}}, 'exposure': {'totals': {'margin': 2}}},
+    # EURUSD unwatched, position 1 closed, order filled
+    {'balance': 102, 'equity': 102, 'positions': [pos(2, 0.7)], 'orders': [],
+     'prices': {'XAUUSD': {'bid': 1.5}}, 'exposure': {'totals': {'margin': 1}}},
+    {'balance': 102, 'equity': 102, 'positions': [pos(2, 0.7)], 'orders': [],
+     'prices': {'XAUUSD': {'bid': 1.5}, 'GBPUSD': {'bid': 3.0}}, 'exposure': {'totals': {'margin': 1}}},
+]
+
+
+def test_deltas_rebuild_every_state():
+    enc, client = DeltaEncoder(keyframe_every=100), {}
+    for state in STATES:
+        msg = enc.encode(state)
+        assert msg is not None
+        apply(client, msg)
+        assert {k: v for k, v in client.items() if k != 'seq'} == view(state)
+    assert enc.encode(STATES[-1]) is None  # Unchanged: nothing to send
+
+
+def test_removed_quotes_are_sent():
+    enc = DeltaEncoder(keyframe_every=100)
+    enc.encode(STATES[1])
+    msg = enc.encode(STATES[2])
+    assert msg['prices_remove'] == ['EURUSD']
+    assert 'prices' not in msg
+    # Only the quote went away: still a frame, not "nothing changed"
+    assert enc.encode(dict(STATES[2], prices={})) == {'seq': msg['seq'] + 1, 'full': False,
+                                                        'prices_remove': ['XAUUSD']}
+
+
+def test_keyframe_resyncs_a_client_that_missed_frames():
+    enc = DeltaEncoder(keyframe_every=100)
+    for state in STATES:
+        enc.encode(state)
+    client = {}
+    apply(client, enc.keyframe())
+    assert {k: v for k, v in client.items() if k != 'seq'} == view(STATES[-1])
@@ -0,0 +1,19 @@
+from dashboard_rooms import DashboardRooms
+from sessions import SessionStore
+
+
+def test_set_owner_replaces_the_users_accounts():
+    rooms = DashboardRooms()
+    rooms.set_owner('u1', ['A', 'B'])
+    rooms.set_owner('u2', ['C'])
+    rooms.set_owner('u1', ['B'])
+    assert (rooms.owner('A'), rooms.owner('B'), rooms.owner('C')) == (None, 'u1', 'u2')
+
+
+def test_session_tokens_resolve_to_their_user_only():
+    sessions = SessionStore(max_per_user=2)
+    first, second = sessions.open('u1'), sessions.open('u1')
+    assert sessions.user_for(second) == 'u1'
+    assert sessions.user_for('u1') is None and sessions.user_for(None) is None
+    sessions.open('u1')
+    assert sessions.user_for(first) is None
@@ -0,0 +1,52 @@
+from exposure import ExposureEngine
+
+
+def pos(symbol, side, volume, price_open, price_current, profit, sl=0.0, tp=0.0):
+    return {'symbol': symbol, 'type': side, 'volume': volume, 'price_open': price_open,
+            'price_current': price_current, 'sl': sl, 'tp': tp, 'profit': profit}
+
+
+SNAPSHOT = {
+    'A': {'status': 'ONLINE', 'equity': 1000.0, 'margin_free': 800.0, 'positions': [
+        pos('XAU', 'BUY', 0.1, 100.0, 110.0, 10.0, sl=95.0, tp=120.0),
+        pos('XAU', 'SELL', 0.2, 112.0, 110.0, 4.0)]},
+    'B': {'status': 'ONLINE', 'equity': 500.0, 'margin_free': 500.0, 'positions': [
+        pos('XAU', 'BUY', 0.3, 104.0, 110.0, 18.0, sl=97.0, tp=120.0)]},
+    'C': {'status': 'OFFLINE', 'equity': 900.0, 'margin_free': 0.0, 'positions': [
+        pos('XAU', 'BUY', 5.0, 1.0, 110.0, 999.0)]},
+}
+
+
+def test_groups_are_volume_weighted_and_keep_common_levels():
+    out = ExposureEngine().compute(SNAPSHOT)
+    buy = out['groups']['XAU_BUY']
+    assert buy['volume'] == 0.4 and buy['count'] == 2 and buy['profit'] == 28.0
+    assert buy['price_open'] == 103.0  # (0.1 * 100 + 0.3 * 104) / 0.4
+    assert buy['sl'] == 0.0  # 95 vs 97: children differ
+    assert buy['tp'] == 120.0
+    assert buy['sl_distance'] == 13.0  # Nearest stop, 110 - 97
+    assert out['groups']['XAU_SELL']['sl_distance'] is None
+
+
+def test_symbols_accounts_and_totals_skip_offline_accounts():
+    out = ExposureEngine().compute(SNAPSHOT)
+    assert out['symbols']['XAU'] == {'net_volume': 0.2, 'buy_volume': 0.4, 'sell_volume': 0.2, 'profit': 32.0}
+    assert set(out['accounts']) == {'A', 'B'}
+    assert out['accounts']['A'] == {'margin': 200.0, 'margin_pct': 20.0, 'margin_level': 500.0,
+                                    'profit': 14.0, 'positions': 2}
+    assert out['accounts']['B']['margin_level'] is None  # No margin in use
+    assert out['totals'] == {'margin': 200.0, 'margin_pct': 13.33}
+
+
+def test_arrays_are_rebuilt_only_for_changed_snapshots():
+    engine = ExposureEngine()
+    engine.compute(SNAPSHOT)
+    block = engine._blocks['A'][1]
+    engine.compute(SNAPSHOT)
+    assert engine._blocks['A'][1] is block
+    changed = dict(SNAPSHOT, A=dict(SNAPSHOT['A'], positions=[]))
+    assert 'XAU_SELL' not in engine.compute(changed)['groups']
+    engine.prune({'B'})
+    assert set(engine._blocks) == {'B'}
+    assert ExposureEngine().compute({}) == {'groups': {}, 'symbols': {}, 'accounts': {},
+                                            'totals': {'margin': 0.0, 'margin_pct': 0.0}}
@@ -0,0 +1,34 @@
+from live_bars import LiveBarBook, bar_open_time, candle_room
+
+
+def test_ticks_update_the_forming_bar_and_roll_at_the_boundary():
+    book = LiveBarBook()
+    room, prev, needs_seed = book.subscribe('sid1', 'XAU', '1M')
+    assert (room, prev, needs_seed) == (candle_room('XAU', '1M'), None, True)
+    assert book.on_tick('XAU', 1.0, 125) == []  # Not seeded yet
+    book.seed('XAU', '1M', {'time': 120, 'open': 1.0, 'high': 1.2, 'low': 0.9, 'close': 1.1})
+
+    [(_, bar)] = book.on_tick('XAU', 1.5, 150)
+    assert (bar['high'], bar['low'], bar['close']) == (1.5, 0.9, 1.5)
+    assert book.on_tick('XAU', 9.9, 100) == []  # Older than the seeded bar
+    [(_, bar)] = book.on_tick('XAU', 1.4, 181)
+    assert bar == {'time': 180, 'open': 1.4, 'high': 1.4, 'low': 1.4, 'close': 1.4,
+                   'symbol': 'XAU', 'timeframe': '1M'}
+    assert book.on_tick('EUR', 1.0, 181) == []
+
+
+def test_switching_series_leaves_the_old_room_and_drops_unwatched_bars():
+    book = LiveBarBook()
+    book.subscribe('sid1', 'XAU', '1M')
+    book.subscribe('sid2', 'XAU', '1M')
+    _, prev, _ = book.subscribe('sid1', 'EUR', '5M')
+    assert prev == candle_room('XAU', '1M')
+    assert book.symbols() == ['EUR', 'XAU']
+    assert book.unsubscribe('sid2') == candle_room('XAU', '1M')
+    assert book.symbols() == ['EUR']
+
+
+def test_weekly_bars_open_on_sunday():
+    sunday = 3 * 86400  # 1970-01-04
+    assert bar_open_time(sunday + 5 * 86400, '1W') == sunday
+    assert bar_open_time(sunday - 1, '1W') == sunday - 7 * 86400
@@ -0,0 +1,60 @@
+import db_manager
+from local_firestore import LocalFirestore, ChangeType
+
+FIXTURE = {
+    'USERS': {'u1': {'MOBILE': '1', 'PASS': 'x', '__collections__': {'ACCOUNTS': {
+        'a1': {'USER': 1, 'IS_ACTIVE': True, 'SYMBOL_CONFIG': {'XAUUSD': {'VOLUME': 0.5}}},
+        'a2': {'USER': 2, 'IS_ACTIVE': False, 'SYMBOL_CONFIG': {}},
+    }}}},
+    'SYMBOLS': {'XAUUSD': {'TRAIL_AMOUNT': 0.5}},
+}
+
+
+def accounts(db):
+    return db.collection('USERS').document('u1').collection('ACCOUNTS')
+
+
+def test_map_fields_stay_fields_and_subcollections_are_explicit():
+    db = LocalFirestore(FIXTURE)
+    user = db.collection('USERS').document('u1').get().to_dict()
+    assert user == {'MOBILE': '1', 'PASS': 'x'}
+    a1 = accounts(db).document('a1').get().to_dict()
+    assert a1 == {'USER': 1, 'IS_ACTIVE': True, 'SYMBOL_CONFIG': {'XAUUSD': {'VOLUME': 0.5}}}
+
+
+def test_where_operators():
+    db = LocalFirestore(FIXTURE)
+    ids = lambda q: sorted(d.id for d in q.stream())
+    assert ids(accounts(db).where('IS_ACTIVE', '==', True)) == ['a1']
+    assert ids(accounts(db).where('USER', '>=', 1).where('USER', '<', 2)) == ['a1']
+    assert ids(accounts(db).where('USER', 'in', [2, 3])) == ['a2']
+    assert ids(accounts(db).where('MISSING', '!=', 1)) == []
+    assert [d.id for d in db.collection('USERS').where('MOBILE', '==', '1').get()] == ['u1']
+
+
+def test_on_snapshot_fires_on_set_update_delete():
+    db = LocalFirestore(FIXTURE)
+    calls = []
+    watch = accounts(db).on_snapshot(lambda docs, changes, ts: calls.append(
+        (sorted(d.id for d in docs), [(c.type, c.document.id) for c in changes])))
+    assert calls[-1] == (['a1', 'a2'], [(ChangeType.ADDED, 'a1'), (ChangeType.ADDED, 'a2')])
+    accounts(db).document('a3').set({'USER': 3})
+    assert calls[-1] == (['a1', 'a2', 'a3'], [(ChangeType.ADDED, 'a3')])
+    accounts(db).document('a1').update({'IS_ACTIVE': False})
+    assert calls[-1][1] == [(ChangeType.MODIFIED, 'a1')]
+    accounts(db).document('a2').delete()
+    assert calls[-1] == (['a1', 'a3'], [(ChangeType.REMOVED, 'a2')])
+    watch.unsubscribe()
+    accounts(db).document('a4').set({})
+    assert len(calls) == 4
+
+
+def test_collection_cache_stays_live_through_the_listener(monkeypatch):
+    db = LocalFirestore(FIXTURE)
+    monkeypatch.setattr(db_manager, 'get_db', lambda: db)
+    cache = db_manager.CollectionCache(lambda: accounts(db), ttl=0)
+    assert set(cache.docs()) == {'a1', 'a2'}
+    assert cache._watch is not None  # Listener attached, no TTL re-reads
+    accounts(db).document('a1').update({'IS_ACTIVE': False})  # Written behind the cache's back
+    assert cache.docs()['a1']['IS_ACTIVE'] is False
+    cache.close()
@@ -0,0 +1,30 @@
+from market_feed import FeedRegistry, merge_quotes
+
+
+def test_feed_moves_to_an_online_worker_of_the_same_server():
+    feeds = FeedRegistry()
+    assert feeds.add('a', 'srv1')
+    assert not feeds.add('b', 'srv1')
+    assert feeds.add('c', 'srv2')
+    # 'a' is stuck CONNECTING: 'b' takes srv1, srv2 has nobody better than 'c'
+    assert feeds.hand_over({'b'}) == [('a', 'b')]
+    assert feeds.feeds() == {'srv1': 'b', 'srv2': 'c'}
+    assert feeds.hand_over({'b'}) == []  # No flapping while 'a' stays down
+    assert feeds.hand_over({'a', 'b'}) == []  # Nor back once 'a' recovers
+
+
+def test_feed_passes_on_when_its_worker_stops():
+    feeds = FeedRegistry()
+    feeds.add('a', 'srv1')
+    feeds.add('b', 'srv1')
+    assert feeds.remove('b') is None
+    assert feeds.remove('a') is None
+    assert feeds.feeds() == {}
+    feeds.add('a', 'srv1')
+    feeds.add('b', 'srv1')
+    assert feeds.remove('a') == 'b'
+
+
+def test_merge_quotes_keeps_the_freshest():
+    merged = merge_quotes([{'X': {'bid': 1, 'ts': 2}}, {'X': {'bid': 2, 'ts': 3}, 'Y': {'bid': 5, 'ts': 1}}])
+    assert merged == {'X': {'bid': 2, 'ts': 3}, 'Y': {'bid': 5, 'ts': 1}}
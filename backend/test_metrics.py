@@ -0,0 +1,62 @@
+from metrics import MetricsRegistry, Histogram, _bucket, _bucket_bound
+
+
+def test_mixed_label_value_types_sort_and_render():
+    reg = MetricsRegistry()
+    reg.counter('order_send_total', retcode=10009).inc()
+    reg.counter('order_send_total', retcode='none').inc()
+    reg.counter('order_send_total', retcode='10009').inc()  # Same series as the int
+    out = reg.as_dict()['counters']
+    assert {(c['labels']['retcode'], c['value']) for c in out} == {('10009', 2), ('none', 1)}
+    assert 'finwiz_order_send_total{retcode="none"} 1' in reg.prometheus()
+
+
+def test_merged_worker_summary_with_mixed_labels():
+    worker = MetricsRegistry()
+    worker.counter('order_send_total', retcode=10009).inc(3)
+    worker.histogram('order_send_ms', retcode=10009).record(12.0)
+    server = MetricsRegistry()
+    server.counter('order_send_total', retcode='none', account='a1').inc()
+    server.merge(worker.flush(), account='a1')
+    server.merge([('counter', 'order_send_total', (('retcode', 10009),), 2)], account=7)
+    server.prometheus()  # Must not raise on int vs str labels
+    values = {tuple(sorted(c['labels'].items())): c['value'] for c in server.as_dict()['counters']}
+    assert values[(('account', 'a1'), ('retcode', '10009'))] == 3
+    assert values[(('account', '7'), ('retcode', '10009'))] == 2
+
+
+def test_histogram_buckets_stay_within_a_few_percent():
+    for value in (0.002, 0.5, 3.0, 47.0, 1234.5):
+        bound = _bucket_bound(_bucket(value))
+        assert value <= bound <= value * 1.04
+
+
+def test_histogram_percentiles_and_merge_are_exact():
+    a, b = Histogram(), Histogram()
+    for v in range(1, 101):
+        (a if v % 2 else b).record(float(v))
+    a.merge(b.buckets, b.count, b.sum, b.max)
+    assert a.count == 100 and a.sum == 5050.0 and a.max == 100.0
+    assert 49 <= a.percentile(0.5) <= 52
+    assert a.percentile(1.0) == 100.0
+
+
+def test_flush_resets_counters_and_keeps_gauges():
+    reg = MetricsRegistry()
+    reg.counter('c').inc(2)
+    reg.gauge('g').set(5)
+    reg.histogram('h').record(1.0)
+    kinds = {kind for kind, *_ in reg.flush()}
+    assert kinds == {'counter', 'gauge', 'histogram'}
+    assert [(kind, name) for kind, name, _, _ in reg.flush()] == [('gauge', 'g')]
+
+
+def test_prune_drops_series_for_labels_no_longer_present():
+    metrics = MetricsRegistry()
+    for acc in ('A', 'B'):
+        metrics.gauge('worker_restarts', account=acc).set(1)
+        metrics.counter('trades', account=acc).inc()
+    metrics.prune('gauge', 'worker_restarts', 'account', ['A'])
+    gauges = [(g['name'], g['labels']) for g in metrics.as_dict()['gauges']]
+    assert gauges == [('worker_restarts', {'account': 'A'})]
+    assert len(metrics.as_dict()['counters']) == 2
@@ -0,0 +1,52 @@
+from snapshot_store import SnapshotStore
+from position_index import PositionIndex
+
+
+def test_position_index_forgets_deleted_accounts():
+    store = SnapshotStore(segment_size=64 * 1024)
+    try:
+        store.write('A', {'positions': [{'ticket': 1, 'symbol': 'XAUUSD', 'type': 'BUY'}], 'orders': []})
+        index = PositionIndex(store)
+        index.refresh()
+        assert index.resolve_positions('1') == [('A', 1)]
+        store.release('A')
+        index.refresh()
+        assert index.resolve_positions('1') == []
+    finally:
+        store.close()
+
+
+def test_master_tickets_need_a_buy_or_sell_side():
+    store = SnapshotStore(segment_size=64 * 1024)
+    try:
+        store.write('A', {'positions': [{'ticket': 1, 'symbol': 'XAUUSD_i', 'type': 'BUY'},
+                                        {'ticket': 2, 'symbol': 'XAUUSD', 'type': 'SELL'}], 'orders': []})
+        index = PositionIndex(store)
+        assert index.resolve_positions(1) == [('A', 1)]
+        assert index.resolve_positions('XAUUSD_i_BUY') == [('A', 1)]
+        assert index.resolve_positions('XAUUSD_SELL') == [('A', 2)]
+        assert index.resolve_positions('XAUUSD_SELL_1') == []
+        assert index.resolve_positions('XAUUSD_i') == []
+    finally:
+        store.close()
+
+
+def test_accounts_on_different_servers_can_share_a_ticket():
+    store = SnapshotStore(segment_size=64 * 1024)
+    try:
+        store.write('A', {'positions': [{'ticket': 5, 'symbol': 'XAUUSD', 'type': 'BUY'}],
+                          'orders': [{'ticket': 9}]})
+        store.write('B', {'positions': [{'ticket': 5, 'symbol': 'XAUUSD', 'type': 'BUY'}],
+                          'orders': [{'ticket': 9}]})
+        index = PositionIndex(store)
+        assert sorted(index.resolve_positions('5')) == [('A', 5), ('B', 5)]
+        assert sorted(index.resolve_positions('XAUUSD_BUY')) == [('A', 5), ('B', 5)]
+        assert sorted(index.resolve_orders(9)) == [('A', 9), ('B', 9)]
+
+        # Re-indexing A (position closed, order filled) leaves B's entries alone
+        store.write('A', {'positions': [], 'orders': []})
+        assert index.resolve_positions(5) == [('B', 5)]
+        assert index.resolve_positions('XAUUSD_BUY') == [('B', 5)]
+        assert index.resolve_orders('9') == [('B', 9)]
+    finally:
+        store.close()
@@ -0,0 +1,22 @@
+import random
+
+import sim_terminal
+from sim_terminal import SimulatedTerminal
+
+
+def order_delays(monkeypatch, n=5):
+    delays = []
+    monkeypatch.setattr(sim_terminal.time, 'sleep', delays.append)
+    terminal = SimulatedTerminal()
+    for _ in range(n):
+        random.random()  # Other users of the global stream must not shift the latencies
+        terminal.order_send({'action': None})
+    return delays
+
+
+def test_order_latency_is_reproducible_per_seed(monkeypatch):
+    monkeypatch.setenv('FINWIZ_SIM_SEED', '7')
+    first = order_delays(monkeypatch)
+    assert order_delays(monkeypatch) == first
+    monkeypatch.setenv('FINWIZ_SIM_SEED', '8')
+    assert order_delays(monkeypatch) != first
@@ -0,0 +1,27 @@
+from snapshot_store import SnapshotStore, SnapshotWriter
+
+
+def test_release_frees_the_segment_and_keeps_the_final_state():
+    store = SnapshotStore(segment_size=64 * 1024)
+    try:
+        writer = SnapshotWriter(store.create('A'))
+        writer.write({'ID': 'A', 'status': 'ONLINE'})
+        writer.close()
+        seq = store.version('A')
+        store.release('A', {'ID': 'A', 'status': 'OFFLINE'})
+        assert store.segments() == []
+        assert 'A' in store and store.accounts() == ['A']
+        assert store.read_versioned('A') == (seq + 2, {'ID': 'A', 'status': 'OFFLINE'})
+
+        # Re-activated: a fresh segment whose versions keep moving forward
+        writer = SnapshotWriter(store.create('A'))
+        writer.write({'ID': 'A', 'status': 'ONLINE'})
+        writer.close()
+        assert store.version('A') > seq + 2
+        assert store.read('A')['status'] == 'ONLINE'
+
+        store.release('A')  # Deleted
+        assert 'A' not in store and store.read('A') == {}
+    finally:
+        store.close()
+
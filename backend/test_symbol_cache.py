@@ -0,0 +1,16 @@
+import pytest
+
+from symbol_cache import normalize_volume
+
+
+@pytest.mark.parametrize('volume, spec, expected', [
+    (0.123, {'volume_step': 0.01, 'volume_min': 0.01, 'volume_max': 100}, 0.12),
+    (0.126, {'volume_step': 0.01, 'volume_min': 0.01, 'volume_max': 100}, 0.13),
+    (0.3, {'volume_step': 0.1, 'volume_min': 0.1, 'volume_max': 100}, 0.3),  # No 0.30000000000000004
+    (7, {'volume_step': 5, 'volume_min': 5, 'volume_max': 50}, 5),
+    (0.001, {'volume_step': 0.01, 'volume_min': 0.01, 'volume_max': 100}, 0.01),  # Clamped up to min
+    (500, {'volume_step': 0.01, 'volume_min': 0.01, 'volume_max': 100}, 100),  # And down to max
+    (0.5, {}, 0.5),  # No spec: 0.01 steps, unbounded
+])
+def test_volume_snaps_to_step_and_limits(volume, spec, expected):
+    assert normalize_volume(volume, spec) == expected
@@ -0,0 +1,99 @@
+import os
+import queue
+
+os.environ.setdefault('FINWIZ_MT5', 'sim')
+os.environ.setdefault('FINWIZ_DB', 'local')
+
+import app
+from dashboard_rooms import user_room
+from result_channel import ResultDispatcher
+from trade_jobs import TradeJob, TradeJobs
+
+
+class RecordingJobs:
+    def __init__(self):
+        self.started = []
+
+    def get(self, job_id):
+        return None
+
+    def start(self, job):
+        self.started.append(job)
+        return job
+
+
+class RecordingDispatcher(ResultDispatcher):
+    def __init__(self):
+        super().__init__(queue.Queue())
+        self.registered = []
+
+    def register(self, req_id, expected, on_result=None):
+        self.registered.append(req_id)
+        pending = super().register(req_id, expected, on_result)
+        pending.resolve('A', 'done')  # Answer right away, no worker here
+        return pending
+
+
+def online_account(monkeypatch):
+    q = queue.Queue()
+    monkeypatch.setattr(app, 'COMMAND_QUEUES', {'A': q})
+    monkeypatch.setattr(app.SNAPSHOTS, 'items', lambda: [('A', {'status': 'ONLINE'})])
+    return q
+
+
+def trade_events(client):
+    return [e['args'][0] for e in client.get_received() if e['name'] == 'trade_result']
+
+
+def test_async_trade_ignores_a_sid_in_the_body(monkeypatch):
+    jobs = RecordingJobs()
+    monkeypatch.setattr(app, 'TRADE_JOBS', jobs)
+    online_account(monkeypatch)
+    resp = app.app.test_client().post('/api/trade', json={
+        'user_id': 'u1', 'symbol': 'XAUUSD', 'type': 'BUY', 'volume': 1, 'async': True,
+        'job_id': 'j1', 'sid': 'someone-elses-socket'})
+    assert resp.status_code == 202
+    assert [(j.job_id, j.room) for j in jobs.started] == [('j1', user_room('u1'))]
+
+
+def test_blocking_trades_never_reuse_a_client_job_id(monkeypatch):
+    dispatcher = RecordingDispatcher()
+    monkeypatch.setattr(app, 'DISPATCHER', dispatcher)
+    q = online_account(monkeypatch)
+    for _ in range(2):
+        resp = app.app.test_client().post('/api/trade', json={
+            'user_id': 'u1', 'symbol': 'XAUUSD', 'type': 'BUY', 'volume': 1, 'job_id': 'j1'})
+        assert resp.status_code == 200
+    assert 'j1' not in dispatcher.registered and len(set(dispatcher.registered)) == 2
+    assert q.qsize() == 2
+
+
+def test_a_job_id_can_only_be_started_once():
+    jobs = TradeJobs(ResultDispatcher(queue.Queue()), emit=lambda *a: None)
+    assert jobs.start(TradeJob('j1', {'A': {}}, 0.0)) is not None
+    assert jobs.start(TradeJob('j1', {'B': {}}, 0.0)) is None
+    assert list(jobs.get('j1').commands) == ['A']
+
+
+def test_trade_events_reach_only_the_placing_users_sockets():
+    mine = app.socketio.test_client(app.app)
+    other = app.socketio.test_client(app.app)
+    mine.emit('subscribe_dashboard', {'token': app.SESSIONS.open('u1')})
+    other.emit('subscribe_dashboard', {'token': app.SESSIONS.open('u2')})
+    job = TradeJob('j1', {}, 0.0, user_room('u1'))
+    app.emit_trade_event('trade_result', {'job_id': 'j1', 'account': 'A', 'done': False}, job)
+    assert [e['job_id'] for e in trade_events(mine)] == ['j1']
+    assert trade_events(other) == []
+    mine.disconnect()
+    other.disconnect()
+
+
+def test_a_socket_cannot_subscribe_as_another_user():
+    spy = app.socketio.test_client(app.app)
+    spy.emit('subscribe_dashboard', {'user_id': 'u1'})
+    spy.emit('subscribe_dashboard', {'user_id': 'u1', 'token': 'forged'})
+    assert [e['name'] for e in spy.get_received()] == ['session_expired', 'session_expired']
+    app.emit_trade_event('trade_result', {'job_id': 'j1', 'account': 'A', 'done': False},
+                         TradeJob('j1', {}, 0.0, user_room('u1')))
+    assert trade_events(spy) == []
+    spy.disconnect()
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from trailing import TrailingEngine
+
+
+def position(ticket=1, side=0, sl=0.0, symbol='XAU'):
+    return SimpleNamespace(ticket=ticket, type=side, sl=sl, symbol=symbol)
+
+
+def tick(bid, ask=None):
+    return SimpleNamespace(bid=bid, ask=bid + 0.1 if ask is None else ask)
+
+
+def test_sl_only_moves_once_it_improves_by_a_step():
+    engine = TrailingEngine({'XAU': 0.5}, min_interval=0)
+    engine.set(position(sl=98.0), 100.0)  # Keeps the 2.0 gap
+    assert engine.distance(1) == 2.0
+    assert engine.evaluate({'XAU': tick(100.4)}, now=1) == []  # 98.4: under one step better
+    assert engine.evaluate({'XAU': tick(100.5)}, now=1) == [(1, 98.5)]
+    engine.moved(1, 98.5, now=1)
+    assert engine.evaluate({'XAU': tick(100.0)}, now=2) == []  # Never moves back
+
+
+def test_sell_side_trails_the_ask():
+    engine = TrailingEngine(min_interval=0)
+    engine.set(position(side=1, sl=102.0), 100.0, step=0.5)
+    assert engine.evaluate({'XAU': tick(99.0, 99.6)}, now=1) == []  # 101.6: under one step better
+    assert engine.evaluate({'XAU': tick(99.0, 99.5)}, now=1) == [(1, 101.5)]
+
+
+def test_moves_are_rate_limited_per_ticket():
+    engine = TrailingEngine({'XAU': 0.5}, min_interval=1.0)
+    engine.set(position(sl=98.0), 100.0)
+    engine.moved(1, 98.0, now=10.0)
+    assert engine.evaluate({'XAU': tick(105.0)}, now=10.5) == []
+    assert engine.evaluate({'XAU': tick(105.0)}, now=11.0) == [(1, 103.0)]
+
+
+def test_prune_drops_closed_positions_and_follows_manual_sl_edits():
+    engine = TrailingEngine({'XAU': 0.5}, min_interval=0)
+    engine.set(position(1, sl=98.0), 100.0)
+    engine.set(position(2, sl=98.0), 100.0)
+    engine.prune({1: position(1, sl=99.0)})
+    assert engine.distance(2) == 0
+    assert engine.evaluate({'XAU': tick(101.4)}, now=1) == []  # 99.4 vs the SL moved by hand to 99.0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from dashboard_delta import DeltaEncoder
+from wire_format import columnar_frame, encode_frame, pack_candles, negotiate
+
+msgpack = pytest.importorskip('msgpack')
+
+
+def rows(table, strings):
+    """Python mirror of tableRows / expandColumnarFrame in dashboard.js."""
+    coded = set(table['str'])
+    return [{f: strings[table['cols'][j][i]] if j in coded else table['cols'][j][i]
+             for j, f in enumerate(table['fields'])} for i in range(table['n'])]
+
+
+def keys(k, strings):
+    return [f"{strings[p]}:{t}" for p, t in zip(k['p'], k['t'])]
+
+
+def expand(msg):
+    strings = msg.pop('strings')
+    del msg['columnar']
+    for section in ('positions', 'orders'):
+        v = msg.get(section)
+        if v is None:
+            continue
+        if 'fields' in v:
+            msg[section] = rows(v, strings)
+            continue
+        msg[section] = {
+            'add': rows(v['add'], strings), 'remove': keys(v['remove'], strings),
+            'update': [dict(zip(g['fields'], (col[i] for col in g['cols'])), key=key)
+                       for g in v['update'] for i, key in enumerate(keys(g['keys'], strings))]}
+    for section in ('groups', 'symbols', 'accounts'):
+        t = msg.get('exposure', {}).get(section)
+        if t and 'keys' in t:
+            msg['exposure'][section] = dict(zip(t['keys'], rows(t, strings)))
+    return msg
+
+
+def pos(ticket, profit, symbol='XAUUSD', side='BUY'):
+    return {'account_login': 11, 'ticket': ticket, 'symbol': symbol, 'type': side, 'volume': 0.1, 'profit': profit}
+
+
+def test_keyframes_and_deltas_survive_the_binary_form():
+    enc = DeltaEncoder(keyframe_every=100)
+    states = [
+        {'balance': 10, 'positions': [pos(1, 0.0), pos(2, 1.0, 'EURUSD', 'SELL')], 'orders': [],
+         'prices': {'XAUUSD': {'bid': 1.0}},
+         'exposure': {'groups': {'XAUUSD_BUY': {'symbol': 'XAUUSD', 'volume': 0.1}},
+                      'totals': {'margin': 1.0}}},
+        {'balance': 11, 'positions': [pos(1, 2.0), pos(3, 0.5)], 'orders': [{'account': 'a', 'ticket': 7}],
+         'prices': {}, 'exposure': {'groups': {}, 'totals': {'margin': 2.0}}},
+    ]
+    for state in states:
+        payload = enc.encode(state)
+        frame = encode_frame(payload, 'msgpack')
+        assert isinstance(frame, bytes)
+        assert expand(msgpack.unpackb(frame, raw=False)) == payload
+
+
+def test_json_clients_get_the_payload_untouched():
+    payload = {'seq': 1, 'full': True, 'positions': [pos(1, 0.0)]}
+    assert encode_frame(payload, 'json') is payload
+    assert negotiate('json') == 'json' and negotiate('bson') == 'json'
+    assert negotiate('msgpack') == 'msgpack'
+    # Every repeated string sent once
+    assert columnar_frame({'positions': [pos(1, 0.0), pos(2, 0.0)]})['strings'] == ['XAUUSD', 'BUY']
+
+
+def test_candles_ship_as_raw_little_endian_columns():
+    cols = {'time': np.array([60, 120]), 'open': np.array([1.0, 2.0]), 'high': np.array([1.5, 2.5]),
+            'low': np.array([0.5, 1.5]), 'close': np.array([1.25, 2.25])}
+    body = msgpack.unpackb(pack_candles(cols), raw=False)
+    assert body['count'] == 2
+    assert np.frombuffer(body['time'], dtype=body['dtypes']['time']).tolist() == [60, 120]
+    assert np.frombuffer(body['close'], dtype=body['dtypes']['close']).tolist() == [1.25, 2.25]
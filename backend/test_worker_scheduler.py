@@ -0,0 +1,51 @@
+import time
+import queue
+
+from worker_scheduler import WorkerScheduler, CommandLanes
+
+CADENCE = {
+    'quotes': {'normal': 0.05, 'fast': 0.05},
+    'positions': {'normal': 0.25, 'fast': 0.05},
+    'account': {'normal': 1.0, 'fast': 0.1},
+}
+
+
+def test_timeout_waits_for_the_next_task_of_the_given_ones():
+    sched = WorkerScheduler(CADENCE)
+    assert sched.due('account', time.time())
+    # positions / quotes were never consumed, so across all tasks something is overdue...
+    assert sched.timeout() == 0.0
+    # ...but a CONNECTING worker only waits on the account poll, which just ran
+    assert 0.9 < sched.timeout(('account',)) <= 1.0
+
+
+def test_due_follows_cadence_and_burst():
+    sched = WorkerScheduler(CADENCE, burst_window=3.0)
+    assert sched.due('positions', 100.0)
+    assert not sched.due('positions', 100.1)
+    assert sched.due('positions', 100.25)
+    sched.burst_until = 200.0
+    assert sched.due('positions', 101.0)
+    assert sched.next_run['positions'] == 101.05
+
+
+def test_disabled_tasks_are_ignored():
+    sched = WorkerScheduler(CADENCE)
+    for task in CADENCE:
+        sched.enable(task, False)
+    assert sched.timeout() == 1.0
+    assert not sched.due('quotes', 0.0)
+
+
+def test_urgent_commands_jump_the_normal_lane():
+    q = queue.Queue()
+    lanes = CommandLanes(('TRADE',))
+    for cmd in ({'action': 'GET_CANDLES', 'n': 1}, {'action': 'GET_CANDLES', 'n': 2}, {'action': 'TRADE'}):
+        q.put(cmd)
+    lanes.wait(q, 0.01)
+    got = []
+    for cmd in lanes.drain(q):
+        got.append(cmd['action'])
+        if len(got) == 2:
+            q.put({'action': 'TRADE'})  # Arrives behind the candle batch, still served next
+    assert got == ['TRADE', 'GET_CANDLES', 'TRADE', 'GET_CANDLES']
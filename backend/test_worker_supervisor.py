@@ -0,0 +1,66 @@
+from worker_supervisor import WorkerSupervisor, Heartbeat
+
+T0 = 1000.0  # now=0 would read as "not given"
+
+
+def supervisor():
+    return WorkerSupervisor(heartbeat_timeout=30, startup_timeout=120, connecting_timeout=60,
+                            backoff_base=1.0, backoff_max=8.0, stable_after=60)
+
+
+def test_restart_backoff_doubles_and_caps():
+    sup = supervisor()
+    sup.track('A', {}, now=T0)
+    now, delays = T0, []
+    for _ in range(5):
+        assert sup.check(lambda a: False, now=now) == []  # Diagnosed, restart scheduled
+        due_at = now + sup.status(now=now)['A']['restart_in_s']
+        assert sup.check(lambda a: False, now=due_at) == [('A', 'exited')]
+        delays.append(due_at - now)
+        sup.track('A', {}, now=due_at)
+        now = due_at
+    assert delays == [1.0, 2.0, 4.0, 8.0, 8.0]
+    assert sup.status(now=now)['A']['restarts'] == 5
+
+
+def test_backoff_resets_after_a_stable_run():
+    sup = supervisor()
+    sup.track('A', {}, now=T0)
+    sup.check(lambda a: False, now=T0)
+    sup.check(lambda a: False, now=T0 + 1)
+    sup.track('A', {}, now=T0 + 1)
+    sup.on_heartbeat('A', T0 + 100, 'ONLINE', None)
+    sup.check(lambda a: True, now=T0 + 100)  # Up for 99s
+    sup.check(lambda a: False, now=T0 + 101)
+    assert sup.status(now=T0 + 101)['A']['restart_in_s'] == 1.0
+
+
+def test_hung_and_stuck_workers_are_diagnosed():
+    sup = supervisor()
+    for acc_id in 'ABC':
+        sup.track(acc_id, {}, now=T0)
+    sup.on_heartbeat('A', T0 + 10, 'ONLINE', None)
+    sup.on_heartbeat('B', T0 + 10, 'CONNECTING', None)
+    sup.on_heartbeat('B', T0 + 125, 'CONNECTING', None)
+    sup.check(lambda a: True, now=T0 + 125)  # All three failing now, each restart 1s out
+    due = dict(sup.check(lambda a: True, now=T0 + 126))
+    assert due == {'A': 'heartbeat lost', 'B': 'stuck in CONNECTING', 'C': 'no heartbeat after start'}
+
+
+def test_healthy_means_online_with_a_recent_heartbeat():
+    sup = supervisor()
+    for acc_id, status in (('A', 'ONLINE'), ('B', 'CONNECTING')):
+        sup.track(acc_id, {}, now=T0)
+        sup.on_heartbeat(acc_id, T0 + 10, status, None)
+    assert sup.healthy(now=T0 + 20) == ['A']
+    assert sup.healthy(now=T0 + 100) == []
+
+
+def test_heartbeat_reports_loop_stats_per_window():
+    beat = Heartbeat(interval=2.0)
+    assert beat.lap() is None
+    beat.wake()
+    assert beat.lap() >= 0
+    assert beat.report(now=T0)['loops'] == 1
+    assert beat.report(now=T0 + 1) is None
+    assert beat.report(now=T0 + 2)['loops'] == 0
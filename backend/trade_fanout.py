@@ -0,0 +1,34 @@
+import logging
+
+
+def _message(result):
+    # Workers reply with a timing dict; errors raised mid-command come back as plain strings
+    return result if isinstance(result, str) else result.get('message', '')
+
+
+def build_trade_report(commands, results, dispatched_at):
+    """
+    Turns the per-account TRADE replies into the /api/trade response:
+    'details' (one message per account, as before), per-account 'timings' and a
+    'fanout' summary of how far apart the first and last fills landed.
+    """
+    details, timings, done = [], [], []
+    for acc_id in commands:
+        result = results.get(acc_id)
+        if result is None:
+            details.append(f"Account {acc_id}: Timeout")
+            continue
+        details.append(_message(result))
+        if isinstance(result, dict):
+            timing = {k: v for k, v in result.items() if k != 'done_at'}
+            if 'done_at' in result:
+                timing['total_ms'] = (result['done_at'] - dispatched_at) * 1000
+                done.append(timing['total_ms'])
+            timings.append(timing)
+
+    fanout = {'accounts': len(commands), 'filled': len(done)}
+    if done:
+        fanout.update({'first_ms': min(done), 'last_ms': max(done), 'spread_ms': max(done) - min(done)})
+        logging.info(f"Trade fan-out: {len(done)}/{len(commands)} in {fanout['last_ms']:.1f} ms "
+                     f"(spread {fanout['spread_ms']:.1f} ms)")
+    return {'details': details, 'timings': timings, 'fanout': fanout}
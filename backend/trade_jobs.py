@@ -0,0 +1,85 @@
+import time
+import threading
+
+from trade_fanout import build_trade_report
+
+JOB_TIMEOUT = 10.0  # Seconds before accounts that haven't replied are reported as timed out
+JOB_TTL = 300.0  # Seconds a finished job stays queryable via GET /api/trade/<job_id>
+
+
+# --- TRADE JOBS ---
+class TradeJob:
+    def __init__(self, job_id, commands, dispatched_at, room=None):
+        self.job_id = job_id
+        self.commands = commands  # acc_id -> TRADE command
+        self.dispatched_at = dispatched_at
+        self.room = room  # Socket.IO room that gets the events (the placing user's)
+        self.pending = None
+        self.report = None
+        self.finished_at = None
+
+    def status(self):
+        results = dict(self.pending.results) if self.pending else {}
+        report = self.report or build_trade_report(self.commands, results, self.dispatched_at)
+        return dict(report, job_id=self.job_id, done=self.report is not None,
+                    pending=[a for a in self.commands if a not in results])
+
+
+class TradeJobs:
+    """
+    Non-blocking /api/trade. Each job tracks one fan-out; `emit(event, data, job)`
+    is called with a 'trade_result' per account as its worker replies, and a final
+    one (done=True, with the full report) once every account replied or the job
+    timed out. Finished jobs stay queryable for JOB_TTL seconds.
+    """
+
+    def __init__(self, dispatcher, emit, timeout=JOB_TIMEOUT, ttl=JOB_TTL):
+        self.dispatcher = dispatcher
+        self.emit = emit
+        self.timeout = timeout
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def start(self, job):
+        """Registers the job's results with the dispatcher. Call before queuing its commands. None if the id is taken."""
+        with self._lock:
+            if job.job_id in self._jobs:
+                return None
+            self._jobs[job.job_id] = job
+        job.pending = self.dispatcher.register(job.job_id, job.commands.keys(), self._on_result)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _on_result(self, pending, acc_id, result):
+        job = self.get(pending.req_id)
+        if job is None or job.report is not None:
+            return
+        self.emit('trade_result', {'job_id': job.job_id, 'account': acc_id, 'result': result, 'done': False,
+                                   'remaining': len(pending.missing())}, job)
+        if pending.done():
+            self._finish(job)
+
+    def _finish(self, job):
+        with self._lock:
+            if job.report is not None:
+                return
+            job.report = build_trade_report(job.commands, dict(job.pending.results), job.dispatched_at)
+            job.finished_at = time.time()
+        self.dispatcher.discard(job.job_id)
+        self.emit('trade_result', dict(job.report, job_id=job.job_id, done=True), job)
+
+    def sweep(self, now=None):
+        """Times out stalled jobs and forgets old finished ones. Call periodically."""
+        now = now or time.time()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.report is None and now - job.dispatched_at > self.timeout:
+                self._finish(job)
+            elif job.finished_at and now - job.finished_at > self.ttl:
+                with self._lock:
+                    self._jobs.pop(job.job_id, None)
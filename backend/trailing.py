@@ -0,0 +1,79 @@
+import time
+
+DEFAULT_TRAIL = 0.5  # Same fallback the dashboard uses when a symbol has no TRAIL_AMOUNT
+MIN_MOVE_INTERVAL = 1.0  # Seconds between SL moves on the same ticket
+
+
+# --- TRAILING ENGINE ---
+class TrailingEngine:
+    """
+    Worker-side trailing stops, evaluated on every quote poll.
+
+    A trailed position keeps its SL `distance` behind the market. The SL is only
+    moved once it can improve by at least `step` (hysteresis, defaults to the
+    symbol's TRAIL_AMOUNT, the same increment as the dashboard's step buttons)
+    and at most once per `min_interval` seconds per ticket (rate limit).
+    """
+
+    def __init__(self, trail_amounts=None, min_interval=MIN_MOVE_INTERVAL):
+        self.trail_amounts = dict(trail_amounts or {})
+        self.min_interval = min_interval
+        self._rules = {}  # ticket -> {'symbol', 'side', 'distance', 'step', 'sl', 'last_move'}
+
+    def step_for(self, symbol):
+        return float(self.trail_amounts.get(symbol) or DEFAULT_TRAIL)
+
+    def set(self, pos, price, distance=None, step=None):
+        """Starts trailing `pos`. Without a distance, keeps its current price-to-SL gap."""
+        side = 'BUY' if pos.type == 0 else 'SELL'
+        step = float(step) if step else self.step_for(pos.symbol)
+        if not distance:
+            gap = (price - pos.sl) if side == 'BUY' else (pos.sl - price)
+            distance = gap if pos.sl and gap > 0 else step
+        self._rules[pos.ticket] = {'symbol': pos.symbol, 'side': side, 'distance': float(distance),
+                                   'step': step, 'sl': pos.sl, 'last_move': 0.0}
+
+    def clear(self, ticket):
+        self._rules.pop(ticket, None)
+
+    def distance(self, ticket):
+        rule = self._rules.get(ticket)
+        return rule['distance'] if rule else 0
+
+    def symbols(self):
+        return {r['symbol'] for r in self._rules.values()}
+
+    def prune(self, pos_by_ticket):
+        """Drops closed positions and syncs our idea of the SL with the terminal's."""
+        for ticket in list(self._rules):
+            pos = pos_by_ticket.get(ticket)
+            if pos is None:
+                del self._rules[ticket]
+            else:
+                self._rules[ticket]['sl'] = pos.sl
+
+    def evaluate(self, ticks, now=None):
+        """Returns [(ticket, new_sl)] for stops that need to move given the latest ticks."""
+        now = now or time.time()
+        moves = []
+        for ticket, rule in self._rules.items():
+            tick = ticks.get(rule['symbol'])
+            if not tick or now - rule['last_move'] < self.min_interval:
+                continue
+            sl = rule['sl']
+            if rule['side'] == 'BUY':
+                target = tick.bid - rule['distance']
+                if sl and target < sl + rule['step']:
+                    continue
+            else:
+                target = tick.ask + rule['distance']
+                if sl and target > sl - rule['step']:
+                    continue
+            moves.append((ticket, target))
+        return moves
+
+    def moved(self, ticket, sl, now=None):
+        rule = self._rules.get(ticket)
+        if rule:
+            rule['sl'] = sl
+            rule['last_move'] = now or time.time()
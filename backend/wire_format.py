@@ -0,0 +1,110 @@
+import numpy as np
+
+from candles import CANDLE_FIELDS, COLUMN_DTYPES
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # JSON only
+
+# --- NEGOTIATION ---
+# Clients opt in: 'encoding': 'msgpack' in subscribe_dashboard, Accept: application/x-msgpack
+# on /api/candles. Without the msgpack package everything stays JSON.
+MSGPACK_MIME = 'application/x-msgpack'
+JSON_MIME = 'application/json'
+
+
+def negotiate(requested):
+    """'msgpack' if the client asked for it and it's available, else 'json'."""
+    return 'msgpack' if requested == 'msgpack' and msgpack is not None else 'json'
+
+
+def candle_mimetype(accept):
+    """Best /api/candles body type for a werkzeug Accept header (JSON wins ties and */*)."""
+    if msgpack is None:
+        return JSON_MIME
+    return accept.best_match([JSON_MIME, MSGPACK_MIME], default=JSON_MIME)
+
+
+# --- DASHBOARD FRAMES ---
+# Binary dashboard_update frames are MessagePack of the delta payload with the
+# repeated-key parts made columnar:
+#   table   {'n', 'fields', 'cols', 'str'} - 'str' lists the columns holding indices
+#           into the frame's shared 'strings' table (symbol, type, account_name, ...)
+#   keys    {'p': [prefix index], 't': [ticket]} - "account:ticket" row keys split in two
+#   updates [{'fields', 'keys', 'cols'}] - delta updates grouped by their changed fields
+# Exposure sections keyed by name become a table plus {'keys': [names]}.
+def _table(rows, strings):
+    if not rows:
+        return {'n': 0, 'fields': [], 'cols': [], 'str': []}
+    fields = list(rows[0])  # Rows of one kind are all built from the same literal
+    cols, coded = [], []
+    for j, f in enumerate(fields):
+        col = [r.get(f) for r in rows]
+        if isinstance(col[0], str):
+            col = [strings.setdefault(v, len(strings)) for v in col]
+            coded.append(j)
+        cols.append(col)
+    return {'n': len(rows), 'fields': fields, 'cols': cols, 'str': coded}
+
+
+def _keys(keys, strings):
+    prefixes, tickets = [], []
+    for key in keys:
+        prefix, _, ticket = key.rpartition(':')
+        prefixes.append(strings.setdefault(prefix, len(strings)))
+        tickets.append(int(ticket) if ticket.isdigit() else ticket)
+    return {'p': prefixes, 't': tickets}
+
+
+def _updates(updates, strings):
+    groups = {}
+    for u in updates:
+        groups.setdefault(tuple(u), []).append(u)  # Same changed fields, same group
+    out = []
+    for fields, rows in groups.items():
+        fields = [f for f in fields if f != 'key']
+        out.append({'fields': fields, 'keys': _keys([u['key'] for u in rows], strings),
+                    'cols': [[u[f] for u in rows] for f in fields]})
+    return out
+
+
+def columnar_frame(payload):
+    """dashboard_update payload (keyframe, delta or legacy full state) -> columnar form."""
+    out = dict(payload)
+    strings = {}
+    for section in ('positions', 'orders'):
+        rows = payload.get(section)
+        if rows is None:
+            continue
+        if isinstance(rows, list):
+            out[section] = _table(rows, strings)
+        else:
+            out[section] = {'add': _table(rows['add'], strings), 'update': _updates(rows['update'], strings),
+                            'remove': _keys(rows['remove'], strings)}
+    if payload.get('exposure'):
+        exposure = dict(payload['exposure'])
+        for section in ('groups', 'symbols', 'accounts'):
+            if section in exposure:
+                named = exposure[section]
+                exposure[section] = dict(_table(list(named.values()), strings), keys=list(named))
+        out['exposure'] = exposure
+    out['strings'] = list(strings)
+    out['columnar'] = True
+    return out
+
+
+def encode_frame(payload, encoding):
+    """Wire form of a dashboard_update payload: the dict itself for JSON, bytes for msgpack."""
+    if encoding != 'msgpack' or payload is None:
+        return payload
+    return msgpack.packb(columnar_frame(payload), use_bin_type=True)
+
+
+# --- CANDLES ---
+def pack_candles(cols):
+    """{field: numpy array} -> MessagePack map of raw little-endian columns, read client-side as typed arrays."""
+    body = {'count': len(cols['time']), 'dtypes': COLUMN_DTYPES}
+    for f in CANDLE_FIELDS:
+        body[f] = np.ascontiguousarray(cols[f], dtype=COLUMN_DTYPES[f]).tobytes()
+    return msgpack.packb(body, use_bin_type=True)
@@ -0,0 +1,204 @@
+"""
+Worker agent: runs account workers on another host for a FinWiz backend.
+
+The backend (app.py with FINWIZ_AGENT_PORT set) places accounts on connected
+agents; each agent runs app.account_worker_loop for its accounts as local
+processes, exactly as the backend would, and relays over one TCP connection:
+commands in, result queue messages and snapshot payloads out (see agent_hub.py
+for the protocol). If the backend goes away the agent stops its workers, since
+the backend moves those accounts elsewhere, and reconnects.
+
+    python worker_agent.py --backend 10.0.0.5:5100 [--slots 8] [--name box-2]
+
+The shared key comes from FINWIZ_AGENT_KEY (or --authkey) and must match the
+backend's. It only authenticates the connection, which carries account
+credentials unencrypted: reach a backend on another host through an SSH tunnel
+(ssh -L 5100:127.0.0.1:5100 backend-host, then --backend 127.0.0.1:5100) or a
+TLS / VPN link, never over an untrusted network. FINWIZ_MT5=sim runs the agent against the simulated terminal, so
+several local agents can stand in for several hosts on one box.
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+from multiprocessing import Process, Queue
+from multiprocessing.connection import Client
+
+from app import account_worker_loop
+from snapshot_store import SnapshotStore
+from worker_scheduler import CommandQueue
+from agent_hub import AGENT_PING_EVERY, AGENT_TIMEOUT
+
+SNAPSHOT_POLL = 0.05  # Seconds between scans of the local snapshot segments
+RESULT_BATCH = 500  # Most result messages sent in one frame
+RECONNECT_MAX = 30.0
+
+
+class WorkerAgent:
+    def __init__(self, conn):
+        self.conn = conn
+        self.snapshots = SnapshotStore()
+        self.results = Queue()
+        self.workers = {}  # acc_id -> (Process, CommandQueue, run)
+        self.sent = {}  # acc_id -> snapshot version last relayed
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def send(self, msg):
+        try:
+            with self._send_lock:
+                self.conn.send(msg)
+        except (OSError, ValueError):
+            self._closed.set()
+
+    # --- WORKERS ---
+    def start_worker(self, acc_id, run, acc_data, global_symbols):
+        self.stop_worker(acc_id)  # A previous run the backend gave up waiting for
+        with self._lock:
+            q = CommandQueue()
+            segment = self.snapshots.create(acc_id)
+            self.sent[acc_id] = self.snapshots.version(acc_id)  # Don't relay what a previous run left behind
+            p = Process(target=account_worker_loop, args=(acc_data, q, segment, self.results, global_symbols))
+            p.daemon = True
+            p.start()
+            self.workers[acc_id] = (p, q, run)
+        logging.info(f"Agent: started worker for {acc_id} (pid {p.pid})")
+
+    def stop_worker(self, acc_id):
+        with self._lock:
+            entry = self.workers.pop(acc_id, None)
+        if entry is None:
+            return
+        p, _, run = entry
+        p.terminate()
+        p.join()
+        self.relay_snapshots([acc_id])
+        self.snapshots.release(acc_id)
+        self.send(('EXITED', acc_id, run, p.exitcode))
+
+    def stop_all(self):
+        for acc_id in list(self.workers):
+            p = self.workers.pop(acc_id)[0]
+            p.terminate()
+            p.join()
+
+    # --- RELAYS ---
+    def relay_results(self):
+        while not self._closed.is_set():
+            batch = [self.results.get()]
+            while len(batch) < RESULT_BATCH and not self.results.empty():
+                batch.append(self.results.get())
+            self.send(('RESULTS', batch))
+
+    def relay_snapshots(self, acc_ids):
+        out = []
+        for acc_id in acc_ids:
+            seq, payload = self.snapshots.read_payload(acc_id)
+            if seq and seq != self.sent.get(acc_id):
+                self.sent[acc_id] = seq
+                out.append((acc_id, payload))
+        if out:
+            self.send(('SNAPSHOTS', out))
+
+    def pump(self):
+        """Relays changed snapshots, reports workers that died on their own and keeps the connection alive."""
+        last_ping = 0
+        while not self._closed.is_set():
+            time.sleep(SNAPSHOT_POLL)
+            with self._lock:
+                running = list(self.workers.items())
+            self.relay_snapshots([acc_id for acc_id, _ in running])
+            for acc_id, (p, _, run) in running:
+                if not p.is_alive():
+                    with self._lock:
+                        if self.workers.get(acc_id, (None,))[0] is not p:
+                            continue  # Stopped meanwhile, stop_worker reports it
+                        del self.workers[acc_id]
+                    self.relay_snapshots([acc_id])
+                    self.snapshots.release(acc_id)
+                    self.send(('EXITED', acc_id, run, p.exitcode))
+                    logging.warning(f"Agent: worker {acc_id} exited ({p.exitcode})")
+            if time.time() - last_ping > AGENT_PING_EVERY:
+                last_ping = time.time()
+                self.send(('PING', self.queue_depths(running)))
+
+    @staticmethod
+    def queue_depths(running):
+        depths = {}
+        for acc_id, (_, q, _) in running:
+            try:
+                depths[acc_id] = q.qsize()
+            except NotImplementedError:
+                pass  # qsize() isn't available on macOS
+        return depths
+
+    def serve(self):
+        """Handles backend messages until the connection drops."""
+        threading.Thread(target=self.relay_results, name='agent-results', daemon=True).start()
+        threading.Thread(target=self.pump, name='agent-pump', daemon=True).start()
+        try:
+            while not self._closed.is_set():
+                if not self.conn.poll(AGENT_TIMEOUT):
+                    logging.warning("Agent: backend silent, disconnecting")
+                    break
+                msg = self.conn.recv()
+                kind = msg[0]
+                if kind == 'COMMAND':
+                    entry = self.workers.get(msg[1])
+                    if entry:
+                        entry[1].put(msg[2])
+                elif kind == 'START':
+                    self.start_worker(*msg[1:])
+                elif kind == 'STOP':
+                    threading.Thread(target=self.stop_worker, args=(msg[1],), daemon=True).start()
+        except (EOFError, OSError):
+            logging.warning("Agent: backend connection lost")
+        finally:
+            self._closed.set()
+            self.stop_all()
+            self.results.put(('PING',))  # Wakes relay_results so it sees _closed
+            self.snapshots.close()
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+
+
+# --- MAIN ---
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--backend', required=True, help='host:port of the backend agent listener')
+    ap.add_argument('--slots', type=int, default=os.cpu_count(), help='most accounts to run here')
+    ap.add_argument('--name', default=f"{socket.gethostname()}-{os.getpid()}")
+    ap.add_argument('--authkey', default=os.environ.get('FINWIZ_AGENT_KEY'))
+    args = ap.parse_args(argv)
+    if not args.authkey:
+        sys.exit("Set FINWIZ_AGENT_KEY (or --authkey) to the backend's agent key")
+    host, _, port = args.backend.rpartition(':')
+    # Workers start clean instead of forking a process that already runs relay threads
+    multiprocessing.set_start_method('spawn', force=True)
+
+    delay = 1.0
+    while True:
+        try:
+            conn = Client((host, int(port)), authkey=args.authkey.encode())
+        except (OSError, multiprocessing.AuthenticationError) as e:
+            logging.warning(f"Agent: cannot reach backend {args.backend}: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+            continue
+        delay = 1.0
+        print(f"Agent {args.name} connected to {args.backend} ({args.slots} slots)")
+        conn.send(('HELLO', args.name, args.slots, socket.gethostname()))
+        WorkerAgent(conn).serve()
+        time.sleep(1.0)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,116 @@
+import time
+import queue
+import multiprocessing
+import multiprocessing.queues
+from collections import deque
+
+# Seconds between refreshes. 'fast' applies for BURST_WINDOW seconds after an
+# order-affecting command so fills / SL moves show up right away.
+DEFAULT_CADENCE = {
+    'quotes': {'normal': 0.05, 'fast': 0.05},
+    'positions': {'normal': 0.25, 'fast': 0.05},
+    'account': {'normal': 1.0, 'fast': 0.1},
+}
+BURST_WINDOW = 3.0
+
+
+# --- WORKER SCHEDULER ---
+class WorkerScheduler:
+    """
+    Tracks when each of the worker's periodic refreshes is next due. The worker
+    blocks on its command queue for timeout() seconds, so commands wake it up
+    immediately and an idle account sleeps until the next refresh.
+    """
+
+    def __init__(self, cadence=None, burst_window=BURST_WINDOW):
+        self.cadence = {k: dict(v) for k, v in (cadence or DEFAULT_CADENCE).items()}
+        self.burst_window = burst_window
+        self.burst_until = 0.0
+        self.next_run = {k: 0.0 for k in self.cadence}
+        self.enabled = {k: True for k in self.cadence}
+
+    def enable(self, task, on=True):
+        if on and not self.enabled[task]:
+            self.next_run[task] = 0.0
+        self.enabled[task] = on
+
+    def mark_trade(self):
+        """Switch to fast cadence and refresh account state on the next pass."""
+        self.burst_until = time.time() + self.burst_window
+        for task in ('positions', 'account'):
+            self.next_run[task] = 0.0
+
+    def due(self, task, now):
+        if not self.enabled[task] or now < self.next_run[task]:
+            return False
+        mode = 'fast' if now < self.burst_until else 'normal'
+        self.next_run[task] = now + self.cadence[task][mode]
+        return True
+
+    def timeout(self, tasks=None):
+        """Seconds until the next enabled task is due, among `tasks` (default: all of them)."""
+        pending = [t for task, t in self.next_run.items() if self.enabled[task] and (tasks is None or task in tasks)]
+        if not pending:
+            return 1.0
+        return max(0.0, min(pending) - time.time())
+
+
+# --- COMMAND LANES ---
+class CommandLanes:
+    """
+    Two-lane view of a worker's command queue. Order-affecting commands ('urgent')
+    always run before data requests and control messages; before each non-urgent
+    command the queue is checked again so a trade that arrives behind a batch of
+    candle fetches jumps ahead of the ones not yet served.
+    """
+
+    def __init__(self, urgent_actions):
+        self.urgent_actions = frozenset(urgent_actions)
+        self.urgent = deque()
+        self.normal = deque()
+
+    def _put(self, cmd):
+        (self.urgent if cmd.get('action') in self.urgent_actions else self.normal).append(cmd)
+
+    def _pull(self, cmd_queue):
+        while True:
+            try:
+                self._put(cmd_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def wait(self, cmd_queue, timeout):
+        """Blocks up to `timeout` for the first command, then takes whatever else is queued."""
+        if not self.urgent and not self.normal:
+            try:
+                self._put(cmd_queue.get(timeout=timeout) if timeout > 0 else cmd_queue.get_nowait())
+            except queue.Empty:
+                return
+        self._pull(cmd_queue)
+
+    def drain(self, cmd_queue):
+        """
+        Yields queued commands, urgent lane first. Non-urgent commands that arrive
+        meanwhile wait for the next pass so the worker's refreshes still run.
+        """
+        budget = len(self.normal)
+        while self.urgent or (budget and self.normal):
+            if not self.urgent:
+                self._pull(cmd_queue)
+            if self.urgent:
+                yield self.urgent.popleft()
+            else:
+                budget -= 1
+                yield self.normal.popleft()
+
+
+class CommandQueue(multiprocessing.queues.Queue):
+    """Worker command queue that stamps each command with 'queued_at', for wait-time metrics."""
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize, ctx=multiprocessing.get_context())
+
+    def put(self, obj, block=True, timeout=None):
+        if isinstance(obj, dict):
+            obj.setdefault('queued_at', time.time())
+        super().put(obj, block, timeout)
@@ -0,0 +1,120 @@
+import time
+import threading
+
+# Readiness phases a worker reports over the result queue, in order
+PHASES = ('spawned', 'initialized', 'symbols_selected', 'first_snapshot')
+
+# Fields that make a parked terminal unusable for an account if they changed
+LOGIN_FIELDS = ('USER', 'PASS', 'SERVER', 'TERMINAL_PATH')
+
+
+# --- STARTUP TRACKER ---
+class StartupTracker:
+    """
+    Per-account readiness while workers come online. Workers push
+    ('PHASE', acc_id, phase, ts, error) and status() reports, for each account,
+    the last phase reached and how long after spawn each phase landed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accounts = {}  # acc_id -> {'phase', 'started_at', 'phases': {phase: ms}, 'error'}
+
+    def begin(self, acc_id, started_at=None):
+        with self._lock:
+            self._accounts[str(acc_id)] = {'phase': None, 'started_at': started_at or time.time(),
+                                           'phases': {}, 'error': None}
+
+    def on_phase(self, acc_id, phase, ts, error=None):
+        """Records a phase, returns the account's entry for emitting (None if unknown)."""
+        with self._lock:
+            entry = self._accounts.get(str(acc_id))
+            if entry is None:
+                return None
+            entry['phase'] = phase
+            entry['phases'][phase] = (ts - entry['started_at']) * 1000
+            if error:
+                entry['error'] = error
+            return dict(entry, ID=str(acc_id), phases=dict(entry['phases']))
+
+    def forget(self, acc_id):
+        with self._lock:
+            self._accounts.pop(str(acc_id), None)
+
+    def status(self):
+        with self._lock:
+            accounts = {a: dict(e, phases=dict(e['phases'])) for a, e in self._accounts.items()}
+        ready = sum(1 for e in accounts.values() if e['phase'] == PHASES[-1])
+        return {'accounts': accounts, 'ready': ready, 'total': len(accounts)}
+
+
+# --- WARM POOL ---
+class WarmPool:
+    """
+    Parked workers of deactivated accounts, MT5 still initialized and logged in,
+    so re-activating the account skips the terminal start. Holds at most `size`
+    workers for at most `ttl` seconds each; evicted workers are returned to the
+    caller to terminate.
+    """
+
+    def __init__(self, size=0, ttl=600):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._workers = {}  # acc_id -> (acc_data, process, cmd_queue, parked_at)
+
+    def park(self, acc_id, acc_data, process, cmd_queue, now=None):
+        """Returns [(process, cmd_queue)] that no longer fit in the pool."""
+        now = now or time.time()
+        with self._lock:
+            self._workers[str(acc_id)] = (acc_data, process, cmd_queue, now)
+            return self._evict(now)
+
+    def take(self, acc_id, acc_data, now=None):
+        """
+        Returns ((process, cmd_queue) or None, [stale workers to terminate]). A parked
+        worker that died, expired or has different login details is returned as stale.
+        """
+        now = now or time.time()
+        with self._lock:
+            entry = self._workers.pop(str(acc_id), None)
+        if entry is None:
+            return None, []
+        parked_data, process, cmd_queue, parked_at = entry
+        same_login = all(parked_data.get(f) == acc_data.get(f) for f in LOGIN_FIELDS)
+        if not process.is_alive() or not same_login or now - parked_at > self.ttl:
+            return None, [(process, cmd_queue)]
+        return (process, cmd_queue), []
+
+    def discard(self, acc_id):
+        with self._lock:
+            entry = self._workers.pop(str(acc_id), None)
+        return [(entry[1], entry[2])] if entry else []
+
+    def expire(self, now=None):
+        with self._lock:
+            return self._evict(now or time.time())
+
+    def drain(self):
+        with self._lock:
+            evicted = [(p, q) for _, p, q, _ in self._workers.values()]
+            self._workers.clear()
+            return evicted
+
+    def _evict(self, now):
+        evicted = []
+        for acc_id, (_, p, q, parked_at) in list(self._workers.items()):
+            if now - parked_at > self.ttl or not p.is_alive():
+                evicted.append((p, q))
+                del self._workers[acc_id]
+        # Oldest first once over capacity
+        by_age = sorted(self._workers.items(), key=lambda kv: kv[1][3])
+        while len(by_age) > self.size:
+            acc_id, (_, p, q, _) = by_age.pop(0)
+            evicted.append((p, q))
+            del self._workers[acc_id]
+        return evicted
+
+    def __contains__(self, acc_id):
+        with self._lock:
+            return str(acc_id) in self._workers
@@ -0,0 +1,166 @@
+import time
+import threading
+
+HEARTBEAT_EVERY = 2.0  # Seconds between worker heartbeats
+HEARTBEAT_TIMEOUT = 30.0  # No heartbeat for this long: the worker is hung
+STARTUP_TIMEOUT = 120.0  # First heartbeat must arrive within this (covers mt5.initialize)
+CONNECTING_TIMEOUT = 60.0  # account_info() None for this long: restart the terminal
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 60.0  # Healthy for this long resets the backoff
+
+
+# --- WORKER SIDE ---
+class Heartbeat:
+    """
+    Loop-iteration timing inside a worker. lap() at the top of each iteration
+    closes the previous one (measured from wake(), so time blocked waiting for
+    commands isn't counted); report() returns the window's stats once due.
+    """
+
+    def __init__(self, interval=HEARTBEAT_EVERY):
+        self.interval = interval
+        self._next = 0.0
+        self._woke = None
+        self._loops, self._total, self._max = 0, 0.0, 0.0
+
+    def wake(self):
+        self._woke = time.time()
+
+    def lap(self):
+        """Closes the current iteration, returns its duration in ms (None if there was none)."""
+        if self._woke is None:
+            return None
+        ms = (time.time() - self._woke) * 1000
+        self._woke = None
+        self._loops += 1
+        self._total += ms
+        self._max = max(self._max, ms)
+        return ms
+
+    def report(self, now=None):
+        """{'loops', 'avg_ms', 'max_ms'} for the window since the last report, or None if not due yet."""
+        now = now or time.time()
+        if now < self._next:
+            return None
+        self._next = now + self.interval
+        stats = {'loops': self._loops, 'avg_ms': self._total / self._loops if self._loops else 0.0,
+                 'max_ms': self._max}
+        self._loops, self._total, self._max = 0, 0.0, 0.0
+        return stats
+
+
+# --- SUPERVISOR ---
+class WorkerSupervisor:
+    """
+    Health of every running account worker, fed by ('HEARTBEAT', acc_id, ts, status, stats)
+    messages. check() returns the workers that exited, stopped sending heartbeats or
+    sat in CONNECTING too long, once their restart backoff has elapsed. The backoff
+    doubles per consecutive failure and resets after STABLE_AFTER healthy seconds.
+    """
+
+    def __init__(self, heartbeat_timeout=HEARTBEAT_TIMEOUT, startup_timeout=STARTUP_TIMEOUT,
+                 connecting_timeout=CONNECTING_TIMEOUT, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 stable_after=STABLE_AFTER):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.connecting_timeout = connecting_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self._lock = threading.Lock()
+        self._workers = {}  # acc_id -> health entry
+
+    def track(self, acc_id, acc_data, now=None):
+        """(Re)starts watching a worker. Restart counters survive a restart."""
+        now = now or time.time()
+        acc_id = str(acc_id)
+        with self._lock:
+            prev = self._workers.get(acc_id, {})
+            self._workers[acc_id] = {
+                'acc_data': acc_data, 'started_at': now, 'last_heartbeat': None, 'status': 'STARTING',
+                'connecting_since': None, 'loop': None, 'failing': None, 'restart_at': None,
+                'restarts': prev.get('restarts', 0), 'failures': prev.get('failures', 0),
+                'last_reason': prev.get('last_reason')
+            }
+
+    def untrack(self, acc_id):
+        with self._lock:
+            self._workers.pop(str(acc_id), None)
+
+    def account_data(self, acc_id):
+        with self._lock:
+            entry = self._workers.get(str(acc_id))
+            return entry['acc_data'] if entry else None
+
+    def on_heartbeat(self, acc_id, ts, status, stats):
+        with self._lock:
+            entry = self._workers.get(str(acc_id))
+            if entry is None:
+                return
+            entry['last_heartbeat'] = ts
+            entry['status'] = status
+            entry['loop'] = stats
+            if status != 'CONNECTING':
+                entry['connecting_since'] = None
+            elif entry['connecting_since'] is None:
+                entry['connecting_since'] = ts
+
+    def _diagnose(self, entry, alive, now):
+        if not alive:
+            return 'exited'
+        if entry['last_heartbeat'] is None:
+            if now - entry['started_at'] > self.startup_timeout:
+                return 'no heartbeat after start'
+            return None
+        if now - entry['last_heartbeat'] > self.heartbeat_timeout:
+            return 'heartbeat lost'
+        if entry['connecting_since'] and now - entry['connecting_since'] > self.connecting_timeout:
+            return 'stuck in CONNECTING'
+        return None
+
+    def check(self, is_alive, now=None):
+        """Returns [(acc_id, reason)] to restart now. is_alive(acc_id) -> bool."""
+        now = now or time.time()
+        due = []
+        with self._lock:
+            for acc_id, entry in self._workers.items():
+                reason = self._diagnose(entry, is_alive(acc_id), now)
+                if reason is None:
+                    entry['failing'] = entry['restart_at'] = None
+                    if entry['failures'] and now - entry['started_at'] > self.stable_after:
+                        entry['failures'] = 0
+                    continue
+                if entry['failing'] is None:
+                    delay = min(self.backoff_base * 2 ** entry['failures'], self.backoff_max)
+                    entry['failing'], entry['restart_at'] = reason, now + delay
+                if now >= entry['restart_at']:
+                    entry['failures'] += 1
+                    entry['restarts'] += 1
+                    entry['last_reason'] = entry['failing']
+                    due.append((acc_id, entry['failing']))
+                    # Diagnosed afresh (with the next backoff) if the restart doesn't take
+                    entry['failing'] = entry['restart_at'] = None
+        return due
+
+    def healthy(self, now=None):
+        """Workers that are ONLINE with a recent heartbeat."""
+        now = now or time.time()
+        with self._lock:
+            return [a for a, e in self._workers.items() if e['status'] == 'ONLINE' and e['last_heartbeat']
+                    and now - e['last_heartbeat'] <= self.heartbeat_timeout]
+
+    def status(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            report = {}
+            for acc_id, e in self._workers.items():
+                report[acc_id] = {
+                    'status': e['status'], 'uptime_s': now - e['started_at'],
+                    'heartbeat_age_s': now - e['last_heartbeat'] if e['last_heartbeat'] else None,
+                    'restarts': e['restarts'], 'last_restart_reason': e['last_reason'],
+                    'failing': e['failing'],
+                    'restart_in_s': max(0.0, e['restart_at'] - now) if e['restart_at'] else None,
+                    'loop': e['loop']
+                }
+            return report
@@ -51,6 +51,13 @@ IF %ERRORLEVEL% NEQ 0 (
     pip install firebase-admin
 )
 
+:: 5. Check for msgpack (binary dashboard / candle payloads, JSON without it)
+python -c "import msgpack" 2>NUL
+IF %ERRORLEVEL% NEQ 0 (
+    ECHO [INSTALL] Installing msgpack...
+    pip install msgpack
+)
+
 :: --- 1. CLEANUP ---
 ECHO.
 ECHO [1/5] Cleaning previous builds...
@@ -16,6 +16,7 @@ const socket = io("http://127.0.0.1:5000", {
 // --- GLOBAL STATE ---
 let currentMobile = localStorage.getItem("userMobile");
 let currentUserId = localStorage.getItem("userId");
+let sessionToken = localStorage.getItem("sessionToken"); // Issued by /api/login, identifies this socket's user
 var currentSymbol = "XAUUSD";
 let chart, candleSeries;
 let priceLines = {};
@@ -45,6 +46,10 @@ let limitOrderState = {
 };
 let pendingOrderLines = {};
 let isSidebarCollapsed = false;
+// Delta stream state (see applyDashboardFrame)
+let dashboardSeq = -1;
+let dashboardState = null;
+let workerPhases = {}; // account ID -> last startup phase reported by its worker
 
 // --- COLORS ---
 const COL_BUY = "#2962ff";
@@ -91,21 +96,50 @@ document.addEventListener("DOMContentLoaded", async () => {
       console.log("✅ Socket Connected:", socket.id);
       const ind = document.getElementById("connection-indicator");
       if (ind) ind.style.color = "#00b894"; // Green
+      subscribeLiveCandles(); // Re-join the live bar room after a reconnect
+      subscribeDashboard();
     });
 
     socket.on("disconnect", () => {
       console.warn("⚠️ Socket Disconnected");
     });
 
+    // Login token unknown to the server (e.g. it restarted): log in again
+    socket.on("session_expired", () => {
+      localStorage.removeItem("sessionToken");
+      window.location.href = "index.html?t=" + Date.now();
+    });
+
     socket.on("dashboard_update", (data) => {
       // console.log("🔥 Data Update:", data); // Uncomment to debug data flow
-      updateDashboardUI(data);
+      const state = applyDashboardFrame(decodeDashboardFrame(data));
+      if (state) updateDashboardUI(state);
     });
 
-    // 5. Candle Polling (Keep separate from socket for now)
-    setInterval(updateLiveCandle, 500);
+    // 5. Live Candle (pushed by the backend from worker ticks)
+    socket.on("candle_update", (bar) => {
+      if (bar.symbol !== currentSymbol || bar.timeframe !== currentTimeframe) return;
+      applyLiveCandle(bar);
+    });
 
-    // 6. Force Window Focus
+    // 6. Trade Results (per account as each fills, then the final report)
+    socket.on("trade_result", handleTradeEvent);
+
+    // 7. Worker Startup Progress (accounts come online in parallel)
+    socket.on("worker_phase", (entry) => {
+      workerPhases[entry.ID] = entry.phase;
+      if (entry.error) console.warn(`Account ${entry.ID} failed to start:`, entry.error);
+      const phases = Object.values(workerPhases);
+      const ready = phases.filter((p) => p === "first_snapshot").length;
+      const ind = document.getElementById("connection-indicator");
+      if (ind) {
+        ind.title = `Accounts ready: ${ready}/${phases.length}`;
+        const starting = phases.some((p) => p !== "first_snapshot" && p !== "failed");
+        ind.style.color = starting ? "#fdcb6e" : "#00b894"; // Amber / Green
+      }
+    });
+
+    // 7. Force Window Focus
     setTimeout(() => ipcRenderer.invoke("focus-window"), 4000);
 
     // Events
@@ -130,7 +164,10 @@ document.addEventListener("DOMContentLoaded", async () => {
 });
 
 // --- NEW HELPER: GROUP POSITIONS (Fixes Bug 2) ---
-function groupPositions(flatPositions) {
+// Groups by SYMBOL_SIDE. When the server's exposure.groups is given, the
+// aggregates (volume, VWAP entry, P/L, common SL/TP) come from it and only the
+// children are bucketed here.
+function groupPositions(flatPositions, exposureGroups) {
   const grouped = {};
   const masterList = [];
 
@@ -159,6 +196,10 @@ function groupPositions(flatPositions) {
     }
 
     const master = grouped[key];
+    if (exposureGroups && exposureGroups[key]) {
+      master.sub_positions.push(pos);
+      return;
+    }
 
     // Aggregate Math
     master.volume += pos.volume;
@@ -173,6 +214,17 @@ function groupPositions(flatPositions) {
 
   // Finalize Master Fields
   masterList.forEach((m) => {
+    const agg = exposureGroups && exposureGroups[m.ticket];
+    if (agg) {
+      m.volume = agg.volume;
+      m.price_open = agg.price_open;
+      m.price_current = agg.price_current;
+      m.profit = agg.profit;
+      m.sl = agg.sl;
+      m.tp = agg.tp;
+      m.sl_distance = agg.sl_distance;
+      return;
+    }
     if (m.volume > 0) {
       m.price_open = m.priceProd / m.volume;
       // Use current price from first child (approx)
@@ -186,12 +238,131 @@ function groupPositions(flatPositions) {
   return masterList;
 }
 
+// --- DELTA STREAM ---
+// Server sends a full keyframe ({full: true}) and then seq-numbered deltas.
+// Positions/orders are keyed like the backend (see dashboard_delta.py).
+const DASHBOARD_TOTALS = ["balance", "equity", "margin_free", "profit", "active_accounts"];
+const positionKey = (p) => `${p.account_login}:${p.ticket}`;
+const orderKey = (o) => `${o.account}:${o.ticket}`;
+
+// --- BINARY FRAMES ---
+// msgpack dashboard_update frames carry columnar tables and a shared string
+// table (see wire_format.py); expanded back into the row form used below.
+function tableRows(t, strings) {
+  const rows = new Array(t.n);
+  const coded = t.fields.map((_, j) => t.str.includes(j));
+  for (let i = 0; i < t.n; i++) {
+    const row = {};
+    for (let j = 0; j < t.fields.length; j++) {
+      const v = t.cols[j][i];
+      row[t.fields[j]] = coded[j] ? strings[v] : v;
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
+const tableKeys = (k, strings) => k.t.map((ticket, i) => `${strings[k.p[i]]}:${ticket}`);
+
+function expandColumnarFrame(msg) {
+  const strings = msg.strings;
+  ["positions", "orders"].forEach((section) => {
+    const v = msg[section];
+    if (!v) return;
+    if (v.fields) {
+      msg[section] = tableRows(v, strings);
+      return;
+    }
+    msg[section] = {
+      add: tableRows(v.add, strings),
+      remove: tableKeys(v.remove, strings),
+      update: v.update.flatMap((g) =>
+        tableKeys(g.keys, strings).map((key, i) => {
+          const ch = { key };
+          g.fields.forEach((f, j) => (ch[f] = g.cols[j][i]));
+          return ch;
+        }),
+      ),
+    };
+  });
+  if (msg.exposure) {
+    ["groups", "symbols", "accounts"].forEach((section) => {
+      const t = msg.exposure[section];
+      if (!t || !t.keys) return;
+      const rows = tableRows(t, strings);
+      msg.exposure[section] = Object.fromEntries(t.keys.map((k, i) => [k, rows[i]]));
+    });
+  }
+  delete msg.strings;
+  delete msg.columnar;
+  return msg;
+}
+
+function decodeDashboardFrame(data) {
+  if (data instanceof ArrayBuffer || ArrayBuffer.isView(data)) {
+    return expandColumnarFrame(MessagePack.decode(data));
+  }
+  return data;
+}
+
+function applyRowDelta(map, delta, keyFn) {
+  if (!delta) return;
+  delta.remove.forEach((k) => map.delete(k));
+  delta.update.forEach((ch) => {
+    const row = map.get(ch.key);
+    if (!row) return;
+    for (const f in ch) if (f !== "key") row[f] = ch[f];
+  });
+  delta.add.forEach((row) => map.set(keyFn(row), row));
+}
+
+function applyDashboardFrame(msg) {
+  if (!msg) return null;
+  // Legacy full-state payload (BROADCAST_DELTA off)
+  if (msg.seq === undefined) return msg;
+
+  if (msg.full) {
+    dashboardState = {
+      totals: {},
+      positions: new Map(),
+      orders: new Map(),
+      prices: { ...(msg.prices || {}) },
+      exposure: { ...(msg.exposure || {}) },
+    };
+    (msg.positions || []).forEach((p) => dashboardState.positions.set(positionKey(p), p));
+    (msg.orders || []).forEach((o) => dashboardState.orders.set(orderKey(o), o));
+  } else {
+    if (!dashboardState || msg.seq !== dashboardSeq + 1) {
+      // Missed a frame, ask for a fresh keyframe and drop this one
+      socket.emit("dashboard_resync");
+      return null;
+    }
+    applyRowDelta(dashboardState.positions, msg.positions, positionKey);
+    applyRowDelta(dashboardState.orders, msg.orders, orderKey);
+    if (msg.prices) Object.assign(dashboardState.prices, msg.prices);
+    (msg.prices_remove || []).forEach((s) => delete dashboardState.prices[s]);
+    if (msg.exposure) Object.assign(dashboardState.exposure, msg.exposure);
+  }
+  DASHBOARD_TOTALS.forEach((f) => {
+    if (msg[f] !== undefined) dashboardState.totals[f] = msg[f];
+  });
+  dashboardSeq = msg.seq;
+
+  return {
+    ...dashboardState.totals,
+    positions: Array.from(dashboardState.positions.values()),
+    orders: Array.from(dashboardState.orders.values()),
+    prices: dashboardState.prices,
+    exposure: dashboardState.exposure,
+  };
+}
+
 // --- UPDATED SOCKET LISTENER ---
 function updateDashboardUI(data) {
   if (!data) return;
 
   // Group Positions
-  const masterPositions = groupPositions(data.positions);
+  const masterPositions = groupPositions(data.positions, data.exposure && data.exposure.groups);
   window.SYSTEM_STATE = { ...data, positions: masterPositions };
   if (!window.SYSTEM_STATE.orders) window.SYSTEM_STATE.orders = [];
 
@@ -389,7 +560,7 @@ function updateDashboardUI(data) {
   if (!data) return;
 
   // Group Positions
-  const masterPositions = groupPositions(data.positions);
+  const masterPositions = groupPositions(data.positions, data.exposure && data.exposure.groups);
   window.SYSTEM_STATE = { ...data, positions: masterPositions };
   if (!window.SYSTEM_STATE.orders) window.SYSTEM_STATE.orders = [];
 
@@ -414,9 +585,11 @@ function updateDashboardUI(data) {
     const powerEl = document.getElementById("val-power");
     if (powerEl) powerEl.innerText = `$${(data.margin_free || 0).toFixed(2)}`;
 
+    const totals = data.exposure && data.exposure.totals;
     const usedMargin = (data.balance || 0) - (data.margin_free || 0);
-    const usagePct =
-      (data.balance || 0) > 0 ? (usedMargin / data.balance) * 100 : 0;
+    const usagePct = totals
+      ? totals.margin_pct
+      : (data.balance || 0) > 0 ? (usedMargin / data.balance) * 100 : 0;
     const bar = document.querySelector(".progress-fill");
     if (bar) bar.style.width = `${usagePct}%`;
 
@@ -484,6 +657,19 @@ async function fetchSymbols() {
     WATCHLIST = [{ sym: "XAUUSD", desc: "Gold", trail: 0.5 }];
     renderWatchlist();
   }
+  subscribeDashboard();
+}
+
+// dashboard_update only carries this user's accounts and the watched symbols' quotes
+function subscribeDashboard() {
+  if (!sessionToken) return;
+  const symbols = WATCHLIST.map((w) => w.sym);
+  if (currentSymbol && !symbols.includes(currentSymbol)) symbols.push(currentSymbol);
+  socket.emit("subscribe_dashboard", {
+    token: sessionToken,
+    symbols: symbols.length ? symbols : null,
+    encoding: window.MessagePack ? "msgpack" : "json", // Server falls back to JSON if it can't
+  });
 }
 
 async function loadFullChartHistoryWithRetry(attempts = 10) {
@@ -499,13 +685,50 @@ async function loadFullChartHistoryWithRetry(attempts = 10) {
   console.error("Chart data not available yet.");
 }
 
+// Binary /api/candles body ({count, dtypes, field: little-endian bytes}) -> column arrays
+function columnsFromBinary(body) {
+  const cols = {};
+  ["time", "open", "high", "low", "close"].forEach((f) => {
+    const bytes = body[f].slice(); // Copy: typed array views need an aligned offset
+    cols[f] =
+      body.dtypes[f] === "<i8"
+        ? Array.from(new BigInt64Array(bytes.buffer, 0, body.count), Number)
+        : new Float64Array(bytes.buffer, 0, body.count);
+  });
+  return cols;
+}
+
+// Columnar /api/candles payload ({time: [...], open: [...], ...}) -> bar objects
+function candlesFromColumns(cols) {
+  if (!cols || !cols.time) return [];
+  const bars = new Array(cols.time.length);
+  for (let i = 0; i < cols.time.length; i++) {
+    bars[i] = {
+      time: cols.time[i],
+      open: cols.open[i],
+      high: cols.high[i],
+      low: cols.low[i],
+      close: cols.close[i],
+    };
+  }
+  return bars;
+}
+
 // --- FIX: CHART LOAD (100 Candles + Space) ---
 // --- FIX 1: Initial Chart Load (25 Candles Buffer) ---
 async function loadFullChartHistory() {
   try {
-    const url = `http://127.0.0.1:5000/api/candles?symbol=${currentSymbol}&timeframe=${currentTimeframe}&limit=2000`;
-    const response = await fetch(url);
-    const data = await response.json();
+    const url = `http://127.0.0.1:5000/api/candles?symbol=${currentSymbol}&timeframe=${currentTimeframe}&limit=2000&format=columns`;
+    const response = await fetch(
+      url,
+      window.MessagePack ? { headers: { Accept: "application/x-msgpack, application/json;q=0.5" } } : undefined,
+    );
+    const binary = (response.headers.get("Content-Type") || "").includes("msgpack");
+    const data = candlesFromColumns(
+      binary
+        ? columnsFromBinary(MessagePack.decode(new Uint8Array(await response.arrayBuffer())))
+        : await response.json(),
+    );
 
     if (data && data.length > 0) {
       candleSeries.setData(data);
@@ -523,6 +746,7 @@ async function loadFullChartHistory() {
       });
 
       chart.priceScale("right").applyOptions({ autoScale: true });
+      subscribeLiveCandles();
       return true;
     }
     return false;
@@ -553,27 +777,34 @@ function resetChart() {
   }
 }
 
-async function updateLiveCandle() {
+function subscribeLiveCandles() {
+  socket.emit("subscribe_candles", {
+    symbol: currentSymbol,
+    timeframe: currentTimeframe,
+  });
+}
+
+function applyLiveCandle(bar) {
   try {
-    const url = `http://127.0.0.1:5000/api/candles?symbol=${currentSymbol}&timeframe=${currentTimeframe}&limit=2&_=${Date.now()}`;
-    const response = await fetch(url);
-    const data = await response.json();
-    if (data && data.length > 0) {
-      const latest = data[data.length - 1];
-      candleSeries.update(latest);
-      latestCandle = latest;
-      if (!lastHoveredTime || lastHoveredTime === latest.time) {
-        updateLegend(latest);
-      }
-      if (latestCandle) {
-        lastKnownPrice = latestCandle.close;
-        // Trigger immediate update so line doesn't lag
-        updateCountdownOnPriceLine(); 
-      }
-      updateLeftLabels();
+    if (latestCandle && bar.time < latestCandle.time) return;
+    const latest = {
+      time: bar.time,
+      open: bar.open,
+      high: bar.high,
+      low: bar.low,
+      close: bar.close,
+    };
+    candleSeries.update(latest);
+    latestCandle = latest;
+    if (!lastHoveredTime || lastHoveredTime === latest.time) {
+      updateLegend(latest);
     }
+    lastKnownPrice = latestCandle.close;
+    // Trigger immediate update so line doesn't lag
+    updateCountdownOnPriceLine();
+    updateLeftLabels();
   } catch (e) {
-    // Silent fail for polling to avoid log spam
+    // Silent fail to avoid log spam on every tick
   }
 }
 
@@ -1435,6 +1666,15 @@ function renderSingleLabel(container, ticket, type, price, data) {
     }
   }
 }
+// One request for a whole group of tickets (backend queues one MODIFY_BATCH per account)
+function modifyBatch(payload) {
+  return fetch("http://127.0.0.1:5000/api/modify/batch", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+}
+
 async function handlePositionInput(ticketId, type, priceStr) {
   const newPrice = parseFloat(priceStr);
   if (isNaN(newPrice) || newPrice <= 0) return;
@@ -1448,22 +1688,15 @@ async function handlePositionInput(ticketId, type, priceStr) {
   } else {
     targets = [ticketId];
   }
-  const promises = targets.map((t) => {
-    const payload = {
-      ticket: t,
-      user_id: currentUserId,
-      symbol: currentSymbol,
-    };
-    if (type === "TP") payload.tp = newPrice;
-    if (type === "SL") payload.sl = newPrice;
-    return fetch("http://127.0.0.1:5000/api/modify", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload),
-    });
-  });
+  const payload = {
+    tickets: targets,
+    user_id: currentUserId,
+    symbol: currentSymbol,
+  };
+  if (type === "TP") payload.tp = newPrice;
+  if (type === "SL") payload.sl = newPrice;
   try {
-    await Promise.all(promises);
+    await modifyBatch(payload);
     if (document.activeElement) document.activeElement.blur();
   } catch (err) {
     showError("Modification Failed", err.message);
@@ -1487,13 +1720,37 @@ function adjustLevelByStep(ticket, type, direction) {
         step = parseFloat(stepInput.value);
     }
 
-    // 3. Calculate
-    let newPrice = currentPrice + (step * direction);
-    newPrice = parseFloat(newPrice.toFixed(2));
+    // 3. Optimistic UI, the worker applies the step to each position's live level
+    priceInput.value = parseFloat((currentPrice + step * direction).toFixed(2));
 
-    // 4. Update UI & Submit
-    priceInput.value = newPrice;
-    handlePositionInput(ticket, type, newPrice);
+    // 4. Submit
+    let targets = [ticket];
+    if (priceLines[ticket] && priceLines[ticket].data && priceLines[ticket].data.tickets) {
+        targets = priceLines[ticket].data.tickets;
+    }
+    fetch("http://127.0.0.1:5000/api/modify/step", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ tickets: targets, type: type, delta: step * direction }),
+    }).catch((err) => showError("Modification Failed", err.message));
+}
+
+async function toggleTrailing(ticket, btnElem) {
+  if (!priceLines[ticket]) return;
+  const pos = priceLines[ticket].data;
+  const targets = pos.tickets && pos.tickets.length > 0 ? pos.tickets : [ticket];
+  if (btnElem) btnElem.innerText = "...";
+  try {
+    await fetch("http://127.0.0.1:5000/api/trail", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ tickets: targets, enabled: !pos.trailing }),
+    });
+  } catch (e) {
+    showError("Trailing Failed", e.message);
+  } finally {
+    document.getElementById("hover-menu").style.display = "none";
+  }
 }
 function moveSlByStep(ticket, step) {
     adjustLevelByStep(ticket, 'SL', step > 0 ? 1 : -1);
@@ -1528,6 +1785,8 @@ function showHoverMenuFixed(ticket, type, y, labelElem) {
       const btnText = isAggregate ? "All SL to BE" : "SL to Cost";
       html += `<button class="hover-btn" onmousedown="event.stopPropagation(); moveSlToCost('${ticket}', this)">${btnText}</button>`;
     }
+    // Trailing runs in the backend workers, it keeps going if the dashboard is closed
+    html += `<button class="hover-btn" onmousedown="event.stopPropagation(); toggleTrailing('${ticket}', this)">${pos.trailing ? "Trail OFF" : "Trail ON"}</button>`;
     html += `<div style="font-size: 13px; color: #fff; font-weight: 600; margin-left: 10px; white-space: nowrap;"> BE: ${entryPrice.toFixed(2)} </div>`;
   } else if (type === "TP" || type === "SL") {
     html += `<button class="hover-btn" onmousedown="startDrag('${ticket}', '${type}', ${type === "TP" ? pos.tp : pos.sl})">Move</button>`;
@@ -1579,16 +1838,8 @@ async function moveSlToCost(ticket, btnElem) {
   } else {
     targets = [{ ticket: ticket, sl: pos.price_open }];
   }
-  const promises = targets.map((t) => {
-    const payload = { ticket: t.ticket, user_id: currentUserId, sl: t.sl };
-    return fetch("http://127.0.0.1:5000/api/modify", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload),
-    });
-  });
   try {
-    await Promise.all(promises);
+    await modifyBatch({ items: targets, user_id: currentUserId });
   } catch (e) {
     showError("SL Update Failed", e.message);
   } finally {
@@ -1882,12 +2133,7 @@ async function confirmLimitOrderFromLabel() {
     tp: limitOrderState.tpPrice,
   };
   try {
-    const res = await fetch("http://127.0.0.1:5000/api/trade", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload),
-    });
-    const data = await res.json();
+    const data = await submitTrade(payload);
     if (data.blocked) {
       showError("Trade Blocked", "Opposing position exists.");
       limitOrderState.isSubmitting = false;
@@ -2061,23 +2307,17 @@ async function commitDrag(e) {
   } else {
     targets = [ticketId];
   }
-  for (let t of targets) {
-    const payload = {
-      ticket: t,
-      user_id: currentUserId,
-      symbol: currentSymbol,
-    };
-    if (draggingLine.type === "TP") payload.tp = finalPrice;
-    if (draggingLine.type === "SL") payload.sl = finalPrice;
-    try {
-      await fetch("http://127.0.0.1:5000/api/modify", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
-      });
-    } catch (err) {
-      console.error("Modify error for ticket " + t, err);
-    }
+  const payload = {
+    tickets: targets,
+    user_id: currentUserId,
+    symbol: currentSymbol,
+  };
+  if (draggingLine.type === "TP") payload.tp = finalPrice;
+  if (draggingLine.type === "SL") payload.sl = finalPrice;
+  try {
+    await modifyBatch(payload);
+  } catch (err) {
+    console.error("Modify error for tickets " + targets.join(","), err);
   }
   if (dragPriceLine) {
     candleSeries.removePriceLine(dragPriceLine);
@@ -2121,8 +2361,8 @@ function updateChartPositions(positions) {
     return;
   }
   let aggregates = {
-    BUY: { vol: 0, priceProd: 0, profit: 0, tickets: [], tps: [], sls: [] },
-    SELL: { vol: 0, priceProd: 0, profit: 0, tickets: [], tps: [], sls: [] },
+    BUY: { vol: 0, priceProd: 0, profit: 0, tickets: [], tps: [], sls: [], trails: [] },
+    SELL: { vol: 0, priceProd: 0, profit: 0, tickets: [], tps: [], sls: [], trails: [] },
   };
   currentPositions.forEach((pos) => {
     const side = pos.type;
@@ -2132,6 +2372,7 @@ function updateChartPositions(positions) {
     aggregates[side].tickets.push(pos.ticket);
     aggregates[side].tps.push(pos.tp);
     aggregates[side].sls.push(pos.sl);
+    aggregates[side].trails.push(pos.trail || 0);
   });
   ["BUY", "SELL"].forEach((side) => {
     const agg = aggregates[side];
@@ -2180,6 +2421,7 @@ function updateChartPositions(positions) {
           tickets: agg.tickets,
           tp: finalTP,
           sl: finalSL,
+          trailing: agg.trails.every((t) => t > 0),
           is_aggregate: true,
         },
       };
@@ -2278,6 +2520,71 @@ function viewSpecificTrade(subPos, event) {
 function clearSpecificView() {
   specificTradeView = null;
 }
+// Posts a non-blocking trade: the backend answers 202 right away and pushes a
+// 'trade_result' per account, then the full report (done=true). Resolves with
+// that report; falls back to polling if the final event never arrives.
+const pendingTrades = {};
+const earlyTradeEvents = {}; // job_id -> events for jobs not registered (yet), kept briefly
+function handleTradeEvent(event) {
+  const job = pendingTrades[event.job_id];
+  if (!job) {
+    const early = earlyTradeEvents[event.job_id] || (earlyTradeEvents[event.job_id] = []);
+    if (early.push(event) === 1) setTimeout(() => delete earlyTradeEvents[event.job_id], 15000);
+    return;
+  }
+  if (!event.done) {
+    if (job.onFill) job.onFill(event);
+    return;
+  }
+  finishTrade(event.job_id, event);
+}
+function finishTrade(jobId, result) {
+  const job = pendingTrades[jobId];
+  if (!job) return;
+  delete pendingTrades[jobId];
+  clearTimeout(job.timer);
+  job.resolve(result);
+}
+async function submitTrade(payload, onFill) {
+  const jobId = crypto.randomUUID();
+  // Registered before the POST: events can arrive ahead of the 202 response
+  const done = new Promise((resolve) => {
+    pendingTrades[jobId] = { resolve, onFill, timer: null };
+  });
+  (earlyTradeEvents[jobId] || []).forEach(handleTradeEvent);
+  delete earlyTradeEvents[jobId];
+  let res, data;
+  try {
+    res = await fetch("http://127.0.0.1:5000/api/trade", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ...payload, async: true, job_id: jobId }),
+    });
+    data = await res.json();
+  } catch (e) {
+    finishTrade(jobId);
+    throw e;
+  }
+  if (res.status !== 202) {
+    finishTrade(jobId);
+    return data; // Blocked / rejected / no accounts
+  }
+  const poll = async () => {
+    try {
+      const r = await fetch(`http://127.0.0.1:5000/api/trade/${jobId}`);
+      const status = await r.json();
+      if (status.done || r.status === 404) {
+        return finishTrade(jobId, r.status === 404 ? { error: "Trade status lost" } : status);
+      }
+    } catch (e) {}
+    if (pendingTrades[jobId]) pendingTrades[jobId].timer = setTimeout(poll, 1000);
+  };
+  if (pendingTrades[jobId]) pendingTrades[jobId].timer = setTimeout(poll, 12000);
+  return done;
+}
+function showTradeProgress(btn, event) {
+  if (btn) btn.title = `${event.remaining} account(s) pending`;
+}
 async function placeOrder(type) {
   const qtyInput = document.getElementById("trade-qty");
   const qty = qtyInput ? parseFloat(qtyInput.value) : 1;
@@ -2306,12 +2613,7 @@ async function placeOrder(type) {
     if (limitOrderState.tpPrice > 0) payload.tp = limitOrderState.tpPrice;
   }
   try {
-    const res = await fetch("http://127.0.0.1:5000/api/trade", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload),
-    });
-    const data = await res.json();
+    const data = await submitTrade(payload, (event) => showTradeProgress(btn, event));
     if (data.blocked) {
       showError(
         "Trade Blocked",
@@ -2333,7 +2635,10 @@ async function placeOrder(type) {
   } catch (e) {
     showError("Order Failed", e.message);
   } finally {
-    if (btn) btn.classList.remove("btn-loading");
+    if (btn) {
+      btn.classList.remove("btn-loading");
+      btn.title = "";
+    }
   }
 }
 async function closeTrade(ticket, btnElem) {
@@ -79,6 +79,7 @@ async function attemptLogin() {
       }
       localStorage.setItem("userMobile", mobileIn.value);
       localStorage.setItem("userId", data.user_id);
+      localStorage.setItem("sessionToken", data.token);
       window.location.href = "dashboard.html";
     } else {
       status.innerText = data.message || data.error || "Login Failed";